@@ -0,0 +1,485 @@
+import asyncio
+import heapq
+import logging
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from asset_cache import AssetCache
+from event_log import elapsed_ms, event
+from media_control import MediaController
+from pipeline_latency import PipelineLatency
+from playback_events import PlaybackEvents
+from timer_core import TimerCore
+
+
+class Overlap:
+    """What a venue's announcement does when it is ready while another is still playing on its output
+
+    "queue" waits its turn, "drop-if-stale" waits too but is dropped if it
+    would start more than stale_after seconds late, "preempt" stops the clip
+    that is playing and goes first.
+    """
+
+    QUEUE = "queue"
+    DROP_IF_STALE = "drop-if-stale"
+    PREEMPT = "preempt"
+    POLICIES = (QUEUE, DROP_IF_STALE, PREEMPT)
+
+    def __init__(self, policy: str = QUEUE, stale_after: float = 30.0):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown overlap policy: {policy} (known: {', '.join(self.POLICIES)})")
+        self.policy = policy
+        self.stale_after = stale_after
+
+    def __repr__(self):
+        return f"Overlap({self.policy}, stale_after={self.stale_after:g}s)"
+
+
+class AnnouncementRequest:
+    """One announcement waiting for its output; preempting requests first, then earliest deadline"""
+
+    def __init__(self, seq: int, audio_file: str, volume: Optional[float], due: Optional[float],
+                 venue: Optional[str], overlap: Overlap, measured: bool = False):
+        self.seq = seq
+        self.audio_file = audio_file
+        self.volume = volume
+        self.due = due  # time.monotonic() instant to line the first sample up with, if any
+        self.deadline = time.monotonic() if due is None else due
+        self.venue = venue
+        self.overlap = overlap
+        self.measured = measured  # whether its timings feed the latency samples
+        self.rank = 0 if overlap.policy == Overlap.PREEMPT else 1
+        self.done: asyncio.Future = asyncio.get_running_loop().create_future()  # True once played
+        self.preempted = asyncio.Event()
+
+    def __lt__(self, other):
+        return (self.rank, self.deadline, self.seq) < (other.rank, other.deadline, other.seq)
+
+
+class PlaybackQueue:
+    """One output's pending announcements, most urgent first, and the one playing now"""
+
+    def __init__(self):
+        self.requests: List[AnnouncementRequest] = []
+        self.arrived = asyncio.Event()
+        self.playing: Optional[AnnouncementRequest] = None
+        self.worker: Optional[asyncio.Task] = None
+        # Set while the media stays paused between announcements of one hold session
+        self.held_until: Optional[float] = None
+        # Instants of announcements sleeping through their lead time before they queue up
+        self.expected: List[float] = []
+
+    def put(self, request: AnnouncementRequest):
+        heapq.heappush(self.requests, request)
+        self.arrived.set()
+
+    def put_back(self, request: AnnouncementRequest):
+        """Return a request that is not ready yet, without waking the worker"""
+        heapq.heappush(self.requests, request)
+
+    async def wait(self, timeout: Optional[float]) -> bool:
+        """Sleep until a new request arrives (True) or timeout seconds pass (False)"""
+        self.arrived.clear()
+        try:
+            await asyncio.wait_for(self.arrived.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[AnnouncementRequest]:
+        """The most urgent request, or None if none arrives within timeout seconds"""
+        while not self.requests:
+            if not await self.wait(timeout):
+                return None
+        return heapq.heappop(self.requests)
+
+    def follower(self, channel, volume: Optional[float], before: float) -> Optional[AnnouncementRequest]:
+        """Take the next request if it can join the clip playing on channel: due before `before`, same volume"""
+        while self.requests and self.requests[0].done.done():
+            heapq.heappop(self.requests)
+        if not self.requests or not channel.get_busy():
+            # Once the channel is idle a queued sound would not be chained;
+            # the request stays for the worker to play() on its own
+            return None
+        head = self.requests[0]
+        if head.deadline < before and head.volume == volume and head.overlap.policy != Overlap.PREEMPT:
+            return heapq.heappop(self.requests)
+        return None
+
+
+class AnnouncementEngine:
+    """One long-lived asyncio loop that runs timers and announcement pipelines as coroutines"""
+
+    def __init__(self, assets: AssetCache, media: MediaController, latency: Optional[PipelineLatency] = None,
+                 output_latency: float = 0.0, overlap: Optional[Dict[Optional[str], Overlap]] = None,
+                 hold_window: float = 120.0,
+                 next_due: Optional[Callable[[MediaController], Optional[float]]] = None):
+        self.assets = assets
+        self.media = media
+        self.events = PlaybackEvents()
+        self.latency = latency or PipelineLatency()
+        # Time from channel.play() to the first sample reaching the output (about one mixer buffer)
+        self.output_latency = output_latency
+        # Venue -> what its announcements do when the output is busy
+        self.overlap = overlap or {}
+        # Media paused for an announcement stays paused if the next one on its
+        # output is due within hold_window seconds; next_due(media) returns the
+        # time.monotonic() instant of that output's next scheduled announcement
+        self.hold_window = hold_window
+        self.next_due = next_due
+        self._signal_handlers: Dict[int, Callable[[], None]] = {}
+        # One playback worker per media controller, fed by a priority queue, so
+        # one pause/play/resume cycle runs at a time per controller. Created on
+        # first use by the loop that is running then.
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._outputs: Dict[MediaController, PlaybackQueue] = {}
+        self._seq = 0
+
+    def add_signal_handler(self, signum: int, callback: Callable[[], None]):
+        """Run callback on the engine loop when the process receives signum"""
+        self._signal_handlers[signum] = callback
+
+    def run(self, timers: Iterable[TimerCore]):
+        """Drive every timer on a single event loop until they all stop"""
+        self.events.start()
+        try:
+            asyncio.run(self._main(list(timers)))
+        finally:
+            self.events.stop()
+
+    async def _main(self, timers):
+        loop = asyncio.get_running_loop()
+        for signum, callback in self._signal_handlers.items():
+            loop.add_signal_handler(signum, callback)
+        try:
+            await asyncio.gather(*(timer.run_async() for timer in timers))
+        finally:
+            for media, output in self._outputs.items():
+                output.worker.cancel()
+                if output.held_until is not None:
+                    # Never leave the customer's music paused on the way out
+                    output.held_until = None
+                    await self._resume(media, None, "shutdown")
+
+    async def announce(self, audio_file: str, media: Optional[MediaController] = None,
+                       volume: Optional[float] = None, due: Optional[float] = None,
+                       venue: Optional[str] = None) -> bool:
+        """Pause media, play one announcement and resume media; False if it was dropped
+
+        media overrides the engine's controller for venues with their own
+        backend. Announcements for one controller go through its playback
+        worker one at a time, so one venue never resumes the player while
+        another is still announcing; the venue's Overlap policy decides what
+        happens when the worker is busy.
+
+        With due (a time.monotonic() instant) preparation starts the
+        backend's measured lead time before it and the first sample is held
+        back until due, instead of everything starting late.
+        """
+        media = media or self.media
+        output = self._output_for(media)
+        overlap = self.overlap.get(venue) or Overlap()
+        # A slot dispatched after its instant (a catch-up after a stall) or
+        # queued behind a busy output says nothing about the pipeline, so it
+        # does not feed the latency samples
+        measured = due is not None and time.monotonic() < due and output.playing is None
+        # While the output is busy the request is queued straight away, so it
+        # can be chained; a preempting one waits for its moment to interrupt
+        if due is not None and (output.playing is None or overlap.policy == Overlap.PREEMPT):
+            output.expected.append(due)
+            try:
+                await self._sleep_until(self._ready_at(due, media))
+            finally:
+                output.expected.remove(due)
+
+        self._seq += 1
+        request = AnnouncementRequest(self._seq, audio_file, volume, due, venue, overlap, measured)
+        playing = output.playing
+        if playing is not None and overlap.policy == Overlap.PREEMPT:
+            event("announce.preempted", logging.WARNING, venue=playing.venue,
+                  file=os.path.basename(playing.audio_file), by=venue)
+            playing.preempted.set()
+        output.put(request)
+        return await request.done
+
+    def _ready_at(self, due: float, media: MediaController) -> float:
+        """When to start preparing an announcement due at due"""
+        return due - self.output_latency - self.latency.lead(media.name)
+
+    def _output_for(self, media: MediaController) -> PlaybackQueue:
+        """The controller's request queue, starting its worker on the running loop if needed"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Queues and tasks belong to the loop they were made on
+            self._loop = loop
+            self._outputs = {}
+        output = self._outputs.get(media)
+        if output is None:
+            output = self._outputs[media] = PlaybackQueue()
+            output.worker = loop.create_task(self._work(media, output))
+        return output
+
+    @staticmethod
+    def _stale(request: AnnouncementRequest, start: float) -> bool:
+        """Drop a drop-if-stale request that would start too late, and say so"""
+        late = start - request.deadline
+        if request.overlap.policy != Overlap.DROP_IF_STALE or late <= request.overlap.stale_after:
+            return False
+        event("announce.dropped", logging.WARNING, venue=request.venue,
+              file=os.path.basename(request.audio_file), late_s=round(late, 1), reason="stale")
+        request.done.set_result(False)
+        return True
+
+    async def _work(self, media: MediaController, output: PlaybackQueue):
+        """Play the controller's requests one after another, most urgent first"""
+        while True:
+            if output.held_until is None:
+                request = await output.get()
+            else:
+                request = await output.get(output.held_until - time.monotonic())
+                if request is None:
+                    # The announcement the media was held for never came (dropped, or the schedule changed)
+                    output.held_until = None
+                    await self._resume(media, None, "hold expired")
+                    continue
+            if request.done.done() or self._stale(request, time.monotonic()):
+                # Abandoned by its caller, or dropped
+                continue
+            if request.due is not None and self._ready_at(request.due, media) > time.monotonic():
+                # Queued early behind a clip that has ended; prepare it at the
+                # usual lead time, unless something more urgent comes in first
+                output.put_back(request)
+                await output.wait(self._ready_at(request.due, media) - time.monotonic())
+                continue
+
+            output.playing = request
+            played = False
+            try:
+                played = await self._announce(request, media, output)
+            except Exception as e:
+                # Keep the worker alive for the requests behind this one
+                event("announce.error", logging.ERROR, exc_info=True, venue=request.venue,
+                      file=os.path.basename(request.audio_file), error=str(e))
+            finally:
+                output.playing = None
+            if not request.done.done():
+                request.done.set_result(played)
+
+    @staticmethod
+    async def _sleep_until(instant: float):
+        delay = instant - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    async def _timed(samples: Dict[str, float], stage: str, awaitable):
+        start = time.monotonic()
+        try:
+            return await awaitable
+        finally:
+            samples[stage] = time.monotonic() - start
+
+    def _hold_until(self, media: MediaController, output: PlaybackQueue) -> Optional[float]:
+        """When to give up holding the media paused, or None to resume it now"""
+        upcoming = [request.deadline for request in output.requests if not request.done.done()]
+        upcoming.extend(output.expected)
+        if self.next_due is not None:
+            scheduled = self.next_due(media)
+            if scheduled is not None:
+                upcoming.append(scheduled)
+        if not upcoming or min(upcoming) - time.monotonic() > self.hold_window:
+            return None
+        # A little past the instant, so a request arriving on time is never missed
+        return min(upcoming) + 1.0
+
+    async def _resume(self, media: MediaController, venue: Optional[str], reason: Optional[str] = None) -> bool:
+        resumed = await media.play_async()
+        if resumed:
+            await media.confirm_state(True, "resume")
+        else:
+            event("media.resume_failed", logging.WARNING, venue=venue, backend=media.name)
+        if reason:
+            event("media.resumed", backend=media.name, reason=reason)
+        return resumed
+
+    def _chained_start(self, follower: AnnouncementRequest, starts_at: float, backend: str):
+        """Log a chained announcement once its sound has actually started"""
+        filename = os.path.basename(follower.audio_file)
+        offset = None
+        if follower.due is not None:
+            offset = starts_at + self.output_latency - follower.due
+            if not self.latency.on_time(offset):
+                event("announce.off_time", logging.WARNING, venue=follower.venue, file=filename,
+                      offset_ms=round(offset * 1000, 1), tolerance_ms=self.latency.tolerance * 1000,
+                      lead_ms=round(self.latency.lead(backend) * 1000), chained=True)
+        event("announce.play", venue=follower.venue, file=filename, chained=True,
+              offset_ms=None if offset is None else round(offset * 1000, 1), glyph="▶")
+
+    async def _play_sequence(self, channel, sound, request: AnnouncementRequest, output: PlaybackQueue,
+                             backend: str) -> List[AnnouncementRequest]:
+        """Play the clip through, chaining announcements due by the time it ends right behind it
+
+        Channel.queue() starts the next sound the instant the current one
+        ends, so back-to-back slots play gaplessly, with no reload in between
+        and within the one media pause. Only announcements due no later than
+        the latency tolerance after the end are chained, so none starts early;
+        later ones take the normal path. In practice that joins announcements
+        already waiting on a busy output, such as venues sharing it at the
+        same second or a catch-up burst; slots a minute apart on one schedule
+        are not chained, since the clip would have to end within the
+        tolerance of the next slot. The channel holds one queued sound,
+        so each follower is queued once its predecessor has started. A
+        preempting announcement stops the whole sequence, and a follower that
+        was queued but had not started yet is dropped. Returns the chained
+        requests that played.
+        """
+        loop = asyncio.get_running_loop()
+        started: List[AnnouncementRequest] = []
+        # The follower waiting in the channel's queue and when it starts
+        queued: Optional[AnnouncementRequest] = None
+        starts_at = ends_at = time.monotonic() + sound.get_length()
+        while True:
+            now = time.monotonic()
+            if queued is not None and now >= starts_at:
+                # The queued sound has started, so the channel can take another
+                self._chained_start(queued, starts_at, backend)
+                started.append(queued)
+                queued = None
+            if queued is None and now < ends_at:
+                follower = output.follower(channel, request.volume, ends_at + self.latency.tolerance)
+                if follower is not None:
+                    if self._stale(follower, ends_at):
+                        continue
+                    try:
+                        next_sound = await loop.run_in_executor(None, self.assets.get, follower.audio_file, False)
+                    except Exception as e:
+                        event("announce.error", logging.ERROR, exc_info=True, venue=follower.venue,
+                              file=os.path.basename(follower.audio_file), error=str(e))
+                        follower.done.set_result(False)
+                        continue
+                    if channel.get_busy():
+                        channel.queue(next_sound)
+                        queued, starts_at = follower, ends_at
+                        ends_at += next_sound.get_length()
+                    else:
+                        # The clip ended while the follower was loading, so there is
+                        # nothing left to queue behind; it is played afresh
+                        channel = self.events.play(next_sound, follower.volume)
+                        now = time.monotonic()
+                        self._chained_start(follower, now, backend)
+                        started.append(follower)
+                        ends_at = now + next_sound.get_length()
+                    continue
+
+            output.arrived.clear()
+            ended = asyncio.ensure_future(self.events.wait_end(channel, ends_at - now))
+            waits = [ended, asyncio.ensure_future(request.preempted.wait()),
+                     asyncio.ensure_future(output.arrived.wait())]
+            if queued is not None:
+                waits.append(asyncio.ensure_future(asyncio.sleep(starts_at - now)))
+            try:
+                await asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for waiting in waits:
+                    waiting.cancel()
+            if request.preempted.is_set():
+                channel.stop()
+                if queued is not None:
+                    event("announce.dropped", logging.WARNING, venue=queued.venue,
+                          file=os.path.basename(queued.audio_file), reason="preempted")
+                    queued.done.set_result(False)
+                return started
+            if ended.done():
+                if queued is not None:
+                    # The channel went idle, so the queued sound has played through
+                    self._chained_start(queued, starts_at, backend)
+                    started.append(queued)
+                return started
+
+    async def _announce(self, request: AnnouncementRequest, media: MediaController, output: PlaybackQueue) -> bool:
+        audio_file, volume, due, venue = request.audio_file, request.volume, request.due, request.venue
+        measured = request.measured
+        # The media status check and pause run concurrently with loading the
+        # asset, so a cache miss does not add to the pause latency
+        loop = asyncio.get_running_loop()
+        filename = os.path.basename(audio_file)
+        backend = media.name
+        media_was_playing = False
+        played = False
+        chained: List[AnnouncementRequest] = []
+        # Stage -> seconds, recorded once the announcement has started
+        samples: Dict[str, float] = {}
+        started = time.monotonic()
+
+        load = asyncio.ensure_future(
+            self._timed(samples, "load", loop.run_in_executor(None, self.assets.get, audio_file, False))
+        )
+
+        # Still paused by the previous announcement of a hold session: we owe a resume either way
+        held, output.held_until = output.held_until is not None, None
+        try:
+            # Checked even while holding, in case someone started the player by hand
+            media_was_playing = await self._timed(samples, "status", media.is_playing_async())
+
+            if media_was_playing:
+                if await self._timed(samples, "pause", media.pause_async()):
+                    # Returns as soon as the player reports it has paused
+                    await self._timed(samples, "confirm", media.confirm_state(False, "pause"))
+                else:
+                    event("media.pause_failed", logging.WARNING, venue=venue, backend=backend)
+
+            sound = await load
+            prepare = samples["prepare"] = time.monotonic() - started
+
+            if due is not None:
+                # Prepared early: hold the clip so its first sample lands on the scheduled instant
+                await self._sleep_until(due - self.output_latency)
+            if request.preempted.is_set():
+                return False
+
+            channel = self.events.play(sound, volume)
+            played = True
+            offset = None
+            if due is not None:
+                # Estimated from the play() call and one mixer buffer; the
+                # audio device's own latency is not visible from here
+                offset = time.monotonic() + self.output_latency - due
+                if measured:
+                    samples["offset"] = offset
+                    for stage, seconds in samples.items():
+                        self.latency.record(backend, stage, seconds)
+                if not self.latency.on_time(offset):
+                    event("announce.off_time", logging.WARNING, venue=venue, file=filename,
+                          offset_ms=round(offset * 1000, 1), tolerance_ms=self.latency.tolerance * 1000,
+                          lead_ms=round(self.latency.lead(backend) * 1000))
+            event("announce.play", venue=venue, file=filename, paused=media_was_playing, held=held or None,
+                  prepare_ms=round(prepare * 1000, 1),
+                  offset_ms=None if offset is None else round(offset * 1000, 1), glyph="▶")
+
+            # Resumes the moment the mixer reports the clip (and anything chained to it) has ended
+            chained = await self._play_sequence(channel, sound, request, output, backend)
+
+        except Exception as e:
+            event("announce.error", logging.ERROR, exc_info=True, venue=venue, file=filename, error=str(e))
+        finally:
+            if not load.done():
+                load.cancel()
+
+            # Resume media if it was playing, unless another announcement is close behind
+            resumed = None
+            if media_was_playing or held:
+                output.held_until = self._hold_until(media, output)
+                if output.held_until is None:
+                    resumed = await self._resume(media, venue)
+                else:
+                    event("media.hold", venue=venue, backend=backend,
+                          next_in_s=round(output.held_until - 1.0 - time.monotonic(), 1))
+            for follower in chained:
+                if not follower.done.done():
+                    follower.done.set_result(True)
+            event("announce.done", venue=venue, file=filename, chained=len(chained) or None, resumed=resumed,
+                  took_ms=elapsed_ms(started), glyph="✓")
+            if measured:
+                await loop.run_in_executor(None, self.latency.save)
+        return played
@@ -0,0 +1,239 @@
+import json
+import os
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from asset_manifest import AssetManifest
+
+BUILD_VERSION = 1
+DEFAULT_BUILD_DIR = os.path.join("build", "assets")
+
+# The format the schedulers open the mixer with; built assets are stored in exactly this format
+MIXER_FREQUENCY = 44100
+MIXER_SIZE = -16
+MIXER_CHANNELS = 2
+# Frames per mixer callback; one buffer is roughly the time from channel.play() to the output
+MIXER_BUFFER = 512
+
+
+def format_tag(frequency: int, size: int, channels: int) -> str:
+    """Directory name for one mixer format, e.g. 44100-s16-2ch"""
+    return f"{frequency}-{'s' if size < 0 else 'u'}{abs(size)}-{channels}ch"
+
+
+def _init_worker(frequency: int, size: int, channels: int):
+    """Open a silent mixer in the target format so Sound() converts into it"""
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    from startup import import_pygame
+
+    pygame = import_pygame()
+    if pygame.mixer.get_init() != (frequency, size, channels):
+        pygame.mixer.quit()
+        pygame.mixer.init(frequency=frequency, size=size, channels=channels)
+
+
+def transcode(job: Tuple[str, str]) -> Dict:
+    """Decode one source through the mixer and write it as a PCM WAV; runs in the worker processes"""
+    source, output = job
+    result = {"source": source, "output": output}
+    start = time.perf_counter()
+    try:
+        import pygame
+
+        frequency, size, channels = pygame.mixer.get_init()
+        raw = pygame.mixer.Sound(source).get_raw()
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        tmp = f"{output}.{os.getpid()}.tmp"
+        with wave.open(tmp, "wb") as f:
+            f.setnchannels(channels)
+            f.setsampwidth(abs(size) // 8)
+            f.setframerate(frequency)
+            f.writeframes(raw)
+        os.replace(tmp, output)
+        result.update(bytes=len(raw), error=None)
+    except Exception as e:
+        result["error"] = str(e) or type(e).__name__
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+class AssetBuild:
+    """Announcements pre-converted to the mixer's native format
+
+    build() decodes every referenced file once, ahead of time, into
+    <build dir>/<format>/<sha256>.wav. Outputs are named by the source's
+    content hash, so unchanged files are never converted twice and files
+    shared between venues are built once. At runtime resolve() swaps a source
+    path for its built file while the source still matches what was built;
+    loading that file is a copy, with no decoding or resampling left to do.
+    """
+
+    def __init__(
+        self,
+        build_dir: Optional[str] = None,
+        frequency: int = MIXER_FREQUENCY,
+        size: int = MIXER_SIZE,
+        channels: int = MIXER_CHANNELS,
+    ):
+        if size not in (8, -16):
+            # WAV only stores unsigned 8-bit and signed 16-bit integer PCM
+            raise ValueError(f"Cannot build assets for mixer sample format {size}")
+        self.format = (frequency, size, channels)
+        self.root = os.path.join(build_dir or DEFAULT_BUILD_DIR, format_tag(*self.format))
+        self.manifest_path = os.path.join(self.root, "manifest.json")
+        # source realpath -> size, mtime_ns and sha256 it was built from, plus the output
+        self.records: Dict[str, Dict] = {}
+        self.served = 0
+        self.fallbacks = 0
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                stored = json.load(f)
+            if stored.get("version") == BUILD_VERSION:
+                self.records = stored["assets"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    @classmethod
+    def for_mixer(cls, build_dir: Optional[str] = None) -> "AssetBuild":
+        """The build matching the format the mixer actually opened with"""
+        import pygame
+
+        return cls(build_dir, *pygame.mixer.get_init())
+
+    def _output(self, sha256: str) -> str:
+        return os.path.join(self.root, f"{sha256}.wav")
+
+    # ------------------------------------------------------------------
+    # Runtime
+    # ------------------------------------------------------------------
+    def resolve(self, path: str) -> Optional[str]:
+        """Built file for path, or None when it was never built or has changed since"""
+        record = self.records.get(os.path.realpath(path))
+        if record is None:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if (st.st_size, st.st_mtime_ns) != (record["size"], record["mtime_ns"]):
+            return None
+        output = self._output(record["sha256"])
+        return output if os.path.exists(output) else None
+
+    def load(self, path: str):
+        """Loader for the asset caches: the built file when it is current, else the source"""
+        import pygame
+
+        built = self.resolve(path)
+        if built is None:
+            self.fallbacks += 1
+            return pygame.mixer.Sound(path)
+        self.served += 1
+        return pygame.mixer.Sound(built)
+
+    def coverage(self, paths: Iterable[str]) -> Tuple[int, int]:
+        """(paths with a current build, distinct paths)"""
+        paths = set(paths)
+        return sum(1 for path in paths if self.resolve(path)), len(paths)
+
+    def summary(self) -> str:
+        return f"{self.served} loaded prebuilt, {self.fallbacks} decoded from source"
+
+    # ------------------------------------------------------------------
+    # Build
+    # ------------------------------------------------------------------
+    def build(
+        self, paths: Iterable[str], manifest: Optional[AssetManifest] = None, workers: Optional[int] = None
+    ) -> Tuple[List[Dict], int, List[Tuple[str, str]]]:
+        """Convert every path whose content has no output yet; returns (built, reused, problems)"""
+        manifest = manifest or AssetManifest(workers=workers)
+        workers = workers or os.cpu_count() or 1
+        # Hashes come from the asset manifest, which only re-reads files that changed
+        records, problems = manifest.validate(paths)
+
+        jobs: Dict[str, str] = {}
+        queued = set()
+        reused = 0
+        for path, record in records.items():
+            if record["error"]:
+                continue
+            output = self._output(record["sha256"])
+            self.records[os.path.realpath(path)] = {
+                "size": record["size"], "mtime_ns": record["mtime_ns"], "sha256": record["sha256"],
+                "source": path,
+            }
+            if os.path.exists(output):
+                reused += 1
+            elif output not in queued:
+                jobs[path] = output
+                queued.add(output)
+
+        if len(jobs) > 1 and workers > 1:
+            workers = min(workers, len(jobs))
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=self.format) as pool:
+                built = list(pool.map(transcode, jobs.items()))
+        else:
+            _init_worker(*self.format)
+            built = [transcode(job) for job in jobs.items()]
+
+        for result in built:
+            if result["error"]:
+                problems.append((result["source"], result["error"]))
+                del self.records[os.path.realpath(result["source"])]
+
+        self.prune()
+        self.save()
+        return built, reused, problems
+
+    def prune(self) -> int:
+        """Delete outputs no source refers to any more"""
+        wanted = {f"{record['sha256']}.wav" for record in self.records.values()}
+        removed = 0
+        for name in os.listdir(self.root) if os.path.isdir(self.root) else []:
+            if name.endswith(".wav") and name not in wanted:
+                os.unlink(os.path.join(self.root, name))
+                removed += 1
+        return removed
+
+    def save(self):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": BUILD_VERSION, "format": list(self.format), "assets": self.records}, f,
+                      indent=1, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from venues import VENUES, load_venues, shared_assets
+
+    parser = argparse.ArgumentParser(description="Convert every scheduled audio file to the mixer's native format")
+    parser.add_argument("venues", nargs="*", default=sorted(VENUES),
+                        help=f"venues whose audio to build (default: all of {', '.join(sorted(VENUES))})")
+    parser.add_argument("--build-dir", default=DEFAULT_BUILD_DIR, help=f"output directory (default {DEFAULT_BUILD_DIR})")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--frequency", type=int, default=MIXER_FREQUENCY)
+    parser.add_argument("--size", type=int, default=MIXER_SIZE, help="mixer sample format (-16 or 8)")
+    parser.add_argument("--channels", type=int, default=MIXER_CHANNELS)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    paths = list(shared_assets(load_venues(args.venues)))
+    build = AssetBuild(args.build_dir, args.frequency, args.size, args.channels)
+    built, reused, problems = build.build(paths, workers=args.workers)
+
+    for result in built:
+        if not result["error"]:
+            print(f"✓ {result['source']} → {os.path.basename(result['output'])} "
+                  f"({result['bytes'] / 1048576:.1f} MB, {result['seconds'] * 1000:.0f} ms)")
+    for path, problem in problems:
+        print(f"✗ {path}: {problem}")
+    print(f"\n{len(paths)} files for {', '.join(args.venues)} in {build.root}: "
+          f"{len(built) - len(problems)} built, {reused} up to date, {len(problems)} problems "
+          f"in {time.perf_counter() - start:.1f} s")
+    raise SystemExit(1 if problems else 0)
@@ -0,0 +1,131 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+
+def sound_nbytes(sound) -> int:
+    """Approximate decoded size of a pygame Sound in the mixer's sample format"""
+    import pygame
+
+    init = pygame.mixer.get_init()
+    if not init:
+        return 0
+    frequency, sample_format, channels = init
+    return int(sound.get_length() * frequency) * channels * (abs(sample_format) // 8)
+
+
+class AssetCache:
+    """Decoded announcement audio kept in memory, keyed by path and mtime, with a byte-budget LRU"""
+
+    def __init__(
+        self,
+        budget_bytes: int = 64 * 1024 * 1024,
+        loader: Optional[Callable[[str], object]] = None,
+        sizer: Optional[Callable[[object], int]] = None,
+    ):
+        if loader is None:
+            # pygame is only imported once something actually needs decoding
+            import pygame
+
+            loader = pygame.mixer.Sound
+        self.budget_bytes = budget_bytes
+        self.loader = loader
+        self.sizer = sizer or sound_nbytes
+
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int], object, int]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _signature(path: str) -> Tuple[int, int]:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+
+    def _drop(self, path: str):
+        _, _, nbytes = self._entries.pop(path)
+        self.bytes_used -= nbytes
+
+    def get(self, path: str, revalidate: bool = True):
+        """Return the decoded audio for path, decoding and caching it on a miss
+
+        With revalidate=False a cached entry is returned without touching the
+        filesystem; the prefetcher keeps entries fresh ahead of their slots.
+        """
+        if not revalidate:
+            with self._lock:
+                cached = self._entries.get(path)
+                if cached is not None:
+                    self._entries.move_to_end(path)
+                    self.hits += 1
+                    return cached[1]
+
+        signature = self._signature(path)
+
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached is not None and cached[0] == signature:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return cached[1]
+            if cached is not None:
+                # File changed on disk since it was decoded
+                self._drop(path)
+            self.misses += 1
+
+        sound = self.loader(path)
+        nbytes = self.sizer(sound)
+
+        with self._lock:
+            if nbytes > self.budget_bytes:
+                return sound
+            if path in self._entries:
+                self._drop(path)
+            self._entries[path] = (signature, sound, nbytes)
+            self.bytes_used += nbytes
+            while self.bytes_used > self.budget_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+        return sound
+
+    def warm(self, path: str):
+        """Make sure path is decoded and cached"""
+        self.get(path)
+
+    def __contains__(self, path: str) -> bool:
+        with self._lock:
+            return path in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        """Drop every cached asset"""
+        with self._lock:
+            self._entries.clear()
+            self.bytes_used = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters and memory usage"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes_used": self.bytes_used,
+                "budget_bytes": self.budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def summary(self) -> str:
+        """One-line human readable view of stats()"""
+        s = self.stats()
+        return (
+            f"{s['entries']} assets, {s['bytes_used'] / 1048576:.1f}/{s['budget_bytes'] / 1048576:.0f} MB, "
+            f"{s['hits']} hits, {s['misses']} misses, {s['evictions']} evictions"
+        )
@@ -0,0 +1,261 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from startup import cache_dir
+
+MANIFEST_VERSION = 1
+
+# MPEG audio frame header tables, indexed by version id (0 = 2.5, 2 = 2, 3 = 1) and layer (1 = III ... 3 = I)
+MPEG_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+MPEG1_BITRATES = {
+    3: (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    2: (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+}
+MPEG2_BITRATES = {
+    3: (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    1: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+# Trailing tags that may follow the last audio frame
+MP3_TRAILERS = (b"TAG", b"APETAGEX", b"LYRICSBEGIN")
+
+
+def _mp3_frame(data: bytes, pos: int) -> Optional[Tuple[int, int, int, int]]:
+    """(frame length, sample rate, channels, samples per frame) of the frame at pos, or None"""
+    b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+    if data[pos] != 0xFF or b1 & 0xE0 != 0xE0:
+        return None
+    version, layer = (b1 >> 3) & 3, (b1 >> 1) & 3
+    bitrate_index, rate_index = b2 >> 4, (b2 >> 2) & 3
+    if version == 1 or layer == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    rate = MPEG_SAMPLE_RATES[version][rate_index]
+    bitrate = (MPEG1_BITRATES if version == 3 else MPEG2_BITRATES)[layer][bitrate_index] * 1000
+    padding = (b2 >> 1) & 1
+    channels = 1 if b3 >> 6 == 3 else 2
+    if layer == 3:
+        return (12 * bitrate // rate + padding) * 4, rate, channels, 384
+    if layer == 1 and version != 3:
+        return 72 * bitrate // rate + padding, rate, channels, 576
+    return 144 * bitrate // rate + padding, rate, channels, 1152
+
+
+def probe_mp3(data: bytes) -> Dict:
+    """Walk every MPEG frame header; raises ValueError on a corrupt or truncated stream"""
+    pos = 0
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        pos = 10 + size + (10 if data[5] & 0x10 else 0)
+
+    end = len(data)
+    if end >= 128 and data[-128:-125] == b"TAG":
+        end -= 128
+
+    frames = samples = 0
+    rate = channels = None
+    search_limit = pos + 65536
+    while pos + 4 <= end:
+        frame = _mp3_frame(data, pos)
+        if frame is None:
+            if frames:
+                if data[pos:end].startswith(MP3_TRAILERS):
+                    break
+                raise ValueError(f"lost MPEG frame sync at byte {pos} after {frames} frames")
+            if pos > search_limit:
+                break
+            pos += 1  # padding or junk before the first frame
+            continue
+
+        length, rate, channels, per_frame = frame
+        if pos + length > end:
+            raise ValueError(f"truncated: frame {frames + 1} needs {length} bytes, {end - pos} left")
+        frames += 1
+        samples += per_frame
+        pos += length
+
+    if not frames:
+        raise ValueError("no MPEG audio frames found")
+    return {"codec": "mp3", "sample_rate": rate, "channels": channels, "duration": samples / rate}
+
+
+def probe_wav(data: bytes) -> Dict:
+    """Read the RIFF fmt and data chunks; raises ValueError on a malformed or truncated file"""
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError("not a RIFF/WAVE file")
+
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id, size = struct.unpack_from("<4sI", data, pos)
+        body = pos + 8
+        if chunk_id == b"fmt ":
+            if size < 16:
+                raise ValueError("fmt chunk too short")
+            fmt = struct.unpack_from("<HHIIHH", data, body)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("data chunk before fmt chunk")
+            available = len(data) - body
+            if available < size:
+                raise ValueError(f"truncated: data chunk declares {size} bytes, {available} present")
+            _, channels, rate, _, block_align, bits = fmt
+            if not channels or not rate or not block_align:
+                raise ValueError("invalid fmt chunk")
+            # Not the header's byte rate: some exports (scarborough/audio) get it wrong
+            return {"codec": f"wav/pcm{bits}" if fmt[0] == 1 else f"wav/{fmt[0]:#x}",
+                    "sample_rate": rate, "channels": channels, "duration": size / (rate * block_align)}
+        pos = body + size + (size & 1)
+
+    raise ValueError("no data chunk")
+
+
+def probe_asset(path: str) -> Dict:
+    """Stat, hash and header-probe one audio file; runs in the worker processes"""
+    record = {"path": path}
+    try:
+        st = os.stat(path)
+        with open(path, "rb") as f:
+            data = f.read()
+        record.update(size=st.st_size, mtime_ns=st.st_mtime_ns, sha256=hashlib.sha256(data).hexdigest())
+        if data[:4] == b"RIFF":
+            record.update(probe_wav(data))
+        else:
+            record.update(probe_mp3(data))
+        record["error"] = None
+    except (OSError, ValueError, IndexError, struct.error) as e:
+        record["error"] = str(e) or type(e).__name__
+    return record
+
+
+class AssetManifest:
+    """Validated facts about every referenced audio file, persisted between starts
+
+    Files whose size and mtime match the stored record are not read again;
+    everything else is hashed and probed, across a process pool when there
+    is enough to do.
+    """
+
+    def __init__(self, path: Optional[str] = None, workers: Optional[int] = None):
+        self.path = path or os.path.join(cache_dir(), "asset_manifest.json")
+        self.workers = workers or os.cpu_count() or 1
+        self.records: Dict[str, Dict] = {}
+        # Outcome of the last validate() call
+        self.reused = 0
+        self.probed = 0
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                stored = json.load(f)
+            if stored.get("version") == MANIFEST_VERSION:
+                self.records = stored["assets"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _unchanged(self, path: str) -> Optional[Dict]:
+        record = self.records.get(os.path.realpath(path))
+        if record is None:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if (st.st_size, st.st_mtime_ns) != (record.get("size"), record.get("mtime_ns")):
+            return None
+        return record
+
+    def validate(self, paths: Iterable[str], parallel: bool = True) -> Tuple[Dict[str, Dict], List[Tuple[str, str]]]:
+        """Check every distinct path; returns (records by path, [(path, problem)])
+
+        Workers are spawned, not forked, so this is safe after the mixer and
+        other threads have started. parallel=False probes in this process.
+        """
+        paths = list(dict.fromkeys(paths))
+        results: Dict[str, Dict] = {}
+        stale = []
+        for path in paths:
+            record = self._unchanged(path)
+            if record is None:
+                stale.append(path)
+            else:
+                results[path] = record
+        self.reused = len(results)
+
+        if parallel and len(stale) > 1 and self.workers > 1:
+            workers = min(self.workers, len(stale))
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                probed = list(pool.map(probe_asset, stale, chunksize=max(1, len(stale) // (workers * 4))))
+        else:
+            probed = [probe_asset(path) for path in stale]
+        self.probed = len(probed)
+
+        for record in probed:
+            results[record["path"]] = record
+            if "size" in record:
+                self.records[os.path.realpath(record["path"])] = record
+        if probed:
+            self.save()
+
+        problems = [(path, results[path]["error"]) for path in paths if results[path]["error"]]
+        return results, problems
+
+    def check(self, paths: Iterable[str], parallel: bool = True, quiet: bool = False) -> Dict[str, Dict]:
+        """validate() for startup and reloads: prints problems (unless quiet) and raises on the first one"""
+        start = time.perf_counter()
+        records, problems = self.validate(paths, parallel)
+        for path, problem in problems:
+            if not os.path.exists(path):
+                if not quiet:
+                    print(f"✗ Audio file not found: {path}")
+                raise FileNotFoundError(f"Audio file not found: {path}")
+            if not quiet:
+                print(f"✗ Audio file failed validation: {path} ({problem})")
+        if problems:
+            raise ValueError(f"Audio file failed validation: {problems[0][0]} ({problems[0][1]})")
+
+        if not quiet:
+            print(
+                f"✓ {len(records)} audio files validated ({self.reused} unchanged, {self.probed} probed) "
+                f"in {(time.perf_counter() - start) * 1000:.1f} ms"
+            )
+        return records
+
+    def save(self):
+        """Write the manifest atomically; failures only cost a re-probe next start"""
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": MANIFEST_VERSION, "saved_at": time.time(), "assets": self.records}, f,
+                          indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Validate audio files and update the asset manifest")
+    parser.add_argument("paths", nargs="+", help="audio files to validate")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--manifest", help="manifest file (default: ~/.cache/audioengine/asset_manifest.json)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    manifest = AssetManifest(args.manifest, args.workers)
+    records, problems = manifest.validate(args.paths)
+    for path, record in records.items():
+        if record["error"]:
+            print(f"✗ {path}: {record['error']}")
+        else:
+            print(f"✓ {path}: {record['codec']}, {record['sample_rate']} Hz, {record['channels']} ch, "
+                  f"{record['duration']:.2f} s")
+    print(f"\n{len(records)} files, {manifest.reused} unchanged, {manifest.probed} probed, "
+          f"{len(problems)} problems in {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,275 @@
+# Imported first so SDL never installs its signal handlers
+from startup import import_pygame
+
+import asyncio
+import contextlib
+import math
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from announce_engine import AnnouncementEngine
+from asset_build import MIXER_CHANNELS, MIXER_SIZE
+from asset_cache import AssetCache
+from media_control import MediaController
+from timer_core import TimerCore, TimerEntry
+
+STAGES = ("timer", "play", "output", "total")
+
+
+class IdleMedia(MediaController):
+    """A player that is never playing, so announcements skip pause and resume"""
+
+    name = "idle"
+
+    def is_playing(self) -> bool:
+        return False
+
+    def pause(self) -> bool:
+        return True
+
+    def play(self) -> bool:
+        return True
+
+
+def lead_in_frames(raw: bytes, frame_bytes: int) -> int:
+    """Frames of exact digital silence before the first sample of a decoded clip"""
+    return (len(raw) - len(raw.lstrip(b"\0"))) // frame_bytes
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class OutputWatcher:
+    """Tails the disk driver's output file and timestamps the first non-silent sample after arm()"""
+
+    def __init__(self, path: str, frequency: int, frame_bytes: int, poll: float = 0.0002):
+        self.path = path
+        self.frequency = frequency
+        self.frame_bytes = frame_bytes
+        self.poll = poll
+        self._armed: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = None
+        self._lock = threading.Lock()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="output-watcher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._thread.join(timeout=2)
+
+    def arm(self) -> asyncio.Future:
+        """Future resolved with the monotonic time the next non-silent sample was written"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            self._armed = (loop, future)
+        return future
+
+    def _run(self):
+        while not os.path.exists(self.path):
+            time.sleep(self.poll)
+        with open(self.path, "rb") as f:
+            while self._running:
+                chunk = f.read()
+                seen = time.monotonic()
+                if not chunk:
+                    time.sleep(self.poll)
+                    continue
+                with self._lock:
+                    armed = self._armed
+                    if armed is None:
+                        continue
+                    silent = len(chunk) - len(chunk.lstrip(b"\0"))
+                    if silent == len(chunk):
+                        continue
+                    self._armed = None
+                # The chunk was written when we saw it; later samples in it play after the earlier ones
+                written = seen + (silent // self.frame_bytes) / self.frequency
+                loop, future = armed
+                loop.call_soon_threadsafe(self._resolve, future, written)
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, written: float):
+        if not future.done():
+            future.set_result(written)
+
+
+class LatencyRun:
+    """Every asset fired `iterations` times through one mixer configuration
+
+    Runs the real timer -> announcement engine -> mixer path on SDL's "disk"
+    audio driver, which writes the mixed output to a file in real time, one
+    device buffer per write. An OutputWatcher timestamps the first non-silent
+    sample of each announcement; the asset's own lead-in silence is
+    subtracted, so the stages are:
+
+        timer    scheduled instant -> on_fire callback
+        play     on_fire callback  -> channel.play() returned
+        output   channel.play()    -> first sample written by the device
+        total    scheduled instant -> first sample written by the device
+
+    The disk driver has no hardware queue; real devices add their own fixed
+    output latency on top.
+    """
+
+    def __init__(self, assets: List[str], frequency: int, buffer: int, iterations: int):
+        self.assets = assets
+        self.frequency = frequency
+        self.buffer = buffer
+        self.iterations = iterations
+        self.samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        self.by_asset: Dict[str, List[float]] = {asset: [] for asset in assets}
+        self.missed = 0
+
+    def run(self, output_dir: str) -> Dict[str, List[float]]:
+        pygame = import_pygame()
+        path = os.path.join(output_dir, f"out-{self.frequency}-{self.buffer}.raw")
+        os.environ["SDL_AUDIODRIVER"] = "disk"
+        os.environ["SDL_DISKAUDIOFILE"] = path
+        pygame.mixer.init(frequency=self.frequency, size=MIXER_SIZE, channels=MIXER_CHANNELS, buffer=self.buffer)
+        try:
+            frequency, size, channels = pygame.mixer.get_init()
+            self.frequency = frequency
+            frame_bytes = channels * abs(size) // 8
+
+            # Warm like the prefetcher does, so every trigger is a cache hit
+            assets = AssetCache(budget_bytes=1 << 30)
+            self.lead_in = {}
+            for asset in self.assets:
+                self.lead_in[asset] = lead_in_frames(assets.get(asset).get_raw(), frame_bytes) / frequency
+
+            self.watcher = OutputWatcher(path, frequency, frame_bytes)
+            self.watcher.start()
+            engine = AnnouncementEngine(assets, IdleMedia())
+            self.timer = TimerCore({}, on_fire=self._on_fire, heartbeat_interval=None)
+            self.engine = engine
+
+            play = engine.events.play
+
+            def timed_play(sound, volume=None):
+                channel = play(sound, volume)
+                self._played = time.monotonic()
+                return channel
+
+            engine.events.play = timed_play
+            engine.events.start()
+            try:
+                asyncio.run(self._main())
+            finally:
+                engine.events.stop()
+                self.watcher.stop()
+        finally:
+            pygame.mixer.quit()
+            with contextlib.suppress(OSError):
+                os.unlink(path)
+        return self.samples
+
+    def _on_fire(self, entry: TimerEntry):
+        self._fired = time.monotonic()
+        return self.engine.announce(entry.audio_file)
+
+    async def _main(self):
+        import pygame
+
+        timer_task = asyncio.ensure_future(self.timer.run_async())
+        # Long enough for the previous clip's last buffers to drain to silence
+        settle = max(0.05, 3 * self.buffer / self.frequency)
+        try:
+            for _ in range(self.iterations):
+                for asset in self.assets:
+                    await asyncio.sleep(settle)
+                    audible = self.watcher.arm()
+                    entry = self.timer.add_slot(datetime.now() + timedelta(seconds=settle), asset)
+                    try:
+                        written = await asyncio.wait_for(audible, settle + 2.0)
+                    except asyncio.TimeoutError:
+                        self.missed += 1
+                        continue
+                    finally:
+                        pygame.mixer.stop()
+                    start = written - self.lead_in[asset]
+                    self.samples["timer"].append(self._fired - entry.deadline)
+                    self.samples["play"].append(self._played - self._fired)
+                    self.samples["output"].append(start - self._played)
+                    self.samples["total"].append(start - entry.deadline)
+                    self.by_asset[asset].append(start - entry.deadline)
+        finally:
+            self.timer.stop()
+            await timer_task
+
+
+def format_percentiles(samples: List[float]) -> str:
+    if not samples:
+        return "-"
+    return " / ".join(f"{percentile(samples, p) * 1000:5.1f}" for p in (50, 95, 99))
+
+
+def print_table(runs: List[LatencyRun]):
+    """p50/p95/p99 of every stage, one row per mixer configuration"""
+    print("=" * 60)
+    print("TRIGGER-TO-AUDIBLE LATENCY (ms, p50 / p95 / p99)")
+    print("=" * 60)
+    header = f"{'frequency':>9} {'buffer':>6}  " + "  ".join(f"{stage:^20}" for stage in STAGES)
+    print(header)
+    print("-" * len(header))
+    for run in runs:
+        cells = [format_percentiles(run.samples[stage]) for stage in STAGES]
+        missed = f"  ({run.missed} missed)" if run.missed else ""
+        print(f"{run.frequency:>9} {run.buffer:>6}  " + "  ".join(f"{c:^20}" for c in cells) + missed)
+    print("=" * 60)
+
+
+def print_assets(runs: List[LatencyRun]):
+    """Total latency per asset, one column per mixer configuration"""
+    print("=" * 60)
+    print("TOTAL LATENCY PER ASSET (ms, p50 / p95 / p99)")
+    print("=" * 60)
+    width = max(len(os.path.basename(asset)) for asset in runs[0].assets)
+    print(f"{'':<{width}}  " + "  ".join(f"{f'{r.frequency}/{r.buffer}':^20}" for r in runs))
+    for asset in runs[0].assets:
+        cells = [format_percentiles(run.by_asset[asset]) for run in runs]
+        print(f"{os.path.basename(asset):<{width}}  " + "  ".join(f"{c:^20}" for c in cells))
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from venues import VENUES, load_venues, shared_assets
+
+    parser = argparse.ArgumentParser(
+        description="Measure scheduled instant to first output sample headlessly, across mixer settings",
+        epilog="e.g. python bench_latency.py --frequencies 44100 48000 --buffers 256 512 1024 2048",
+    )
+    parser.add_argument("assets", nargs="*", help="audio files to fire (default: every file the venue uses)")
+    parser.add_argument("--venue", default="default", choices=sorted(VENUES))
+    parser.add_argument("--frequencies", type=int, nargs="+", default=[22050, 44100, 48000])
+    parser.add_argument("--buffers", type=int, nargs="+", default=[256, 512, 1024, 2048, 4096])
+    parser.add_argument("--iterations", type=int, default=5, help="triggers per asset and configuration")
+    parser.add_argument("--per-asset", action="store_true", help="also print total latency for each asset")
+    args = parser.parse_args()
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    assets = args.assets or sorted(shared_assets(load_venues([args.venue])))
+    runs = []
+    with tempfile.TemporaryDirectory(prefix="audioengine-latency-") as output_dir:
+        for frequency in args.frequencies:
+            for buffer in args.buffers:
+                print(f"• {frequency} Hz, {buffer} frame buffer: {len(assets)} assets x {args.iterations}")
+                run = LatencyRun(assets, frequency, buffer, args.iterations)
+                run.run(output_dir)
+                runs.append(run)
+    print()
+    print_table(runs)
+    if args.per_asset:
+        print()
+        print_assets(runs)
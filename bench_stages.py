@@ -0,0 +1,319 @@
+# Imported first so SDL never installs its signal handlers
+from startup import import_pygame
+
+import array
+import asyncio
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+import wave
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from bench_latency import percentile
+
+BENCH_VERSION = 1
+STAGES = (
+    "status", "pause", "pause confirm", "load", "play start", "playback",
+    "resume", "resume confirm", "overhead", "total",
+)
+COMMANDS = ("status", "pause", "play", "list")
+
+PLAYERCTL_STUB = """#!{bash}
+# Stand-in for playerctl; player state lives in {state}
+case "$1" in
+    status) delay={status_delay}; fail={status_fail} ;;
+    pause) delay={pause_delay}; fail={pause_fail} ;;
+    play) delay={play_delay}; fail={play_fail} ;;
+    *) exit 0 ;;
+esac
+[ "$delay" = 0 ] || sleep "$delay"
+[ "$fail" -gt 0 ] && [ $((RANDOM % 10000)) -lt "$fail" ] && exit 1
+case "$1" in
+    status) read -r state < "{state}"; echo "$state" ;;
+    pause) echo Paused > "{state}" ;;
+    play) echo Playing > "{state}" ;;
+esac
+exit 0
+"""
+
+PACTL_STUB = """#!{bash}
+# Stand-in for pactl with one sink input that is corked while the player is paused
+case "$1" in
+    list)
+        [ "{list_delay}" = 0 ] || sleep "{list_delay}"
+        [ "{list_fail}" -gt 0 ] && [ $((RANDOM % 10000)) -lt "{list_fail}" ] && exit 1
+        read -r state < "{state}"
+        [ "$state" = Paused ] && corked=yes || corked=no
+        printf 'Sink Input #1\\n\\tCorked: %s\\n\\tProperties:\\n\\t\\tapplication.name = "bench-player"\\n' "$corked" ;;
+    subscribe) exec sleep infinity ;;
+esac
+exit 0
+"""
+
+
+def write_stubs(directory: str, delays: Dict[str, float], failures: Dict[str, float]) -> str:
+    """Write playerctl and pactl stubs into directory; returns the player state file
+
+    Delays are seconds per command, failures the probability a command exits 1
+    without doing anything. bash rather than Python, so the stubs cost about
+    what a real playerctl fork does.
+    """
+    bash = shutil.which("bash")
+    if not bash:
+        raise SystemError("bash is needed for the stub players")
+    state = os.path.join(directory, "player-state")
+    fields = {"bash": bash, "state": state}
+    for command in COMMANDS:
+        fields[f"{command}_delay"] = repr(delays.get(command, 0.0)) if delays.get(command) else "0"
+        fields[f"{command}_fail"] = int(failures.get(command, 0.0) * 10000)
+
+    for name, template in (("playerctl", PLAYERCTL_STUB), ("pactl", PACTL_STUB)):
+        path = os.path.join(directory, name)
+        with open(path, "w") as f:
+            f.write(template.format(**fields))
+        os.chmod(path, 0o755)
+    return state
+
+
+def write_tone(path: str, seconds: float = 0.05, frequency: int = 44100):
+    """A short stereo 440 Hz clip, so playback does not dominate the run time"""
+    samples = array.array("h")
+    for i in range(int(seconds * frequency)):
+        value = int(8000 * math.sin(2 * math.pi * 440 * i / frequency))
+        samples.extend((value, value))
+    with wave.open(path, "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(frequency)
+        f.writeframes(samples.tobytes())
+
+
+class StageTimer:
+    """Wraps the scheduler's collaborators so each call adds its wall time to a stage"""
+
+    def __init__(self):
+        self.current: Dict[str, float] = {}
+        self.samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        # confirm_state polls is_playing_async; those polls belong to the confirm stage
+        self._confirming = False
+
+    def add(self, stage: str, seconds: float):
+        self.current[stage] = self.current.get(stage, 0.0) + seconds
+
+    def commit(self):
+        """Close one iteration; stages that did not run this time are not recorded"""
+        for stage, seconds in self.current.items():
+            self.samples[stage].append(seconds)
+        self.current = {}
+
+    def sync(self, stage: str, fn: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+
+        return timed
+
+    def coroutine(self, stage: str, fn: Callable) -> Callable:
+        async def timed(*args, **kwargs):
+            if stage == "status" and self._confirming:
+                return await fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+
+        return timed
+
+    def confirm(self, fn: Callable) -> Callable:
+        async def timed(playing: bool, stage: str):
+            self._confirming = True
+            start = time.perf_counter()
+            try:
+                return await fn(playing, stage)
+            finally:
+                self._confirming = False
+                self.add(f"{stage} confirm", time.perf_counter() - start)
+
+        return timed
+
+    def instrument(self, scheduler):
+        """Time every stage of AudioScheduler.play_scheduled_audio"""
+        media, engine = scheduler.media, scheduler.engine
+        media.is_playing_async = self.coroutine("status", media.is_playing_async)
+        media.pause_async = self.coroutine("pause", media.pause_async)
+        media.play_async = self.coroutine("resume", media.play_async)
+        media.confirm_state = self.confirm(media.confirm_state)
+        scheduler.assets.get = self.sync("load", scheduler.assets.get)
+        engine.events.play = self.sync("play start", engine.events.play)
+        engine.events.wait_end = self.coroutine("playback", engine.events.wait_end)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """count, mean, p50, p95, p99 and max seconds per stage"""
+        summary = {}
+        for stage, samples in self.samples.items():
+            if samples:
+                summary[stage] = {
+                    "count": len(samples),
+                    "mean": sum(samples) / len(samples),
+                    "p50": percentile(samples, 50),
+                    "p95": percentile(samples, 95),
+                    "p99": percentile(samples, 99),
+                    "max": max(samples),
+                }
+        return summary
+
+
+async def run_iterations(scheduler, stages: StageTimer, audio_file: str, state: str, iterations: int,
+                         playing: bool, cold: bool):
+    for _ in range(iterations):
+        with open(state, "w") as f:
+            f.write("Playing\n" if playing else "Paused\n")
+        if cold:
+            scheduler.assets.clear()
+        start = time.perf_counter()
+        await scheduler.play_scheduled_audio(audio_file)
+        total = time.perf_counter() - start
+        stages.add("total", total)
+        stages.add("overhead", total - stages.current.get("playback", 0.0))
+        stages.commit()
+
+
+def git_revision() -> Optional[str]:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                timeout=2, cwd=os.path.dirname(os.path.abspath(__file__)))
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout.strip() or None
+
+
+def print_summary(summary: Dict[str, Dict[str, float]], previous: Optional[Dict] = None):
+    print("=" * 60)
+    print("ANNOUNCEMENT STAGES (ms)")
+    print("=" * 60)
+    header = f"{'stage':<15} {'count':>5} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+    if previous:
+        header += f" {'p50 was':>8} {'change':>8}"
+    print(header)
+    print("-" * len(header))
+    for stage in STAGES:
+        s = summary.get(stage)
+        if s is None:
+            continue
+        line = f"{stage:<15} {s['count']:>5} " + " ".join(
+            f"{s[k] * 1000:>8.1f}" for k in ("mean", "p50", "p95", "p99", "max")
+        )
+        before = (previous or {}).get(stage)
+        if before:
+            change = (s["p50"] - before["p50"]) / before["p50"] * 100 if before["p50"] else 0.0
+            line += f" {before['p50'] * 1000:>8.1f} {change:>+7.0f}%"
+        print(line)
+    print("=" * 60)
+
+
+def parse_pairs(pairs: List[str], name: str) -> Dict[str, float]:
+    """["pause=0.05", ...] -> {"pause": 0.05}"""
+    values = {}
+    for pair in pairs:
+        command, _, value = pair.partition("=")
+        if command not in COMMANDS or not value:
+            raise SystemExit(f"--{name} expects COMMAND=VALUE with COMMAND one of {', '.join(COMMANDS)}")
+        values[command] = float(value)
+    return values
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Time each stage of play_scheduled_audio against stub playerctl/pactl and the SDL dummy driver",
+        epilog="e.g. python bench_stages.py --delay status=0.01 --delay pause=0.03 --fail play=0.05",
+    )
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--asset", help="audio file to announce (default: a generated 50 ms tone)")
+    parser.add_argument("--delay", action="append", default=[], metavar="COMMAND=SECONDS",
+                        help=f"stub delay per command ({', '.join(COMMANDS)})")
+    parser.add_argument("--fail", action="append", default=[], metavar="COMMAND=RATE",
+                        help="probability a stub command fails, 0..1")
+    parser.add_argument("--idle", action="store_true", help="no media playing, so no pause/resume")
+    parser.add_argument("--cold", action="store_true", help="clear the asset cache before every announcement")
+    parser.add_argument("--json", help="where to save the results (default: bench_results/stages-<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare p50s with")
+    args = parser.parse_args()
+
+    delays, failures = parse_pairs(args.delay, "delay"), parse_pairs(args.fail, "fail")
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+    with tempfile.TemporaryDirectory(prefix="audioengine-stages-") as stub_dir:
+        state = write_stubs(stub_dir, delays, failures)
+        os.environ["PATH"] = stub_dir + os.pathsep + os.environ.get("PATH", "")
+        # Probe results for the stubs, the manifest and latency samples must not reach the real cache
+        os.environ["XDG_CACHE_HOME"] = os.path.join(stub_dir, "cache")
+        audio_file = args.asset
+        if audio_file is None:
+            audio_file = os.path.join(stub_dir, "tone.wav")
+            write_tone(audio_file)
+
+        from main_linux import AudioScheduler
+
+        print(f"• Starting the scheduler against stubs in {stub_dir}")
+        with contextlib.redirect_stdout(io.StringIO()):
+            scheduler = AudioScheduler(media_backend="playerctl")
+        stages = StageTimer()
+        stages.instrument(scheduler)
+
+        print(f"• {args.iterations} announcements of {os.path.basename(audio_file)}")
+        scheduler.engine.events.start()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                asyncio.run(run_iterations(scheduler, stages, audio_file, state, args.iterations,
+                                           not args.idle, args.cold))
+        finally:
+            scheduler.engine.events.stop()
+            scheduler.media.stop()
+            import_pygame().mixer.quit()
+
+    summary = stages.summary()
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)["stages"]
+    print()
+    print_summary(summary, previous)
+
+    pygame = import_pygame()
+    results = {
+        "version": BENCH_VERSION,
+        "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "config": {
+            "iterations": args.iterations,
+            "asset": args.asset,
+            "delays": delays,
+            "failures": failures,
+            "media_playing": not args.idle,
+            "cold_cache": args.cold,
+        },
+        "stages": summary,
+        "samples": stages.samples,
+    }
+    path = args.json or os.path.join("bench_results", f"stages-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=1)
+    print(f"✓ Results saved to {path}")
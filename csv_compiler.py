@@ -0,0 +1,190 @@
+import csv
+import os
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from schedule_index import DAY_NAMES, ScheduleIndex, format_seconds, parse_time_str, read_schedule_literal
+
+# Booking-system colour names -> announcement files, per venue
+VENUES = {
+    "london": {
+        "asset_root": "AudioFiles/wristband",
+        "extension": ".mp3",
+        "aliases": {"mocha": "mocha.mp3", "teal": "teal.mp3"},
+        "output": "mapping_london.py",
+    },
+    "default": {
+        "asset_root": "AudioFiles/wristband",
+        "extension": ".mp3",
+        "aliases": {"teal": "aqua.mp3", "mocha": "brown.mp3"},
+        "output": "mapping.py",
+    },
+    "scarborough": {
+        "asset_root": "audio",
+        "extension": ".wav",
+        "aliases": {"teal": "aqua.wav", "mocha": "brown.wav"},
+        "output": None,
+    },
+}
+
+# Order the existing mapping files use
+OUTPUT_DAY_ORDER = ["sunday", "monday", "tuesday", "wednesday", "thursday", "friday", "saturday"]
+
+
+def parse_export_time(value: str) -> str:
+    """Normalise "1030", "930" or "10:30" to "HH:MM" (or "HH:MM:SS")"""
+    value = value.strip()
+    if ":" not in value:
+        value = value.zfill(4)
+        value = f"{value[:-2]}:{value[-2:]}"
+    return format_seconds(parse_time_str(value))
+
+
+def colour_asset(colour: str, venue: Dict) -> str:
+    """Map a colour name from the export to its audio file through the venue alias table"""
+    key = colour.strip().lower()
+    filename = venue["aliases"].get(key, f"{key}{venue['extension']}")
+    return f"{venue['asset_root']}/{filename}"
+
+
+def compile_rows(rows: Iterable[list], venue: Dict) -> Dict[str, Dict[str, str]]:
+    """Build a schedule mapping from CSV rows (header first) for every day column"""
+    rows = iter(rows)
+    header = next(rows)
+
+    columns: Dict[int, str] = {}
+    for i, name in enumerate(header[1:], 1):
+        day = name.strip().split(" ", 1)[0].lower()
+        if day not in DAY_NAMES:
+            raise ValueError(f"Unrecognised day column: {name!r}")
+        columns[i] = day
+
+    schedule: Dict[str, Dict[str, str]] = {day: {} for day in OUTPUT_DAY_ORDER}
+    for line, row in enumerate(rows, 2):
+        if not row or not row[0].strip():
+            continue
+        try:
+            time_str = parse_export_time(row[0])
+        except ValueError:
+            raise ValueError(f"Line {line}: invalid session time {row[0]!r}")
+        for i, day in columns.items():
+            if i < len(row) and row[i].strip():
+                schedule[day][time_str] = colour_asset(row[i], venue)
+
+    return schedule
+
+
+def compile_csv(path: str, venue: Dict) -> Dict[str, Dict[str, str]]:
+    """Stream a wristband schedule export into a schedule mapping"""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return compile_rows(csv.reader(f), venue)
+
+
+def merge_extras(schedule: Dict[str, Dict[str, str]], existing: Dict[str, Dict[str, str]], venue: Dict):
+    """Carry over slots that are not wristband calls (closing, glow...) from an existing mapping"""
+    root = venue["asset_root"].rstrip("/") + "/"
+    for day, slots in existing.items():
+        for time_str, audio_file in slots.items():
+            if not audio_file.startswith(root):
+                schedule.setdefault(day, {})[time_str] = audio_file
+
+
+def render_mapping(schedule: Dict[str, Dict[str, str]], name: str = "mapp") -> str:
+    """Python source for a mapping module in the same layout as mapping.py"""
+    lines = [f"{name} = {{"]
+    for day in OUTPUT_DAY_ORDER:
+        if day not in schedule:
+            continue
+        lines.append(f'    "{day}": {{')
+        for time_str in sorted(schedule[day], key=parse_time_str):
+            lines.append(f'        "{time_str}": "{schedule[day][time_str]}",')
+        lines.append("    },")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def write_schedule(schedule: Dict[str, Dict[str, str]], output: Optional[str], index_path: Optional[str]):
+    """Write the compiled schedule as a mapping module and/or a binary index, atomically"""
+    if output:
+        tmp = f"{output}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(render_mapping(schedule))
+        os.replace(tmp, output)
+    if index_path:
+        ScheduleIndex.write(schedule, index_path)
+
+
+def build(path: str, venue_name: str, output: Optional[str], index_path: Optional[str],
+          keep_extras: bool = True) -> Tuple[int, float]:
+    """Compile one export and write it; returns (slot count, elapsed seconds)"""
+    start = time.perf_counter()
+    venue = VENUES[venue_name]
+    schedule = compile_csv(path, venue)
+
+    if keep_extras and output and os.path.exists(output):
+        merge_extras(schedule, read_schedule_literal(output, "mapp"), venue)
+
+    missing = sorted({a for slots in schedule.values() for a in slots.values() if not os.path.exists(a)})
+    for audio_file in missing:
+        print(f"⚠ Audio file not found: {audio_file}")
+
+    write_schedule(schedule, output, index_path)
+    return sum(len(slots) for slots in schedule.values()), time.perf_counter() - start
+
+
+def watch(folder: str, venue_name: str, output: Optional[str], index_path: Optional[str],
+          interval: float = 2.0, keep_extras: bool = True):
+    """Recompile whenever a new or changed export appears in folder; newest export wins"""
+    seen: Dict[str, Tuple[int, int]] = {}
+    print(f"Watching {folder}/ for schedule exports - Press Ctrl+C to stop")
+
+    while True:
+        changed = []
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if not entry.name.lower().endswith(".csv") or not entry.is_file():
+                    continue
+                st = entry.stat()
+                signature = (st.st_mtime_ns, st.st_size)
+                if seen.get(entry.path) != signature:
+                    seen[entry.path] = signature
+                    changed.append((st.st_mtime_ns, entry.path))
+
+        if changed:
+            _, newest = max(changed)
+            try:
+                slots, elapsed = build(newest, venue_name, output, index_path, keep_extras)
+                print(f"✓ {os.path.basename(newest)} → {output or index_path}: "
+                      f"{slots} slots in {elapsed * 1000:.1f} ms")
+            except (ValueError, OSError) as e:
+                print(f"✗ Failed to compile {newest}: {e}")
+
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compile a wristband schedule CSV export into a schedule")
+    parser.add_argument("source", help="CSV export, or a folder to watch with --watch")
+    parser.add_argument("--venue", default="london", choices=sorted(VENUES))
+    parser.add_argument("--output", help="mapping module to write (defaults to the venue's mapping file)")
+    parser.add_argument("--index", help="also write a binary schedule index")
+    parser.add_argument("--no-extras", action="store_true",
+                        help="do not carry over closing/glow slots from the existing output")
+    parser.add_argument("--watch", action="store_true", help="keep watching the source folder for new exports")
+    parser.add_argument("--interval", type=float, default=2.0, help="watch polling interval in seconds")
+    args = parser.parse_args()
+
+    output = args.output or VENUES[args.venue]["output"]
+    if not output and not args.index:
+        parser.error(f"venue {args.venue} has no default mapping file; pass --output or --index")
+
+    if args.watch:
+        try:
+            watch(args.source, args.venue, output, args.index, args.interval, keep_extras=not args.no_extras)
+        except KeyboardInterrupt:
+            print("\nStopped watching")
+    else:
+        slots, elapsed = build(args.source, args.venue, output, args.index, keep_extras=not args.no_extras)
+        print(f"✓ Wrote {output or args.index}: {slots} slots in {elapsed * 1000:.1f} ms")
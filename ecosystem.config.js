@@ -3,11 +3,11 @@ module.exports = {
     {
       name: "announcements",
       script: "python",
-      args: "main_linux.py",
+      args: "main_linux.py --log-file announcements.jsonl --console-level warning", // Rotated JSON-lines events
       watch: false, // Change to true if you want to restart on file changes
       autorestart: true,
       max_restarts: 5,
-      restart_delay: 5000, // Delay restarts to prevent rapid loops
+      exp_backoff_restart_delay: 100, // Restart quickly, backing off (up to 15 s) if it keeps crashing
       error_file: "announcements-error.log", // Error logs
       out_file: "announcements-out.log", // Standard logs
       log_date_format: "YYYY-MM-DD HH:mm:ss",
@@ -0,0 +1,136 @@
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from datetime import datetime
+from typing import List, Optional
+
+log = logging.getLogger("audioengine")
+
+GLYPHS = {logging.DEBUG: "·", logging.INFO: "•", logging.WARNING: "⚠", logging.ERROR: "✗", logging.CRITICAL: "✗"}
+
+
+def event(name: str, level: int = logging.INFO, exc_info: bool = False, **fields):
+    """Log one structured event; returns immediately, the writer thread does the I/O"""
+    if log.isEnabledFor(level):
+        log.log(level, name, exc_info=exc_info, extra={"fields": fields})
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One compact JSON object per event"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "event": record.getMessage(),
+        }
+        data.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str, ensure_ascii=False, separators=(",", ":"))
+
+
+class ConsoleFormatter(logging.Formatter):
+    """[HH:MM:SS] ▶ event key=value ... for reading along in a terminal or the pm2 log"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", {})
+        glyph = fields.get("glyph") or GLYPHS.get(record.levelno, "•")
+        text = " ".join(f"{k}={v}" for k, v in fields.items() if k != "glyph" and v is not None)
+        line = f"[{datetime.fromtimestamp(record.created):%H:%M:%S}] {glyph} {record.getMessage()}"
+        if text:
+            line += f" {text}"
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never waits on a full queue: the event is dropped and counted instead"""
+
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Keep the record as is: formatting happens on the writer thread
+        return record
+
+
+class EventLog:
+    """Queue in front of the real handlers, drained by one background writer thread"""
+
+    def __init__(
+        self,
+        console: str = "console",
+        console_level: int = logging.INFO,
+        path: Optional[str] = None,
+        max_bytes: int = 10 * 1024 * 1024,
+        backups: int = 5,
+        queue_size: int = 10000,
+    ):
+        handlers: List[logging.Handler] = []
+        if console != "off":
+            stream = logging.StreamHandler(sys.stdout)
+            stream.setFormatter(JsonLinesFormatter() if console == "json" else ConsoleFormatter())
+            stream.setLevel(console_level)
+            handlers.append(stream)
+        if path:
+            rotating = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                            encoding="utf-8")
+            rotating.setFormatter(JsonLinesFormatter())
+            handlers.append(rotating)
+
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.handler = DroppingQueueHandler(self.queue)
+        self.listener = logging.handlers.QueueListener(self.queue, *handlers, respect_handler_level=True)
+
+    def start(self) -> "EventLog":
+        log.addHandler(self.handler)
+        log.setLevel(logging.DEBUG)
+        log.propagate = False
+        self.listener.start()
+        return self
+
+    def stop(self):
+        """Flush what is queued and stop the writer thread"""
+        log.removeHandler(self.handler)
+        self.listener.stop()
+
+    @property
+    def dropped(self) -> int:
+        return self.handler.dropped
+
+
+def add_arguments(parser):
+    """The logging options shared by the scheduler entry points"""
+    parser.add_argument("--log-format", choices=("console", "json", "off"), default="console",
+                        help="what to write to stdout (default: readable one-line events)")
+    parser.add_argument("--console-level", choices=("debug", "info", "warning", "error"), default="info")
+    parser.add_argument("--log-file", help="also write JSON-lines events to this file, rotated by size")
+    parser.add_argument("--log-max-mb", type=float, default=10.0, help="rotate the log file at this size")
+    parser.add_argument("--log-backups", type=int, default=5, help="rotated log files to keep")
+
+
+def from_arguments(args) -> EventLog:
+    return EventLog(
+        console=args.log_format,
+        console_level=getattr(logging, args.console_level.upper()),
+        path=args.log_file,
+        max_bytes=int(args.log_max_mb * 1024 * 1024),
+        backups=args.log_backups,
+    ).start()
+
+
+def elapsed_ms(start: float) -> float:
+    """Milliseconds since a time.monotonic() value, rounded for logging"""
+    return round((time.monotonic() - start) * 1000, 1)
@@ -1,36 +1,146 @@
-import subprocess
+# Imported first so the startup profile also covers the module imports below
+from startup import ProbeCache, StartupProfile, import_pygame
+
+import importlib
+import logging
+import shutil
+import signal
 import time
 import os
 from datetime import datetime
-
-import pygame
-import schedule
-
-from mapping import mapp
+from typing import Callable, Optional
+
+from announce_engine import AnnouncementEngine, Overlap
+from asset_build import MIXER_BUFFER, MIXER_CHANNELS, MIXER_FREQUENCY, MIXER_SIZE, AssetBuild
+from asset_cache import AssetCache
+from asset_manifest import AssetManifest
+import event_log
+from event_log import event
+import mapping
+from media_control import create_media_controller
+from pcm_store import SharedPcmCache
+from pipeline_latency import PipelineLatency
+from prefetch import Prefetcher
+from schedule_index import ScheduleIndex
+from timer_core import CatchUp, TimerCore, TimerEntry, VirtualClock
+
+
+def create_timer(
+    index: ScheduleIndex,
+    on_fire: Callable[[TimerEntry], object],
+    on_rollover: Optional[Callable[[str, str], None]] = None,
+    on_heartbeat: Optional[Callable[[int], None]] = None,
+    on_prefetch: Optional[Callable[[list], None]] = None,
+    prefetch_lead: float = 120.0,
+    prefetch_count: int = 3,
+    slot_lead: float = 0.0,
+    catch_up: Optional[CatchUp] = None,
+    clock: Optional[VirtualClock] = None,
+) -> TimerCore:
+    """The scheduler's timer; --simulate builds it here too, on a virtual clock with a null sink"""
+    return TimerCore(
+        index,
+        on_fire=on_fire,
+        on_rollover=on_rollover,
+        on_heartbeat=on_heartbeat,
+        on_prefetch=on_prefetch,
+        prefetch_lead=prefetch_lead,
+        prefetch_count=prefetch_count,
+        slot_lead=slot_lead,
+        # The engine's playback workers order announcements themselves
+        ordered=False,
+        catch_up={None: catch_up or CatchUp()},
+        clock=clock,
+    )
 
 
 class AudioScheduler:
-    def __init__(self):
+    def __init__(
+        self,
+        asset_cache_mb: int = 64,
+        prefetch_lead: float = 120.0,
+        prefetch_count: int = 3,
+        media_backend: str = "playerctl",
+        shared_cache_dir: Optional[str] = None,
+        profile: Optional[StartupProfile] = None,
+        start_tolerance: float = 0.02,
+        catch_up: Optional[CatchUp] = None,
+        overlap: Optional[Overlap] = None,
+        hold_window: float = 120.0,
+    ):
+        self.profile = profile or StartupProfile()
+        # Dependency and backend probe results survive pm2 restarts
+        self.probes = ProbeCache()
+        # Probed audio files; unchanged ones are not read again on the next start
+        self.manifest = AssetManifest()
+
         print("=" * 60)
         print("AUDIO SCHEDULER - INITIALIZATION")
         print("=" * 60)
 
+        self.schedule_dict = mapping.mapp
+        self.mapping_mtime = os.stat(mapping.__file__).st_mtime_ns
+        self.valid_days = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+        print("\nValidating schedule and audio files...")
+        with self.profile.phase("compile and validate schedule"):
+            self.validate_schedule()
+
         print("\nInitializing pygame mixer...")
         try:
-            pygame.mixer.init()
+            with self.profile.phase("import pygame"):
+                pygame = import_pygame()
+            with self.profile.phase("mixer init"):
+                pygame.mixer.init(frequency=MIXER_FREQUENCY, size=MIXER_SIZE, channels=MIXER_CHANNELS,
+                                  buffer=MIXER_BUFFER)
             print("✓ Pygame mixer initialized successfully")
         except Exception as e:
             print(f"✗ Failed to initialize pygame mixer: {e}")
             raise
 
-        self.schedule_dict = mapp
-        self.valid_days = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
-
-        print("\nValidating schedule and audio files...")
-        self.validate_schedule()
+        # Files converted ahead of time by asset_build.py load without decoding
+        self.build = AssetBuild.for_mixer()
+        self.report_build()
 
-        print("\nChecking system dependencies...")
-        self.check_dependencies()
+        if shared_cache_dir:
+            # Decoded once per machine and mapped by every scheduler process
+            self.assets = SharedPcmCache(shared_cache_dir, loader=self.build.load)
+            with self.profile.phase("shared cache collect"):
+                removed = self.assets.collect()
+            print(f"✓ Shared PCM cache: {self.assets.cache_dir} ({removed} stale entries removed)")
+        else:
+            # Decoded announcements stay in memory between triggers
+            self.assets = AssetCache(budget_bytes=asset_cache_mb * 1024 * 1024, loader=self.build.load)
+        self.prefetcher = Prefetcher(self.assets)
+        # Measured preparation time per media backend, so announcements start on the second
+        self.latency = PipelineLatency(tolerance=start_tolerance)
+
+        self.timer = create_timer(
+            self.index,
+            on_fire=lambda entry: self.play_scheduled_audio(entry.audio_file, entry.due),
+            on_rollover=self.on_day_changed,
+            on_heartbeat=self.on_heartbeat,
+            on_prefetch=self.prefetcher.prefetch,
+            prefetch_lead=prefetch_lead,
+            prefetch_count=prefetch_count,
+            slot_lead=self.latency.cap,
+            catch_up=catch_up,
+        )
+
+        print("\nConnecting media controller...")
+        with self.profile.phase("media controller"):
+            self.media = create_media_controller(media_backend, self.probes)
+        print(f"✓ Media backend: {self.media.name}")
+        self.engine = AnnouncementEngine(self.assets, self.media, self.latency,
+                                         output_latency=MIXER_BUFFER / MIXER_FREQUENCY,
+                                         overlap={None: overlap or Overlap()},
+                                         hold_window=hold_window, next_due=self.next_due)
+        self.engine.add_signal_handler(signal.SIGHUP, lambda: self.reload_schedule("SIGHUP"))
+
+        if self.media.name == "playerctl":
+            print("\nChecking system dependencies...")
+            with self.profile.phase("dependency check"):
+                self.check_dependencies()
 
         print("\n✓ Initialization complete")
         print("=" * 60)
@@ -38,147 +148,74 @@ class AudioScheduler:
     def check_dependencies(self):
         """Check if required system tools are installed"""
         print("Checking for playerctl...")
-        try:
-            result = subprocess.run(["which", "playerctl"], check=True, capture_output=True, timeout=2)
-            playerctl_path = result.stdout.decode().strip()
-            print(f"✓ playerctl found: {playerctl_path}")
-        except subprocess.CalledProcessError:
+        # PATH lookup in-process instead of forking `which`; a cached hit is re-checked with one stat
+        search_path = os.environ.get("PATH", "")
+        playerctl_path = self.probes.probe("playerctl", search_path, lambda: shutil.which("playerctl"))
+        if playerctl_path and not os.access(playerctl_path, os.X_OK):
+            playerctl_path = shutil.which("playerctl")
+            self.probes.put("playerctl", search_path, playerctl_path)
+        if not playerctl_path:
             print("✗ playerctl not found")
             raise SystemError("playerctl not installed. Install with: sudo apt-get install playerctl")
-        except subprocess.TimeoutExpired:
-            print("✗ playerctl check timed out")
-            raise SystemError("Failed to check for playerctl")
+        print(f"✓ playerctl found: {playerctl_path}")
 
     def validate_schedule(self):
-        """Validate schedule configuration"""
-        total_files = 0
-        days_validated = 0
-
-        for day in self.schedule_dict.keys():
-            if day.lower() not in self.valid_days:
-                print(f"✗ Invalid day: {day}")
-                raise ValueError(f"Invalid day: {day}")
-
-            time_slots = 0
-            for time_str, audio_file in self.schedule_dict[day].items():
-                try:
-                    hour, minute = map(int, time_str.split(":"))
-                    if not (0 <= hour <= 23 and 0 <= minute <= 59):
-                        print(f"✗ Invalid time: {time_str}")
-                        raise ValueError(f"Invalid time: {time_str}")
-                except ValueError:
-                    print(f"✗ Invalid time format for {day}: {time_str}")
-                    raise ValueError(f"Invalid time format for {day}: {time_str}. Use HH:MM")
-
-                if not os.path.exists(audio_file):
-                    print(f"✗ Audio file not found: {audio_file}")
-                    raise FileNotFoundError(f"Audio file not found: {audio_file}")
-
-                time_slots += 1
-                total_files += 1
+        """Validate schedule configuration and compile it into a schedule index"""
+        try:
+            # Parses every "HH:MM" once; later lookups bisect the compiled arrays
+            self.index = ScheduleIndex.from_mapping(self.schedule_dict)
+        except ValueError as e:
+            print(f"✗ {e}")
+            raise
 
-            days_validated += 1
-            print(f"✓ {day.capitalize()}: {time_slots} time slots validated")
+        self.manifest.check(self.index.assets)
 
-        print(f"\n✓ Validated {days_validated} days with {total_files} total scheduled audio files")
+        for day in self.schedule_dict.keys():
+            print(f"✓ {day.capitalize()}: {self.index.day_count(day.lower())} time slots validated")
+
+        print(
+            f"\n✓ Validated {len(self.schedule_dict)} days with {len(self.index.seconds)} total "
+            f"scheduled audio files ({len(self.index.assets)} distinct)"
+        )
+
+    def report_build(self):
+        """Say how much of the schedule will load from prebuilt files"""
+        built, total = self.build.coverage(self.index.assets)
+        if built == total:
+            print(f"✓ All {total} audio files prebuilt in {self.build.root}")
+        else:
+            print(f"⚠ {built}/{total} audio files prebuilt in {self.build.root}; "
+                  "the rest are decoded at load time (run: python asset_build.py)")
 
     def check_media_playing(self):
         """Check if media is currently playing"""
-        try:
-            result = subprocess.run(
-                ["playerctl", "status"],
-                capture_output=True,
-                text=True,
-                timeout=1
-            )
-            return result.returncode == 0 and result.stdout.strip().lower() == "playing"
-        except (subprocess.TimeoutExpired, Exception):
-            return False
+        return self.media.is_playing()
 
     def pause_media(self):
         """Pause currently playing media"""
-        try:
-            result = subprocess.run(
-                ["playerctl", "pause"],
-                capture_output=True,
-                timeout=2
-            )
-            return result.returncode == 0
-        except (subprocess.TimeoutExpired, Exception):
-            return False
+        return self.media.pause()
 
     def play_media(self):
         """Resume paused media"""
-        try:
-            result = subprocess.run(
-                ["playerctl", "play"],
-                capture_output=True,
-                timeout=2
-            )
-            return result.returncode == 0
-        except (subprocess.TimeoutExpired, Exception):
-            return False
-
-    def play_scheduled_audio(self, audio_file: str):
-        """Play scheduled announcement, pausing and resuming media if needed"""
-        current_time = datetime.now().strftime("%H:%M:%S")
-        print(f"\n{'='*60}")
-        print(f"[{current_time}] SCHEDULED ANNOUNCEMENT TRIGGERED")
-        print(f"{'='*60}")
-
-        media_was_playing = False
-
-        try:
-            filename = os.path.basename(audio_file)
-
-            print(f"Audio file: {filename}")
-            print(f"Full path: {audio_file}")
-
-            if not os.path.exists(audio_file):
-                print(f"✗ Error: Audio file not found: {audio_file}")
-                return
-
-            # Check if media is playing
-            print("\nChecking media playback status...")
-            media_was_playing = self.check_media_playing()
-
-            if media_was_playing:
-                print("✓ Media is playing - attempting to pause...")
-                if self.pause_media():
-                    print("✓ Media paused successfully")
-                else:
-                    print("⚠ Warning: Failed to pause media, continuing anyway...")
-                time.sleep(0.5)
-            else:
-                print("• No media currently playing")
-
-            # Play announcement
-            print(f"\n▶ Playing announcement: {filename}")
-            pygame.mixer.music.load(audio_file)
-            pygame.mixer.music.play()
-
-            # Wait for playback to complete
-            while pygame.mixer.music.get_busy():
-                time.sleep(0.1)
-
-            pygame.mixer.music.unload()
-            print("✓ Announcement playback completed")
+        return self.media.play()
+
+    def next_due(self, media) -> Optional[float]:
+        """Monotonic instant of the next scheduled announcement, so close slots share one media pause"""
+        upcoming = self.timer.upcoming(1)
+        return upcoming[0].due if upcoming else None
+
+    async def play_scheduled_audio(self, audio_file: str, due: Optional[float] = None):
+        """Play scheduled announcement, pausing and resuming media if needed
+
+        due is the slot's monotonic instant; the timer fires early and the
+        engine lines the first sample up with it.
+        """
+        # Prefetched assets are served from memory without touching storage
+        if audio_file not in self.assets and not os.path.exists(audio_file):
+            event("announce.missing", logging.ERROR, file=audio_file)
+            return
 
-        except Exception as e:
-            print(f"✗ Error during playback: {e}")
-            import traceback
-            traceback.print_exc()
-        finally:
-            # Resume media if it was playing
-            if media_was_playing:
-                print("\nAttempting to resume media...")
-                time.sleep(0.3)
-                if self.play_media():
-                    print("✓ Media resumed successfully")
-                else:
-                    print("⚠ Warning: Failed to resume media")
-
-            print(f"{'='*60}\n")
+        await self.engine.announce(audio_file, due=due)
 
     def schedule_all_tasks(self):
         """Schedule all tasks for the current day"""
@@ -190,27 +227,23 @@ class AudioScheduler:
 
         if current_day not in self.schedule_dict:
             print(f"✗ No schedule found for {current_day.capitalize()}")
-            return
 
-        schedule.clear()
+        upcoming = self.timer.load_day()
+        self.print_upcoming(upcoming)
 
-        scheduled_times = []
-        for time_str, audio_file in self.schedule_dict[current_day].items():
-            schedule.every().day.at(time_str).do(self.play_scheduled_audio, audio_file)
-            scheduled_times.append((time_str, os.path.basename(audio_file)))
+        # Warm every distinct asset for the day in the background
+        self.prefetcher.start()
+        warming = self.prefetcher.warm_day(self.index, current_day)
+        print(f"Warming {warming} distinct audio files in the background\n")
 
-        # Sort and display upcoming schedules
-        scheduled_times.sort()
-        print(f"✓ Loaded {len(scheduled_times)} scheduled announcements\n")
-
-        # Show next 5 upcoming schedules
-        current_time = datetime.now().strftime("%H:%M")
-        upcoming = [t for t in scheduled_times if t[0] >= current_time]
+    def print_upcoming(self, upcoming):
+        """Show the next few announcements left on the timer heap"""
+        print(f"✓ Loaded {len(upcoming)} scheduled announcements\n")
 
         if upcoming:
             print("Next upcoming announcements:")
-            for i, (time_str, filename) in enumerate(upcoming[:5], 1):
-                print(f"  {i}. {time_str} - {filename}")
+            for i, entry in enumerate(upcoming[:5], 1):
+                print(f"  {i}. {entry.time_str} - {os.path.basename(entry.audio_file)}")
             if len(upcoming) > 5:
                 print(f"  ... and {len(upcoming) - 5} more")
         else:
@@ -218,6 +251,56 @@ class AudioScheduler:
 
         print(f"{'='*60}\n")
 
+    def on_day_changed(self, old_day: str, new_day: str):
+        """Called by the timer core when the midnight rollover entry fires"""
+        upcoming = self.timer.upcoming(limit=1)
+        warming = self.prefetcher.warm_day(self.index, new_day)
+        event("day.changed", old=old_day, new=new_day, slots=self.timer.pending(), warming=warming,
+              next=f"{upcoming[0].time_str} {os.path.basename(upcoming[0].audio_file)}" if upcoming else None)
+
+    def reload_schedule(self, reason: str):
+        """Re-read mapping.py and apply only the changed slots to the live timer"""
+        try:
+            module = importlib.reload(mapping)
+            index = ScheduleIndex.from_mapping(module.mapp)
+            # Assets already decoded in memory keep playing even if their file is being replaced.
+            # Probed in this process: a few new files are quicker than starting a worker pool
+            new_assets = [a for a in index.assets if a not in self.assets]
+            self.manifest.check(new_assets, parallel=False, quiet=True)
+        except Exception as e:
+            event("schedule.reload_failed", logging.ERROR, reason=reason, error=str(e))
+            return
+
+        self.schedule_dict = module.mapp
+        self.index = index
+        added, removed, changed = self.timer.apply_schedule(index)
+
+        # Assets that are already cached stay put; only new ones get decoded
+        self.prefetcher.warm_day(index, self.timer.current_day)
+        event("schedule.reloaded", reason=reason, day=self.timer.current_day, added=added, removed=removed,
+              changed=changed, glyph="✓")
+
+    def check_mapping_changed(self):
+        """Reload when mapping.py has been edited since it was last loaded"""
+        try:
+            mtime = os.stat(mapping.__file__).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self.mapping_mtime:
+            self.mapping_mtime = mtime
+            self.reload_schedule("mapping.py changed")
+
+    def on_heartbeat(self, pending_count: int):
+        """One event a minute to show it's alive, with cache and pipeline figures"""
+        self.check_mapping_changed()
+        cache = self.assets.stats()
+        event("heartbeat", pending=self.timer.pending(), cached=cache["entries"], hits=cache["hits"],
+              misses=cache["misses"], prebuilt=self.build.served, decoded=self.build.fallbacks,
+              missed=self.timer.missed,
+              lead_ms={backend: round(self.latency.lead(backend) * 1000) for backend in self.latency.samples})
+        event("heartbeat.detail", logging.DEBUG, pipeline=self.latency.summary(),
+              settle=self.media.settle_summary())
+
     def run(self):
         """Run the scheduler"""
         print("\n" + "=" * 60)
@@ -231,60 +314,89 @@ class AudioScheduler:
         print(f"Current time: {current_time}")
         print(f"System time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S %Z')}")
 
-        self.schedule_all_tasks()
-
-        last_day = current_day
-        loop_count = 0
+        with self.profile.phase("load today's schedule"):
+            self.schedule_all_tasks()
+        self.profile.report()
 
         print("✓ Scheduler is running - Press Ctrl+C to stop\n")
         print("Waiting for scheduled times...\n")
 
         try:
-            while True:
-                schedule.run_pending()
-
-                now = datetime.now()
-                new_day = now.strftime("%A").lower()
-
-                # Check for day change
-                if new_day != last_day:
-                    print(f"\n{'='*60}")
-                    print(f"DAY CHANGED: {last_day.capitalize()} → {new_day.capitalize()}")
-                    print(f"Time: {now.strftime('%Y-%m-%d %H:%M:%S')}")
-                    print(f"{'='*60}")
-                    self.schedule_all_tasks()
-                    last_day = new_day
-
-                # Print heartbeat every 60 seconds to show it's alive
-                loop_count += 1
-                if loop_count % 60 == 0:
-                    current_time = now.strftime("%H:%M:%S")
-                    pending_count = len(schedule.jobs)
-                    print(f"[{current_time}] Scheduler active - {pending_count} jobs scheduled")
-
-                time.sleep(1)
+            # Sleeps until the next heap entry is due; day rollover is an entry too.
+            # Announcements run as coroutines on the engine's single event loop.
+            self.engine.run([self.timer])
 
         except KeyboardInterrupt:
-            print("\n" + "=" * 60)
-            print("SCHEDULER STOPPED BY USER")
-            print("=" * 60)
+            event("scheduler.stopped", reason="interrupted")
+            self.prefetcher.stop()
+            self.media.stop()
+            self.assets.clear()
+            import pygame
+
             pygame.mixer.quit()
-            print("✓ Cleanup completed")
         except Exception as e:
-            print("\n" + "=" * 60)
-            print(f"CRITICAL ERROR: {e}")
-            print("=" * 60)
-            import traceback
-            traceback.print_exc()
-            print("\nAttempting to restart in 5 seconds...")
+            event("scheduler.crashed", logging.CRITICAL, exc_info=True, error=str(e), restart_in=5)
             time.sleep(5)
-            print("Restarting scheduler...")
             self.run()  # Attempt to restart
 
 
 if __name__ == "__main__":
+    import argparse
+
+    from pcm_store import default_cache_dir
+
+    parser = argparse.ArgumentParser(description="Play scheduled announcements from mapping.py")
+    parser.add_argument("--media-backend", choices=("playerctl", "mpris", "auto"), default="playerctl",
+                        help="how to pause and resume media (mpris needs dbus-python and PyGObject; "
+                             "auto tries mpris and falls back to playerctl)")
+    parser.add_argument("--shared-cache", nargs="?", const=default_cache_dir(), metavar="DIR",
+                        help="share decoded audio with other scheduler processes through DIR "
+                             f"(default {default_cache_dir()})")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="print how long each startup phase took once the scheduler is ready")
+    parser.add_argument("--simulate", nargs="?", const="", metavar="YYYY-MM-DD",
+                        help="fast-forward mapping.py from midnight of this day (default today) without playing")
+    parser.add_argument("--days", type=int, default=7, help="days to cover with --simulate")
+    parser.add_argument("--tolerance-ms", type=float, default=20.0,
+                        help="how close to the scheduled second the first sample should land")
+    parser.add_argument("--catch-up", choices=CatchUp.POLICIES, default=CatchUp.LATEST,
+                        help="what to do with slots missed during a stall, suspend or clock step "
+                             "(late: play within the grace window, latest: only the most recent one, drop)")
+    parser.add_argument("--grace", type=float, default=120.0, help="seconds late a missed slot may still play")
+    parser.add_argument("--overlap", choices=Overlap.POLICIES, default=Overlap.QUEUE,
+                        help="what an announcement does while another is still playing")
+    parser.add_argument("--stale-after", type=float, default=30.0,
+                        help="with --overlap drop-if-stale, drop announcements that would start this many seconds late")
+    parser.add_argument("--hold-window", type=float, default=120.0,
+                        help="keep media paused between announcements less than this many seconds apart")
+    event_log.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.simulate is not None:
+        from functools import partial
+
+        from simulate import simulate_range
+
+        # The production timer with the mixer and media controller left out
+        index = ScheduleIndex.from_mapping(mapping.mapp)
+        latency = PipelineLatency(tolerance=args.tolerance_ms / 1000)
+        simulation = simulate_range({None: index}, args.simulate or None, args.days,
+                                    timer_factory=partial(create_timer, index, slot_lead=latency.cap,
+                                                          catch_up=CatchUp(args.catch_up, args.grace)))
+        raise SystemExit(1 if simulation.drops() else 0)
+
+    # Announcement-time output goes through a queue to a writer thread
+    log = event_log.from_arguments(args)
     try:
-        scheduler = AudioScheduler()
+        scheduler = AudioScheduler(
+            media_backend=args.media_backend,
+            shared_cache_dir=args.shared_cache,
+            profile=StartupProfile(enabled=args.startup_profile),
+            start_tolerance=args.tolerance_ms / 1000,
+            catch_up=CatchUp(args.catch_up, args.grace),
+            overlap=Overlap(args.overlap, args.stale_after),
+            hold_window=args.hold_window,
+        )
         scheduler.run()
     except Exception as e:
         print("\n" + "=" * 60)
@@ -296,7 +408,9 @@ if __name__ == "__main__":
         print("\nPlease check:")
         print("  1. All audio files exist in AudioFiles/ folder")
         print("  2. playerctl is installed (sudo apt-get install playerctl)")
+        print("     or dbus-python and PyGObject for the MPRIS backend")
         print("  3. pygame is installed (pip install pygame)")
-        print("  4. schedule is installed (pip install schedule)")
-        print("  5. mapping.py is configured correctly")
+        print("  4. mapping.py is configured correctly")
         print("=" * 60)
+    finally:
+        log.stop()
@@ -0,0 +1,339 @@
+# Imported first so the startup profile also covers the module imports below
+from startup import ProbeCache, StartupProfile, import_pygame
+
+import logging
+import os
+import shutil
+import signal
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from announce_engine import AnnouncementEngine, Overlap
+from asset_build import MIXER_BUFFER, MIXER_CHANNELS, MIXER_FREQUENCY, MIXER_SIZE, AssetBuild
+from asset_cache import AssetCache
+from asset_manifest import AssetManifest
+import event_log
+from event_log import event
+from media_control import MediaController, create_media_controller
+from pcm_store import SharedPcmCache, default_cache_dir
+from pipeline_latency import PipelineLatency
+from prefetch import Prefetcher
+from timer_core import CatchUp, TimerCore, TimerEntry, VirtualClock
+from venues import VENUES, Venue, load_venues, shared_assets
+
+
+def create_timer(
+    venues: Dict[str, Venue],
+    on_fire: Callable[[TimerEntry], object],
+    on_rollover: Optional[Callable[[str, str], None]] = None,
+    on_heartbeat: Optional[Callable[[int], None]] = None,
+    on_prefetch: Optional[Callable[[list], None]] = None,
+    prefetch_lead: float = 120.0,
+    prefetch_count: int = 3,
+    slot_lead: float = 0.0,
+    clock: Optional[VirtualClock] = None,
+) -> TimerCore:
+    """The venues' shared timer; simulate.py builds it here too, on a virtual clock with a null sink"""
+    return TimerCore(
+        None,
+        venues={name: venue.index for name, venue in venues.items()},
+        on_fire=on_fire,
+        on_rollover=on_rollover,
+        on_heartbeat=on_heartbeat,
+        on_prefetch=on_prefetch,
+        prefetch_lead=prefetch_lead,
+        prefetch_count=prefetch_count,
+        slot_lead=slot_lead,
+        # The engine's playback workers order announcements themselves
+        ordered=False,
+        catch_up={name: CatchUp(venue.catch_up, venue.grace) for name, venue in venues.items()},
+        clock=clock,
+    )
+
+
+class MultiVenueScheduler:
+    """Drives several venue schedules from one timer heap, mixer and asset cache"""
+
+    def __init__(
+        self,
+        venue_names: List[str],
+        device: Optional[str] = None,
+        asset_cache_mb: int = 64,
+        prefetch_lead: float = 120.0,
+        prefetch_count: int = 3,
+        shared_cache_dir: Optional[str] = None,
+        profile: Optional[StartupProfile] = None,
+        start_tolerance: float = 0.02,
+        hold_window: float = 120.0,
+    ):
+        self.profile = profile or StartupProfile()
+        self.probes = ProbeCache()
+        self.manifest = AssetManifest()
+
+        print("=" * 60)
+        print("MULTI-VENUE AUDIO SCHEDULER - INITIALIZATION")
+        print("=" * 60)
+
+        print("\nValidating venue schedules and audio files...")
+        with self.profile.phase("compile and validate schedules"):
+            self.venues: Dict[str, Venue] = {venue.name: venue for venue in load_venues(venue_names)}
+            self.validate_venues()
+
+        print("\nInitializing pygame mixer...")
+        try:
+            with self.profile.phase("import pygame"):
+                pygame = import_pygame()
+            with self.profile.phase("mixer init"):
+                # pygame opens one output device per process; venues on another speaker run in their own engine
+                pygame.mixer.init(frequency=MIXER_FREQUENCY, size=MIXER_SIZE, channels=MIXER_CHANNELS,
+                                  buffer=MIXER_BUFFER, devicename=device)
+            print(f"✓ Pygame mixer initialized on {device or 'the default device'}")
+        except Exception as e:
+            print(f"✗ Failed to initialize pygame mixer: {e}")
+            raise
+
+        self.build = AssetBuild.for_mixer()
+        built, total = self.build.coverage(shared_assets(list(self.venues.values())))
+        if built == total:
+            print(f"✓ All {total} audio files prebuilt in {self.build.root}")
+        else:
+            print(f"⚠ {built}/{total} audio files prebuilt in {self.build.root}; "
+                  "the rest are decoded at load time (run: python asset_build.py)")
+
+        if shared_cache_dir:
+            # Also shared with scheduler processes outside this engine
+            self.assets = SharedPcmCache(shared_cache_dir, loader=self.build.load)
+            removed = self.assets.collect()
+            print(f"✓ Shared PCM cache: {self.assets.cache_dir} ({removed} stale entries removed)")
+        else:
+            # One decoded copy of each file, whichever venues reference it
+            self.assets = AssetCache(budget_bytes=asset_cache_mb * 1024 * 1024, loader=self.build.load)
+        self.prefetcher = Prefetcher(self.assets)
+        self.latency = PipelineLatency(tolerance=start_tolerance)
+
+        self.timer = create_timer(
+            self.venues,
+            on_fire=self.play_scheduled_audio,
+            on_rollover=self.on_day_changed,
+            on_heartbeat=self.on_heartbeat,
+            on_prefetch=self.prefetcher.prefetch,
+            prefetch_lead=prefetch_lead,
+            prefetch_count=prefetch_count,
+            slot_lead=self.latency.cap,
+        )
+
+        print("\nConnecting media controllers...")
+        self.media: Dict[str, MediaController] = {}
+        with self.profile.phase("media controllers"):
+            self.connect_media()
+
+        self.engine = AnnouncementEngine(
+            self.assets, next(iter(self.media.values())), self.latency,
+            output_latency=MIXER_BUFFER / MIXER_FREQUENCY,
+            overlap={name: Overlap(venue.overlap, venue.stale_after) for name, venue in self.venues.items()},
+            hold_window=hold_window,
+            next_due=self.next_due,
+        )
+        self.engine.add_signal_handler(signal.SIGHUP, lambda: self.reload_schedules("SIGHUP"))
+
+        print("\n✓ Initialization complete")
+        print("=" * 60)
+
+    def validate_venues(self):
+        """Validate every referenced audio file once and report what the venues share"""
+        users = shared_assets(list(self.venues.values()))
+        # One pass over the whole library, so new files from every venue are probed in parallel
+        self.manifest.check(users)
+
+        for venue in self.venues.values():
+            print(
+                f"✓ {venue.name}: {len(venue.index.seconds)} scheduled announcements, "
+                f"{len(venue.index.assets)} distinct audio files"
+            )
+
+        shared = sum(1 for names in users.values() if len(names) > 1)
+        print(f"\n✓ {len(self.venues)} venues use {len(users)} distinct audio files ({shared} shared)")
+
+    def connect_media(self):
+        """One controller per backend; venues that resolve to the same backend share it"""
+        by_backend: Dict[str, MediaController] = {}
+        for venue in self.venues.values():
+            controller = by_backend.get(venue.media_backend)
+            if controller is None:
+                controller = create_media_controller(venue.media_backend, self.probes)
+                # "auto" may have fallen back to a backend another venue asked for by name
+                for existing in by_backend.values():
+                    if existing.name == controller.name:
+                        controller.stop()
+                        controller = existing
+                        break
+                by_backend[venue.media_backend] = controller
+            self.media[venue.name] = controller
+            print(f"✓ {venue.name}: media backend {controller.name}")
+
+        search_path = os.environ.get("PATH", "")
+        if any(c.name == "playerctl" for c in self.media.values()) and not self.probes.probe(
+            "playerctl", search_path, lambda: shutil.which("playerctl")
+        ):
+            raise SystemError("playerctl not installed. Install with: sudo apt-get install playerctl")
+
+    def next_due(self, media: MediaController) -> Optional[float]:
+        """Monotonic instant of the next announcement played through media, whichever venue it is for"""
+        dues = [slot.due for name, controller in self.media.items() if controller is media
+                for slot in self.timer.upcoming(1, name)]
+        return min(dues, default=None)
+
+    async def play_scheduled_audio(self, entry: TimerEntry):
+        """Play one venue's scheduled announcement through that venue's media controller"""
+        venue = self.venues[entry.venue]
+        if entry.audio_file not in self.assets and not os.path.exists(entry.audio_file):
+            event("announce.missing", logging.ERROR, venue=venue.name, file=entry.audio_file)
+            return
+
+        await self.engine.announce(entry.audio_file, self.media[venue.name], venue.volume, entry.due, venue.name)
+
+    def warm_day(self, day: str) -> int:
+        warming = 0
+        for venue in self.venues.values():
+            warming += self.prefetcher.warm_day(venue.index, day)
+        return warming
+
+    def schedule_all_tasks(self):
+        """Load today's slots for every venue"""
+        current_day = datetime.now().strftime("%A").lower()
+
+        print(f"\n{'='*60}")
+        print(f"LOADING SCHEDULES FOR {current_day.upper()}")
+        print(f"{'='*60}")
+
+        self.timer.load_day()
+        self.print_upcoming()
+
+        self.prefetcher.start()
+        print(f"Warming {self.warm_day(current_day)} distinct audio files in the background\n")
+
+    def print_upcoming(self):
+        """Per-venue slot counts and the next few announcements across all venues"""
+        for name in self.venues:
+            print(f"✓ {name}: {self.timer.pending(name)} announcements left today")
+
+        upcoming = self.timer.upcoming(limit=5)
+        if upcoming:
+            print("\nNext upcoming announcements:")
+            for i, entry in enumerate(upcoming, 1):
+                print(f"  {i}. {entry.time_str} [{entry.venue}] - {os.path.basename(entry.audio_file)}")
+        else:
+            print("\nNo more announcements scheduled for today")
+
+        print(f"{'='*60}\n")
+
+    def on_day_changed(self, old_day: str, new_day: str):
+        upcoming = self.timer.upcoming(limit=1)
+        event("day.changed", old=old_day, new=new_day, warming=self.warm_day(new_day),
+              slots={name: self.timer.pending(name) for name in self.venues},
+              next=f"{upcoming[0].time_str} [{upcoming[0].venue}] {os.path.basename(upcoming[0].audio_file)}"
+              if upcoming else None)
+
+    def reload_schedules(self, reason: str, names: Optional[List[str]] = None):
+        """Re-read venue schedules and apply only the changed slots to the live timer"""
+        for name in names or list(self.venues):
+            venue = self.venues[name]
+            try:
+                mtime = os.stat(venue.source).st_mtime_ns
+                index = venue.compile()
+                # Probed in this process: a few new files are quicker than starting a worker pool
+                new_assets = [a for a in index.assets if a not in self.assets]
+                self.manifest.check(new_assets, parallel=False, quiet=True)
+            except Exception as e:
+                event("schedule.reload_failed", logging.ERROR, venue=name, reason=reason, error=str(e))
+                continue
+
+            venue.index, venue.source_mtime = index, mtime
+            added, removed, changed = self.timer.apply_schedule(index, name)
+            self.prefetcher.warm_day(index, self.timer.current_day)
+            event("schedule.reloaded", venue=name, reason=reason, added=added, removed=removed, changed=changed,
+                  glyph="✓")
+
+    def on_heartbeat(self, pending_count: int):
+        changed = [name for name, venue in self.venues.items() if venue.source_changed()]
+        if changed:
+            self.reload_schedules("schedule file changed", changed)
+
+        cache = self.assets.stats()
+        event("heartbeat", pending={name: self.timer.pending(name) for name in self.venues},
+              cached=cache["entries"], hits=cache["hits"], misses=cache["misses"], prebuilt=self.build.served,
+              decoded=self.build.fallbacks, missed=self.timer.missed,
+              lead_ms={backend: round(self.latency.lead(backend) * 1000) for backend in self.latency.samples})
+        event("heartbeat.detail", logging.DEBUG, pipeline=self.latency.summary(),
+              settle={c.name: c.settle_summary() for c in set(self.media.values())})
+
+    def run(self):
+        print("\n" + "=" * 60)
+        print("MULTI-VENUE AUDIO SCHEDULER - STARTING")
+        print("=" * 60)
+        print(f"\nVenues: {', '.join(self.venues)}")
+        print(f"System time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S %Z')}")
+
+        with self.profile.phase("load today's schedules"):
+            self.schedule_all_tasks()
+        self.profile.report()
+
+        print("✓ Scheduler is running - Press Ctrl+C to stop\n")
+
+        try:
+            self.engine.run([self.timer])
+
+        except KeyboardInterrupt:
+            event("scheduler.stopped", reason="interrupted")
+            self.prefetcher.stop()
+            for controller in set(self.media.values()):
+                controller.stop()
+            self.assets.clear()
+            import pygame
+
+            pygame.mixer.quit()
+        except Exception as e:
+            event("scheduler.crashed", logging.CRITICAL, exc_info=True, error=str(e), restart_in=5)
+            time.sleep(5)
+            self.run()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run several venue schedules in one process")
+    parser.add_argument("venues", nargs="+", choices=sorted(VENUES), metavar="VENUE",
+                        help=f"venues that share this output device, from {', '.join(sorted(VENUES))}")
+    parser.add_argument("--device", help="mixer output device name (default: the system default); "
+                                         "run one engine per device")
+    parser.add_argument("--cache-mb", type=int, default=64, help="decoded asset cache budget shared by all venues")
+    parser.add_argument("--shared-cache", nargs="?", const=default_cache_dir(), metavar="DIR",
+                        help="share decoded audio with other scheduler processes through DIR")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="print how long each startup phase took once the scheduler is ready")
+    parser.add_argument("--tolerance-ms", type=float, default=20.0,
+                        help="how close to the scheduled second the first sample should land")
+    parser.add_argument("--hold-window", type=float, default=120.0,
+                        help="keep media paused between announcements less than this many seconds apart")
+    event_log.add_arguments(parser)
+    args = parser.parse_args()
+
+    log = event_log.from_arguments(args)
+    try:
+        scheduler = MultiVenueScheduler(args.venues, device=args.device, asset_cache_mb=args.cache_mb,
+                                        shared_cache_dir=args.shared_cache,
+                                        profile=StartupProfile(enabled=args.startup_profile),
+                                        start_tolerance=args.tolerance_ms / 1000,
+                                        hold_window=args.hold_window)
+        scheduler.run()
+    except Exception as e:
+        print("\n" + "=" * 60)
+        print("FATAL ERROR DURING INITIALIZATION")
+        print("=" * 60)
+        print(f"Error: {e}")
+        import traceback
+        traceback.print_exc()
+        print("=" * 60)
+    finally:
+        log.stop()
@@ -3,27 +3,33 @@ import asyncio
 import logging
 import subprocess
 import time
+from collections import deque
 from datetime import datetime
-from datetime import time as dtime
-from functools import partial
 from typing import Dict, List
 
 import pygame
-import schedule
-import win32api
-import win32con
-import win32gui
-import winsdk.windows.media.control as wmc
-from prettytable import PrettyTable
 
+from asset_cache import AssetCache
 from mapping_london import mapp
+from media_control import wait_for_state
+from playback_events import PlaybackEvents
+from schedule_index import ScheduleIndex, format_seconds
+from timer_core import TimerCore
+
+# Virtual-key codes (win32con.VK_*), so win32con is only imported when a key is sent
+VK_MEDIA_PLAY_PAUSE = 0xB3
+VK_SPACE = 0x20
 
 
 class AudioScheduler:
-    def __init__(self):
+    def __init__(self, asset_cache_mb: int = 64):
         # Initialize pygame mixer for audio playbook
         pygame.mixer.init()
 
+        # Decoded announcements stay in memory between triggers
+        self.assets = AssetCache(budget_bytes=asset_cache_mb * 1024 * 1024)
+        self.playback_events = PlaybackEvents()
+
         # Dictionary to store schedule times and corresponding audio files by day
         self.schedule_dict = mapp
         self.validate_times()
@@ -44,6 +50,19 @@ class AudioScheduler:
         self._current_day = None
         self.update_current_day()
 
+        # Heap of absolute fire instants for the current day
+        self.timer = TimerCore(
+            self.index,
+            on_fire=self.fire_scheduled_audio,
+            on_rollover=self.on_day_changed,
+            heartbeat_interval=None,
+        )
+
+        # Upper bounds for waiting on the media session to confirm a state change
+        self.pause_settle_timeout = 1.0
+        self.window_settle_timeout = 0.2
+        self.settle_times: Dict[str, deque] = {}
+
         # Initialize logging
         logging.basicConfig(
             level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -94,19 +113,8 @@ class AudioScheduler:
         return self._current_day
 
     def validate_times(self):
-        """Validate that all times in schedule_dict are in correct 24-hour format"""
-        for day, times in self.schedule_dict.items():
-            for time_str in times.keys():
-                try:
-                    hour, minute = map(int, time_str.split(":"))
-                    if not (0 <= hour <= 23 and 0 <= minute <= 59):
-                        raise ValueError(f"Invalid time format: {time_str}")
-                    dtime(hour, minute)
-                except ValueError as e:
-                    raise ValueError(
-                        f"Invalid time format in schedule for {day}: {time_str}. "
-                        "Please use 24-hour format (HH:MM), e.g., '14:30' for 2:30 PM"
-                    )
+        """Validate all times and compile the schedule into a sorted index"""
+        self.index = ScheduleIndex.from_mapping(self.schedule_dict)
 
     def print_daily_schedule(self, day: str = None):
         """Print the schedule for a specific day or current day in a pretty format"""
@@ -117,18 +125,15 @@ class AudioScheduler:
             print(f"No schedule found for {day.capitalize()}")
             return
 
+        from prettytable import PrettyTable
+
         table = PrettyTable()
         table.field_names = ["Time (24hr)", "Time (12hr)", "Audio File"]
         table.align = "l"  # Left align all columns
 
-        # Get the schedule for the day and sort by time
-        daily_schedule = self.schedule_dict[day]
-        sorted_times = sorted(
-            daily_schedule.keys(), key=lambda x: datetime.strptime(x, "%H:%M")
-        )
-
-        for time_str in sorted_times:
-            audio_file = daily_schedule[time_str]
+        # Already sorted by second-of-day in the compiled index
+        for second, audio_file in self.index.day_events(day):
+            time_str = format_seconds(second)
             table.add_row(
                 [
                     time_str,
@@ -153,6 +158,9 @@ class AudioScheduler:
     async def get_media_session(self):
         """Get the current media session"""
         try:
+            # The WinRT projection is slow to import, so it waits until media is first checked
+            import winsdk.windows.media.control as wmc
+
             sessions = (
                 await wmc.GlobalSystemMediaTransportControlsSessionManager.request_async()
             )
@@ -164,6 +172,8 @@ class AudioScheduler:
 
     def get_chrome_windows(self):
         """Get all Chrome window handles"""
+        import win32gui
+
         chrome_windows = []
 
         def callback(hwnd, windows):
@@ -177,11 +187,37 @@ class AudioScheduler:
         win32gui.EnumWindows(callback, chrome_windows)
         return chrome_windows
 
+    async def send_key_to_chrome(self, vk_code, want_playing: bool) -> bool:
+        """Send a key to each Chrome window until the player confirms the wanted state"""
+        import win32api
+        import win32con
+        import win32gui
+
+        chrome_windows = self.get_chrome_windows()
+        for hwnd in chrome_windows:
+            win32gui.SetForegroundWindow(hwnd)
+            win32api.keybd_event(vk_code, 0, 0, 0)
+            win32api.keybd_event(vk_code, 0, win32con.KEYEVENTF_KEYUP, 0)
+            confirmed, waited = await wait_for_state(
+                self.check_media_playing, want_playing, self.window_settle_timeout
+            )
+            self.record_settle("chrome_key", waited)
+            if confirmed:
+                break
+        return bool(chrome_windows)
+
+    def record_settle(self, stage: str, waited: float):
+        """Keep the achieved wait per stage for tuning the upper bounds"""
+        self.settle_times.setdefault(stage, deque(maxlen=200)).append(waited)
+        self.logger.info(f"Media {stage} settled in {waited * 1000:.0f} ms")
+
     async def check_media_playing(self):
         """Check if media is playing using Windows media controls"""
         try:
             session = await self.get_media_session()
             if session:
+                import winsdk.windows.media.control as wmc
+
                 playback_info = session.get_playback_info()
                 return (
                     playback_info.playback_status
@@ -208,30 +244,18 @@ class AudioScheduler:
         # Method 2: Fallback - Try sending media keys to Chrome windows
         if not success:
             try:
-                chrome_windows = self.get_chrome_windows()
-                for hwnd in chrome_windows:
-                    win32gui.SetForegroundWindow(hwnd)
-                    win32api.keybd_event(win32con.VK_MEDIA_PLAY_PAUSE, 0, 0, 0)
-                    win32api.keybd_event(
-                        win32con.VK_MEDIA_PLAY_PAUSE, 0, win32con.KEYEVENTF_KEYUP, 0
-                    )
-                    time.sleep(0.2)
-                success = bool(chrome_windows)
+                success = await self.send_key_to_chrome(
+                    VK_MEDIA_PLAY_PAUSE, want_playing=False
+                )
             except Exception as e:
                 self.logger.warning(f"Chrome window media key pause failed: {e}")
 
         # Method 3: Try sending spacebar to active Chrome window
         if not success:
             try:
-                chrome_windows = self.get_chrome_windows()
-                for hwnd in chrome_windows:
-                    win32gui.SetForegroundWindow(hwnd)
-                    win32api.keybd_event(win32con.VK_SPACE, 0, 0, 0)
-                    win32api.keybd_event(
-                        win32con.VK_SPACE, 0, win32con.KEYEVENTF_KEYUP, 0
-                    )
-                    time.sleep(0.2)
-                success = bool(chrome_windows)
+                success = await self.send_key_to_chrome(
+                    VK_SPACE, want_playing=False
+                )
             except Exception as e:
                 self.logger.warning(f"Chrome window spacebar pause failed: {e}")
 
@@ -253,30 +277,18 @@ class AudioScheduler:
         # Method 2: Fallback - Try sending media keys to Chrome windows
         if not success:
             try:
-                chrome_windows = self.get_chrome_windows()
-                for hwnd in chrome_windows:
-                    win32gui.SetForegroundWindow(hwnd)
-                    win32api.keybd_event(win32con.VK_MEDIA_PLAY_PAUSE, 0, 0, 0)
-                    win32api.keybd_event(
-                        win32con.VK_MEDIA_PLAY_PAUSE, 0, win32con.KEYEVENTF_KEYUP, 0
-                    )
-                    time.sleep(0.2)
-                success = bool(chrome_windows)
+                success = await self.send_key_to_chrome(
+                    VK_MEDIA_PLAY_PAUSE, want_playing=True
+                )
             except Exception as e:
                 self.logger.warning(f"Chrome window media key play failed: {e}")
 
         # Method 3: Try sending spacebar to active Chrome window
         if not success:
             try:
-                chrome_windows = self.get_chrome_windows()
-                for hwnd in chrome_windows:
-                    win32gui.SetForegroundWindow(hwnd)
-                    win32api.keybd_event(win32con.VK_SPACE, 0, 0, 0)
-                    win32api.keybd_event(
-                        win32con.VK_SPACE, 0, win32con.KEYEVENTF_KEYUP, 0
-                    )
-                    time.sleep(0.2)
-                success = bool(chrome_windows)
+                success = await self.send_key_to_chrome(
+                    VK_SPACE, want_playing=True
+                )
             except Exception as e:
                 self.logger.warning(f"Chrome window spacebar play failed: {e}")
 
@@ -297,7 +309,11 @@ class AudioScheduler:
                 print("Media detected - attempting to pause...")
                 if await self.pause_media():
                     print("Successfully paused media")
-                    time.sleep(1)  # Wait for media to fully pause
+                    # Wait until the session reports paused, at most pause_settle_timeout
+                    _, waited = await wait_for_state(
+                        self.check_media_playing, False, self.pause_settle_timeout
+                    )
+                    self.record_settle("pause", waited)
                 else:
                     print(
                         "Warning: Could not pause media. Continuing with audio playback..."
@@ -305,14 +321,14 @@ class AudioScheduler:
             else:
                 print("No media playing - proceeding with scheduled audio...")
 
-            # Set volume and play the audio file
-            pygame.mixer.music.set_volume(0.65)
-            pygame.mixer.music.load(audio_file)
-            pygame.mixer.music.play()
+            # Decoded in an executor so other timers on the loop keep running
+            sound = await asyncio.get_running_loop().run_in_executor(None, self.assets.get, audio_file)
+
+            # Volume is set before play so the first buffer is already at 0.65
+            channel = self.playback_events.play(sound, 0.65)
 
-            # Wait for the audio to finish
-            while pygame.mixer.music.get_busy():
-                time.sleep(0.1)
+            # Wait for the mixer's end-of-playback event
+            await self.playback_events.wait_end(channel, sound.get_length())
 
             # Only resume media if it was playing before
             if media_was_playing:
@@ -323,11 +339,17 @@ class AudioScheduler:
                     print("Warning: Could not resume media")
 
             print("Audio playbook completed")
+            self.logger.info(f"Asset cache: {self.assets.summary()}")
 
         except Exception as e:
             print(f"Error during audio playback: {e}")
             self.logger.error(f"Error during audio playback: {e}")
 
+    def fire_scheduled_audio(self, entry):
+        """Timer core callback for a due announcement slot"""
+        # Awaited by the timer on its long-lived loop, no asyncio.run per job
+        return self.play_scheduled_audio(entry.audio_file, entry.day)
+
     def schedule_all_tasks(self):
         """Schedule all tasks for the current day"""
         current_day = self.get_current_day()
@@ -335,18 +357,19 @@ class AudioScheduler:
             print(f"No schedule found for {current_day.capitalize()}")
             return
 
-        # Clear any existing schedules
-        schedule.clear()
-
-        # Schedule tasks for the current day
-        for time_str, audio_file in self.schedule_dict[current_day].items():
-            schedule.every().day.at(time_str).do(
-                partial(asyncio.run, self.play_scheduled_audio(audio_file, current_day))
-            )
+        # Rebuild the timer heap for the current day
+        for entry in self.timer.load_day():
             print(
-                f"Scheduled: {time_str} ({self.convert_to_12hr(time_str)}) - {audio_file}"
+                f"Scheduled: {entry.time_str} ({self.convert_to_12hr(entry.time_str)}) - {entry.audio_file}"
             )
 
+    def on_day_changed(self, old_day: str, new_day: str):
+        """Called by the timer core when the midnight rollover entry fires"""
+        print(f"\nDay change detected: {old_day.capitalize()} → {new_day.capitalize()}")
+        print(f"Time of change: {datetime.now().strftime('%H:%M:%S')}")
+        self.update_current_day()
+        self.print_daily_schedule(new_day)
+
     def convert_to_12hr(self, time_24hr: str) -> str:
         """Convert 24-hour time to 12-hour format for display"""
         try:
@@ -361,35 +384,22 @@ class AudioScheduler:
 
         # Initial day setup with validation
         current_day = self.get_current_day()
-        last_day_check = datetime.now()
 
         print(f"\nInitial day validated as: {current_day.capitalize()}")
         self.print_daily_schedule(current_day)
 
         self.schedule_all_tasks()
 
+        self.playback_events.start()
+
         print("\nScheduler is now running. Press Ctrl+C to exit.")
         print(f"Schedule loaded for: {current_day.capitalize()}")
         print(f"Current time: {datetime.now().strftime('%H:%M:%S')}")
 
         while True:
             try:
-                # Check if day has changed every minute
-                now = datetime.now()
-                if (now - last_day_check).seconds >= 60:
-                    new_day = self.get_current_day()
-                    if new_day != current_day:
-                        print(
-                            f"\nDay change detected: {current_day.capitalize()} → {new_day.capitalize()}"
-                        )
-                        print(f"Time of change: {now.strftime('%H:%M:%S')}")
-                        current_day = new_day
-                        self.schedule_all_tasks()
-                        self.print_daily_schedule(current_day)
-                    last_day_check = now
-
-                schedule.run_pending()
-                time.sleep(1)
+                # Sleeps until the next heap entry is due; day rollover is an entry too
+                asyncio.run(self.timer.run_async())
 
             except KeyboardInterrupt:
                 print("\nScheduler stopped by user.")
@@ -399,8 +409,8 @@ class AudioScheduler:
                 self.logger.error(f"Error in main loop: {e}")
                 # Log additional diagnostic information
                 print(f"Current time: {datetime.now().strftime('%H:%M:%S')}")
-                print(f"Current day: {current_day}")
-                print(f"Scheduled jobs: {len(schedule.jobs)}")
+                print(f"Current day: {self.timer.current_day}")
+                print(f"Scheduled jobs: {self.timer.pending()}")
                 # Continue running despite errors
                 time.sleep(5)  # Wait a bit before retrying
 
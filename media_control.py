@@ -0,0 +1,359 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+MPRIS_PREFIX = "org.mpris.MediaPlayer2."
+MPRIS_PATH = "/org/mpris/MediaPlayer2"
+MPRIS_PLAYER_IFACE = "org.mpris.MediaPlayer2.Player"
+PROPERTIES_IFACE = "org.freedesktop.DBus.Properties"
+
+
+async def run_command(args, timeout: float):
+    """Run a command without blocking the event loop; returns (returncode, stdout)"""
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+        )
+    except OSError:
+        return -1, ""
+    try:
+        stdout, _ = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        return -1, ""
+    return proc.returncode, stdout.decode(errors="replace")
+
+
+def _backoff(initial: float, cap: float):
+    interval = initial
+    while True:
+        yield interval
+        interval = min(interval * 2, cap)
+
+
+async def wait_for_state(
+    probe: Callable[[], Awaitable[bool]],
+    want: bool,
+    timeout: float,
+    initial: float = 0.02,
+    cap: float = 0.2,
+) -> Tuple[bool, float]:
+    """Poll probe with exponential backoff until it returns want; returns (confirmed, seconds waited)"""
+    start = time.monotonic()
+    for interval in _backoff(initial, cap):
+        if await probe() == want:
+            return True, time.monotonic() - start
+        remaining = timeout - (time.monotonic() - start)
+        if remaining <= 0:
+            return False, time.monotonic() - start
+        await asyncio.sleep(min(interval, remaining))
+
+
+def wait_for_state_sync(
+    probe: Callable[[], bool],
+    want: bool,
+    timeout: float,
+    initial: float = 0.02,
+    cap: float = 0.2,
+) -> Tuple[bool, float]:
+    """Blocking variant of wait_for_state for the synchronous schedulers"""
+    start = time.monotonic()
+    for interval in _backoff(initial, cap):
+        if probe() == want:
+            return True, time.monotonic() - start
+        remaining = timeout - (time.monotonic() - start)
+        if remaining <= 0:
+            return False, time.monotonic() - start
+        time.sleep(min(interval, remaining))
+
+
+class MediaController:
+    """Common interface; async variants default to running the sync call in an executor"""
+
+    name = "base"
+    # Upper bound for waiting on the player to confirm a pause/resume
+    settle_timeout = 0.5
+
+    def __init__(self):
+        # stage -> recent (seconds waited, confirmed) samples, for tuning settle_timeout
+        self.settle_times: Dict[str, deque] = {}
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def is_playing(self) -> bool:
+        raise NotImplementedError
+
+    def pause(self) -> bool:
+        raise NotImplementedError
+
+    def play(self) -> bool:
+        raise NotImplementedError
+
+    async def is_playing_async(self) -> bool:
+        return await asyncio.get_running_loop().run_in_executor(None, self.is_playing)
+
+    async def pause_async(self) -> bool:
+        return await asyncio.get_running_loop().run_in_executor(None, self.pause)
+
+    async def play_async(self) -> bool:
+        return await asyncio.get_running_loop().run_in_executor(None, self.play)
+
+    async def confirm_state(self, playing: bool, stage: str) -> bool:
+        """Wait until the player reports the wanted state, at most settle_timeout"""
+        confirmed, waited = await wait_for_state(self.is_playing_async, playing, self.settle_timeout)
+        self.settle_times.setdefault(stage, deque(maxlen=200)).append((waited, confirmed))
+        return confirmed
+
+    def settle_summary(self) -> Dict[str, Dict[str, float]]:
+        """Average/max achieved waits and timeout counts per stage"""
+        summary = {}
+        for stage, samples in self.settle_times.items():
+            waits = [w for w, _ in samples]
+            summary[stage] = {
+                "count": len(waits),
+                "avg": sum(waits) / len(waits) if waits else 0.0,
+                "max": max(waits, default=0.0),
+                "timeouts": sum(1 for _, ok in samples if not ok),
+            }
+        return summary
+
+
+class PlayerctlBackend(MediaController):
+    """Media control through one playerctl subprocess per call"""
+
+    name = "playerctl"
+
+    def is_playing(self) -> bool:
+        """Check if media is currently playing"""
+        try:
+            result = subprocess.run(
+                ["playerctl", "status"],
+                capture_output=True,
+                text=True,
+                timeout=1
+            )
+            return result.returncode == 0 and result.stdout.strip().lower() == "playing"
+        except (subprocess.TimeoutExpired, Exception):
+            return False
+
+    def pause(self) -> bool:
+        """Pause currently playing media"""
+        try:
+            result = subprocess.run(
+                ["playerctl", "pause"],
+                capture_output=True,
+                timeout=2
+            )
+            return result.returncode == 0
+        except (subprocess.TimeoutExpired, Exception):
+            return False
+
+    def play(self) -> bool:
+        """Resume paused media"""
+        try:
+            result = subprocess.run(
+                ["playerctl", "play"],
+                capture_output=True,
+                timeout=2
+            )
+            return result.returncode == 0
+        except (subprocess.TimeoutExpired, Exception):
+            return False
+
+    async def is_playing_async(self) -> bool:
+        returncode, stdout = await run_command(["playerctl", "status"], timeout=1)
+        return returncode == 0 and stdout.strip().lower() == "playing"
+
+    async def pause_async(self) -> bool:
+        returncode, _ = await run_command(["playerctl", "pause"], timeout=2)
+        return returncode == 0
+
+    async def play_async(self) -> bool:
+        returncode, _ = await run_command(["playerctl", "play"], timeout=2)
+        return returncode == 0
+
+
+class MprisBackend(MediaController):
+    """Media control over one long-lived D-Bus session connection
+
+    PlaybackStatus of every MPRIS player is kept in memory from
+    PropertiesChanged signals, so is_playing() never touches the bus.
+    """
+
+    name = "mpris"
+
+    # The cache follows PropertiesChanged signals, which arrive within a few
+    # ms of the player switching, so a short bound is enough
+    settle_timeout = 0.25
+
+    def __init__(self, call_timeout: float = 1.0, bus_address: Optional[str] = None):
+        super().__init__()
+        # Imported here so the playerctl backend works without dbus-python/PyGObject
+        import dbus
+        import dbus.mainloop.glib
+        from gi.repository import GLib
+
+        self._dbus = dbus
+        self._glib = GLib
+        self.call_timeout = call_timeout
+
+        dbus.mainloop.glib.threads_init()
+        self._mainloop = dbus.mainloop.glib.DBusGMainLoop()
+        # Private connection so stop() can close it without affecting other users
+        self.bus = dbus.bus.BusConnection(
+            bus_address or dbus.bus.BusConnection.TYPE_SESSION, mainloop=self._mainloop
+        )
+
+        self._lock = threading.Lock()
+        self._status: Dict[str, str] = {}  # unique bus name -> PlaybackStatus
+        self._names: Dict[str, str] = {}  # unique bus name -> well-known MPRIS name
+        self._paused_by_us: List[str] = []
+        self._loop = None
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def start(self):
+        """Subscribe to player signals, read initial state and start the GLib loop thread"""
+        self.bus.add_signal_receiver(
+            self._on_properties_changed,
+            signal_name="PropertiesChanged",
+            dbus_interface=PROPERTIES_IFACE,
+            path=MPRIS_PATH,
+            sender_keyword="sender",
+        )
+        self.bus.add_signal_receiver(
+            self._on_name_owner_changed,
+            signal_name="NameOwnerChanged",
+            dbus_interface="org.freedesktop.DBus",
+        )
+
+        for name in self.bus.list_names():
+            if str(name).startswith(MPRIS_PREFIX):
+                self._track(str(name), str(self.bus.get_name_owner(name)))
+
+        self._loop = self._glib.MainLoop()
+        self._thread = threading.Thread(target=self._loop.run, name="mpris", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.quit()
+            self._thread.join(timeout=2)
+            self._loop = None
+        self.bus.close()
+
+    # ------------------------------------------------------------------
+    # Signal handlers (GLib loop thread)
+    # ------------------------------------------------------------------
+    def _track(self, name: str, owner: str):
+        try:
+            proxy = self.bus.get_object(owner, MPRIS_PATH)
+            status = proxy.Get(MPRIS_PLAYER_IFACE, "PlaybackStatus",
+                               dbus_interface=PROPERTIES_IFACE, timeout=self.call_timeout)
+        except self._dbus.DBusException:
+            status = "Stopped"
+        with self._lock:
+            self._names[owner] = name
+            self._status[owner] = str(status)
+
+    def _on_properties_changed(self, interface, changed, invalidated, sender=None):
+        if interface != MPRIS_PLAYER_IFACE or sender is None:
+            return
+        if "PlaybackStatus" in changed:
+            with self._lock:
+                self._status[str(sender)] = str(changed["PlaybackStatus"])
+        elif "PlaybackStatus" in invalidated:
+            name = self._names.get(str(sender))
+            if name:
+                self._track(name, str(sender))
+
+    def _on_name_owner_changed(self, name, old_owner, new_owner):
+        name = str(name)
+        if not name.startswith(MPRIS_PREFIX):
+            return
+        if old_owner:
+            with self._lock:
+                self._status.pop(str(old_owner), None)
+                self._names.pop(str(old_owner), None)
+        if new_owner:
+            self._track(name, str(new_owner))
+
+    # ------------------------------------------------------------------
+    # Queries and commands
+    # ------------------------------------------------------------------
+    def players(self) -> Dict[str, str]:
+        """Snapshot of well-known player name -> PlaybackStatus"""
+        with self._lock:
+            return {self._names.get(owner, owner): status for owner, status in self._status.items()}
+
+    def is_playing(self) -> bool:
+        """Check if any player is playing, from cached signal state"""
+        with self._lock:
+            return any(status == "Playing" for status in self._status.values())
+
+    async def is_playing_async(self) -> bool:
+        # Memory read, no need for an executor hop
+        return self.is_playing()
+
+    def _call(self, owner: str, method: str) -> bool:
+        try:
+            proxy = self.bus.get_object(owner, MPRIS_PATH)
+            getattr(proxy, method)(dbus_interface=MPRIS_PLAYER_IFACE, timeout=self.call_timeout)
+            return True
+        except self._dbus.DBusException:
+            return False
+
+    def pause(self) -> bool:
+        """Pause every playing player and remember which ones were paused"""
+        with self._lock:
+            playing = [owner for owner, status in self._status.items() if status == "Playing"]
+        paused = [owner for owner in playing if self._call(owner, "Pause")]
+        # A second pause before play() must not forget the players paused by the first
+        self._paused_by_us += [owner for owner in paused if owner not in self._paused_by_us]
+        return bool(paused)
+
+    def play(self) -> bool:
+        """Resume the players paused by pause()"""
+        owners, self._paused_by_us = self._paused_by_us, []
+        results = [self._call(owner, "Play") for owner in owners]
+        return bool(results) and all(results)
+
+
+def create_media_controller(backend: str = "playerctl", probes=None):
+    """Build and start a media controller; "auto" tries MPRIS first and falls back to playerctl
+
+    playerctl stays the default until the MPRIS backend has run against a
+    real session bus. With a ProbeCache, an MPRIS failure under "auto" is
+    remembered so restarts go straight to playerctl instead of retrying the
+    import and bus connection.
+    """
+    probe_key = f"{sys.executable}|{os.environ.get('DBUS_SESSION_BUS_ADDRESS', '')}"
+    cached_failure = probes.get("mpris", probe_key) if probes is not None and backend == "auto" else None
+    if cached_failure:
+        print(f"⚠ MPRIS backend unavailable ({cached_failure}, cached), falling back to playerctl")
+    elif backend != "playerctl":
+        try:
+            controller = MprisBackend()
+            controller.start()
+            return controller
+        except Exception as e:
+            if backend == "mpris":
+                raise
+            if probes is not None:
+                probes.put("mpris", probe_key, str(e))
+            print(f"⚠ MPRIS backend unavailable ({e}), falling back to playerctl")
+    controller = PlayerctlBackend()
+    controller.start()
+    return controller
@@ -0,0 +1,224 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+MAGIC = b"AEPCM\x00\x00\x01"
+VERSION = 1
+# magic, version, frequency, sample format, channels, source mtime_ns, source size, path length, pcm length
+HEADER = struct.Struct("<8sIIiIqqIQ")
+
+
+def default_cache_dir() -> str:
+    """tmpfs when available, so published PCM lives in shared memory rather than on disk"""
+    root = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(root, "audioengine-pcm")
+
+
+class SharedPcmCache:
+    """Decoded announcement PCM published once per machine and memory-mapped by every process
+
+    Each asset is decoded by the first process that needs it and written to
+    <cache dir>/<key>.pcm, where the key covers the source path, its mtime
+    and size, the mixer format and the file layout version. Other processes
+    map the same file read-only. A shared flock on every mapped file works as
+    a reference count: collect() only deletes stale entries nobody holds.
+
+    pygame copies a buffer into each Sound, so Sounds are built from the
+    mapped pages when they are requested (a memcpy, well under a
+    millisecond) and not kept; the only resident copy is the shared one.
+    Drop-in for AssetCache in the schedulers.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, loader: Optional[Callable[[str], object]] = None):
+        self.cache_dir = cache_dir or default_cache_dir()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Decodes a source when publishing it; pygame.mixer.Sound unless given
+        self.loader = loader
+
+        # path -> (source signature, fd holding the shared lock, mapping)
+        self._maps: Dict[str, Tuple[Tuple[int, int], int, mmap.mmap]] = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.published = 0
+
+    # ------------------------------------------------------------------
+    # Entry files
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _signature(path: str) -> Tuple[int, int]:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+
+    def _entry_path(self, path: str, signature: Tuple[int, int]) -> str:
+        import pygame
+
+        frequency, sample_format, channels = pygame.mixer.get_init()
+        key = "|".join(map(str, (VERSION, os.path.realpath(path), *signature, frequency, sample_format, channels)))
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".pcm")
+
+    def _publish(self, path: str, signature: Tuple[int, int], entry_path: str):
+        """Decode path and write its PCM entry, unless another process beat us to it"""
+        with open(os.path.join(self.cache_dir, "publish.lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if os.path.exists(entry_path):
+                return
+
+            import pygame
+
+            raw = (self.loader or pygame.mixer.Sound)(path).get_raw()
+            frequency, sample_format, channels = pygame.mixer.get_init()
+            source = os.path.realpath(path).encode("utf-8")
+            header = HEADER.pack(MAGIC, VERSION, frequency, sample_format, channels,
+                                 signature[0], signature[1], len(source), len(raw))
+
+            tmp = f"{entry_path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(header + source + raw)
+            os.replace(tmp, entry_path)
+            self.published += 1
+
+    def _attach(self, path: str, signature: Tuple[int, int]) -> Tuple[int, mmap.mmap]:
+        """Open, share-lock and map the entry for path, publishing it first if needed"""
+        entry_path = self._entry_path(path, signature)
+        while True:
+            try:
+                fd = os.open(entry_path, os.O_RDONLY)
+            except FileNotFoundError:
+                self._publish(path, signature, entry_path)
+                continue
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            if os.fstat(fd).st_nlink:
+                break
+            # collect() unlinked it between our open and lock
+            os.close(fd)
+
+        mapping = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        magic, version = HEADER.unpack_from(mapping, 0)[:2]
+        if magic != MAGIC or version != VERSION:
+            mapping.close()
+            os.close(fd)
+            raise ValueError(f"Corrupt PCM cache entry for {path}: {entry_path}")
+        return fd, mapping
+
+    @staticmethod
+    def _release(fd: int, mapping: mmap.mmap):
+        mapping.close()
+        os.close(fd)  # drops the shared lock
+
+    @staticmethod
+    def _pcm_view(mapping: mmap.mmap) -> memoryview:
+        fields = HEADER.unpack_from(mapping, 0)
+        path_len, pcm_len = fields[7], fields[8]
+        start = HEADER.size + path_len
+        return memoryview(mapping)[start:start + pcm_len]
+
+    # ------------------------------------------------------------------
+    # AssetCache interface
+    # ------------------------------------------------------------------
+    def _mapping(self, path: str, revalidate: bool) -> mmap.mmap:
+        if not revalidate:
+            with self._lock:
+                cached = self._maps.get(path)
+                if cached is not None:
+                    self.hits += 1
+                    return cached[2]
+
+        signature = self._signature(path)
+        with self._lock:
+            cached = self._maps.get(path)
+            if cached is not None and cached[0] == signature:
+                self.hits += 1
+                return cached[2]
+            if cached is not None:
+                # Source changed; let go of the old entry so collect() can drop it
+                self._release(*self._maps.pop(path)[1:])
+            self.misses += 1
+
+            fd, mapping = self._attach(path, signature)
+            self._maps[path] = (signature, fd, mapping)
+            return mapping
+
+    def get(self, path: str, revalidate: bool = True):
+        """A fresh Sound for path built from the shared mapping"""
+        import pygame
+
+        with self._pcm_view(self._mapping(path, revalidate)) as pcm:
+            return pygame.mixer.Sound(buffer=pcm)
+
+    def warm(self, path: str):
+        """Publish and map path without building a Sound"""
+        self._mapping(path, True)
+
+    def __contains__(self, path: str) -> bool:
+        with self._lock:
+            return path in self._maps
+
+    def __len__(self) -> int:
+        return len(self._maps)
+
+    def clear(self):
+        """Unmap every asset held by this process"""
+        with self._lock:
+            for _, fd, mapping in self._maps.values():
+                self._release(fd, mapping)
+            self._maps.clear()
+
+    def collect(self) -> int:
+        """Delete entries whose source changed or vanished and that no process has mapped"""
+        removed = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".pcm"):
+                continue
+            entry_path = os.path.join(self.cache_dir, name)
+            try:
+                fd = os.open(entry_path, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            try:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # mapped by at least one process
+
+                header = os.read(fd, HEADER.size)
+                stale = len(header) < HEADER.size
+                if not stale:
+                    fields = HEADER.unpack(header)
+                    stale = fields[0] != MAGIC or fields[1] != VERSION
+                if not stale:
+                    source = os.read(fd, fields[7]).decode("utf-8", errors="replace")
+                    try:
+                        stale = self._signature(source) != (fields[5], fields[6])
+                    except OSError:
+                        stale = True
+                if stale:
+                    os.unlink(entry_path)
+                    removed += 1
+            finally:
+                os.close(fd)
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        """Mapped entries, shared bytes and hit/miss/publish counters"""
+        with self._lock:
+            return {
+                "entries": len(self._maps),
+                "bytes_mapped": sum(len(m) for _, _, m in self._maps.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "published": self.published,
+            }
+
+    def summary(self) -> str:
+        """One-line human readable view of stats()"""
+        s = self.stats()
+        return (
+            f"{s['entries']} shared assets, {s['bytes_mapped'] / 1048576:.1f} MB mapped, "
+            f"{s['hits']} hits, {s['misses']} misses, {s['published']} decoded here"
+        )
@@ -0,0 +1,96 @@
+import json
+import os
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from startup import cache_dir
+
+
+def _p95(samples) -> float:
+    ordered = sorted(samples)
+    return ordered[max(0, -(-95 * len(ordered) // 100) - 1)]
+
+
+class PipelineLatency:
+    """Rolling per-backend measurements of how long an announcement takes to get ready
+
+    Every announcement records its stage times (status check, pause, pause
+    confirmation, asset load), the total preparation time and the achieved
+    offset of its first sample from the scheduled instant. lead() is the
+    p95 preparation time plus a margin, plus the p95 offset when starts
+    have been late: the engine starts that much before the slot, then
+    holds the prepared clip until the exact instant. Samples are kept
+    between restarts, so the estimate keeps tuning itself.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        window: int = 50,
+        margin: float = 0.05,
+        initial: float = 0.75,
+        cap: float = 2.0,
+        tolerance: float = 0.02,
+    ):
+        self.path = path if path is not None else os.path.join(cache_dir(), "latency.json")
+        self.window = window
+        self.margin = margin
+        self.initial = initial  # lead for a backend with no history yet
+        self.cap = cap  # never start earlier than this
+        self.tolerance = tolerance  # first sample within this of the scheduled instant counts as on time
+        # backend -> series name ("prepare", "offset" or a stage) -> recent seconds
+        self.samples: Dict[str, Dict[str, Deque[float]]] = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for backend, series in json.load(f).items():
+                    for name, values in series.items():
+                        self._series(backend, name).extend(values)
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def _series(self, backend: str, name: str) -> Deque[float]:
+        return self.samples.setdefault(backend, {}).setdefault(name, deque(maxlen=self.window))
+
+    def record(self, backend: str, name: str, seconds: float):
+        self._series(backend, name).append(seconds)
+
+    def lead(self, backend: str) -> float:
+        """How long before the scheduled instant to start preparing"""
+        series = self.samples.get(backend, {})
+        prepare = series.get("prepare")
+        if not prepare:
+            return min(self.initial, self.cap)
+        # Late first samples mean preparation finished after the hold should have begun
+        late = max(0.0, _p95(series["offset"])) if series.get("offset") else 0.0
+        return min(_p95(prepare) + self.margin + late, self.cap)
+
+    def on_time(self, offset: float) -> bool:
+        return abs(offset) <= self.tolerance
+
+    def save(self):
+        """Write the samples atomically; a failure only loses this run's tuning"""
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({b: {n: list(v) for n, v in s.items()} for b, s in self.samples.items()}, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    def summary(self) -> Dict[str, str]:
+        """Backend -> one-line view of its lead and achieved offsets"""
+        lines = {}
+        for backend, series in self.samples.items():
+            offsets = sorted(series.get("offset", ()))
+            line = f"lead {self.lead(backend) * 1000:.0f} ms"
+            stages = [f"{name} {_p95(values) * 1000:.0f}" for name, values in series.items()
+                      if name not in ("prepare", "offset") and values]
+            if stages:
+                line += f" (p95 ms: {', '.join(stages)})"
+            if offsets:
+                late = sum(1 for o in offsets if not self.on_time(o))
+                line += (f", first sample {offsets[len(offsets) // 2] * 1000:+.0f} ms median, "
+                         f"{late}/{len(offsets)} outside ±{self.tolerance * 1000:.0f} ms")
+            lines[backend] = line
+        return lines
@@ -0,0 +1,137 @@
+import asyncio
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+
+class PlaybackEvents:
+    """Delivers mixer channel end-of-playback events to asyncio or blocking waiters
+
+    A daemon thread blocks in pygame.event.wait() and resolves waiters whose
+    channel has gone idle, so nothing spins while a clip is playing. If the
+    SDL event subsystem cannot be started the waits fall back to sleeping for
+    the clip length.
+    """
+
+    def __init__(self):
+        self.available = False
+        self.end_event: Optional[int] = None
+        self._stop_event: Optional[int] = None
+        self._waiters: List[Tuple[object, Callable[[], None]]] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Initialise the SDL event queue and start the event thread"""
+        if self._thread is not None:
+            return
+        import pygame
+
+        try:
+            # The event queue lives in the video subsystem; no window is opened
+            pygame.display.init()
+        except pygame.error as e:
+            print(f"⚠ Playback end events unavailable ({e}), using clip length timers")
+            return
+
+        self.end_event = pygame.event.custom_type()
+        self._stop_event = pygame.event.custom_type()
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed([self.end_event, self._stop_event])
+
+        self.available = True
+        self._thread = threading.Thread(target=self._run, name="playback-events", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            import pygame
+
+            pygame.event.post(pygame.event.Event(self._stop_event))
+            self._thread.join(timeout=2)
+            self._thread = None
+            self.available = False
+
+    def play(self, sound, volume: Optional[float] = None):
+        """Start sound on a channel that reports its end through the event queue"""
+        import pygame
+
+        channel = pygame.mixer.find_channel(True)
+        if self.available:
+            channel.set_endevent(self.end_event)
+        if volume is not None:
+            channel.set_volume(volume)
+        channel.play(sound)
+        return channel
+
+    # ------------------------------------------------------------------
+    # Event thread
+    # ------------------------------------------------------------------
+    def _run(self):
+        import pygame
+
+        while True:
+            event = pygame.event.wait()
+            if event.type == self._stop_event:
+                return
+            if event.type == self.end_event:
+                self._resolve_idle()
+
+    def _resolve_idle(self):
+        with self._lock:
+            done = [w for w in self._waiters if not w[0].get_busy()]
+            self._waiters = [w for w in self._waiters if w[0].get_busy()]
+        for _, callback in done:
+            callback()
+
+    def _register(self, channel, callback: Callable[[], None]):
+        with self._lock:
+            self._waiters.append((channel, callback))
+        # The clip may have ended before we registered
+        if not channel.get_busy():
+            self._resolve_idle()
+
+    def _unregister(self, callback: Callable[[], None]):
+        with self._lock:
+            self._waiters = [w for w in self._waiters if w[1] is not callback]
+
+    # ------------------------------------------------------------------
+    # Waiting
+    # ------------------------------------------------------------------
+    async def wait_end(self, channel, length: float):
+        """Return as soon as channel finishes; length bounds the wait if no event arrives"""
+        if not self.available:
+            await asyncio.sleep(length)
+            while channel.get_busy():
+                await asyncio.sleep(0.01)
+            return
+
+        loop = asyncio.get_running_loop()
+        finished = asyncio.Event()
+
+        def callback():
+            loop.call_soon_threadsafe(finished.set)
+
+        self._register(channel, callback)
+        try:
+            await asyncio.wait_for(finished.wait(), length + 1.0)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._unregister(callback)
+
+    def wait_end_sync(self, channel, length: float):
+        """Blocking variant of wait_end for the synchronous schedulers"""
+        if not self.available:
+            time.sleep(length)
+            while channel.get_busy():
+                time.sleep(0.01)
+            return
+
+        finished = threading.Event()
+        callback = finished.set
+        self._register(channel, callback)
+        try:
+            finished.wait(length + 1.0)
+        finally:
+            self._unregister(callback)
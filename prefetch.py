@@ -0,0 +1,78 @@
+import logging
+import queue
+import threading
+from typing import Iterable, Optional
+
+from asset_cache import AssetCache
+from event_log import event
+from schedule_index import ScheduleIndex
+
+
+class Prefetcher:
+    """Background worker that decodes assets into the cache ahead of their slots"""
+
+    def __init__(self, cache: AssetCache):
+        self.cache = cache
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.loaded = 0
+        self.failures = 0
+
+    def start(self):
+        """Start the worker thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._worker, name="prefetch", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Ask the worker to exit once the queue drains"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def submit(self, paths: Iterable[str]) -> int:
+        """Queue distinct paths for loading; returns how many were newly queued"""
+        added = 0
+        with self._lock:
+            for path in paths:
+                if path in self._queued:
+                    continue
+                self._queued.add(path)
+                self._queue.put(path)
+                added += 1
+        return added
+
+    def warm_day(self, index: ScheduleIndex, day: str) -> int:
+        """Queue every distinct asset referenced by a day's schedule"""
+        return self.submit(dict.fromkeys(audio_file for _, audio_file in index.day_events(day)))
+
+    def prefetch(self, entries) -> int:
+        """Queue the assets of upcoming timer entries"""
+        return self.submit(entry.audio_file for entry in entries)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued so far has been loaded"""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+
+            with self._lock:
+                self._queued.discard(item)
+            try:
+                self.cache.warm(item)
+                self.loaded += 1
+            except Exception as e:
+                self.failures += 1
+                event("prefetch.failed", logging.WARNING, file=item, error=str(e))
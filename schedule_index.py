@@ -0,0 +1,250 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Tuple
+
+# Index matches datetime.weekday()
+DAY_NAMES = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+MAGIC = b"AESIDX\x00\x01"
+VERSION = 1
+# magic, version, asset count, event count, string blob size
+HEADER = struct.Struct("<8sIIII")
+# per weekday: first event, event count
+DAY_TABLE = struct.Struct("<" + "II" * 7)
+
+
+def parse_time_str(time_str: str) -> int:
+    """Convert an "HH:MM" or "HH:MM:SS" string to seconds since midnight"""
+    parts = [int(p) for p in time_str.split(":")]
+    if len(parts) == 2:
+        parts.append(0)
+    hour, minute, second = parts
+    if not (0 <= hour <= 23 and 0 <= minute <= 59 and 0 <= second <= 59):
+        raise ValueError(f"Invalid time: {time_str}")
+    return hour * 3600 + minute * 60 + second
+
+
+def format_seconds(seconds: int) -> str:
+    """Seconds since midnight as "HH:MM", or "HH:MM:SS" when not on the minute"""
+    hour, rest = divmod(seconds, 3600)
+    minute, second = divmod(rest, 60)
+    if second:
+        return f"{hour:02d}:{minute:02d}:{second:02d}"
+    return f"{hour:02d}:{minute:02d}"
+
+
+class IndexEvent(NamedTuple):
+    fire_at: datetime
+    day: str
+    second: int
+    asset: str
+
+    @property
+    def time_str(self) -> str:
+        return format_seconds(self.second)
+
+
+def _align(n: int) -> int:
+    return (n + 3) & ~3
+
+
+class ScheduleIndex:
+    """Compiled weekly schedule: sorted per-day second-of-day arrays plus asset ids
+
+    Layout (little-endian, 4-byte aligned sections):
+        header | day table | seconds[u32 * events] | asset_ids[u32 * events]
+        | asset string offsets[u32 * (assets + 1)] | utf-8 asset paths
+    The buffer can be a memory-mapped file, so several processes share one copy.
+    """
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        magic, version, n_assets, n_events, blob_size = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a schedule index (bad magic or version)")
+
+        table = DAY_TABLE.unpack_from(buffer, HEADER.size)
+        self._days = {DAY_NAMES[i]: (table[2 * i], table[2 * i + 1]) for i in range(7)}
+
+        offset = HEADER.size + DAY_TABLE.size
+        self.seconds = self._u32(buffer, offset, n_events)
+        offset += 4 * n_events
+        self.asset_ids = self._u32(buffer, offset, n_events)
+        offset += 4 * n_events
+        string_offsets = self._u32(buffer, offset, n_assets + 1)
+        offset += 4 * (n_assets + 1)
+        blob = bytes(memoryview(buffer)[offset:offset + blob_size])
+        self.assets = [
+            blob[string_offsets[i]:string_offsets[i + 1]].decode("utf-8") for i in range(n_assets)
+        ]
+
+    @staticmethod
+    def _u32(buffer, offset: int, count: int):
+        view = memoryview(buffer)[offset:offset + 4 * count]
+        if sys.byteorder == "little":
+            return view.cast("I")
+        values = array("I", view)
+        values.byteswap()
+        return values
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+    @staticmethod
+    def compile(schedule_dict: Dict[str, Dict[str, str]]) -> bytes:
+        """Turn a {"day": {"HH:MM": path}} mapping into index bytes"""
+        asset_ids: Dict[str, int] = {}
+        per_day: List[List[Tuple[int, int]]] = [[] for _ in DAY_NAMES]
+
+        for day, slots in schedule_dict.items():
+            if day.lower() not in DAY_NAMES:
+                raise ValueError(f"Invalid day: {day}")
+            events = per_day[DAY_NAMES.index(day.lower())]
+            for time_str, audio_file in slots.items():
+                try:
+                    second = parse_time_str(time_str)
+                except ValueError:
+                    raise ValueError(f"Invalid time format for {day}: {time_str}. Use HH:MM")
+                events.append((second, asset_ids.setdefault(audio_file, len(asset_ids))))
+
+        seconds = array("I")
+        ids = array("I")
+        table = []
+        for events in per_day:
+            events.sort()
+            table += [len(seconds), len(events)]
+            seconds.extend(s for s, _ in events)
+            ids.extend(a for _, a in events)
+
+        encoded = [path.encode("utf-8") for path in asset_ids]
+        string_offsets = array("I", [0])
+        for raw in encoded:
+            string_offsets.append(string_offsets[-1] + len(raw))
+        blob = b"".join(encoded)
+
+        if sys.byteorder != "little":
+            for values in (seconds, ids, string_offsets):
+                values.byteswap()
+
+        out = bytearray(HEADER.pack(MAGIC, VERSION, len(asset_ids), len(seconds), len(blob)))
+        out += DAY_TABLE.pack(*table)
+        out += seconds.tobytes() + ids.tobytes() + string_offsets.tobytes() + blob
+        out += b"\x00" * (_align(len(out)) - len(out))
+        return bytes(out)
+
+    @classmethod
+    def from_mapping(cls, schedule_dict: Dict[str, Dict[str, str]]) -> "ScheduleIndex":
+        """Compile a mapping into an in-memory index"""
+        return cls(cls.compile(schedule_dict))
+
+    @staticmethod
+    def write(schedule_dict: Dict[str, Dict[str, str]], path: str):
+        """Compile a mapping to an index file, replacing it atomically"""
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(ScheduleIndex.compile(schedule_dict))
+        os.replace(tmp, path)
+
+    @classmethod
+    def open(cls, path: str) -> "ScheduleIndex":
+        """Memory-map an index file read-only"""
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def day_count(self, day: str) -> int:
+        return self._days[day][1]
+
+    def _day_range(self, day: str, start_second: int = 0, end_second: int = 86400) -> range:
+        first, count = self._days[day]
+        lo = bisect_left(self.seconds, start_second, first, first + count)
+        hi = bisect_left(self.seconds, end_second, lo, first + count)
+        return range(lo, hi)
+
+    def day_events(self, day: str, start_second: int = 0) -> List[Tuple[int, str]]:
+        """(second-of-day, asset path) for a weekday from start_second onwards, in order"""
+        return [(self.seconds[i], self.assets[self.asset_ids[i]]) for i in self._day_range(day, start_second)]
+
+    def events_between(self, start: datetime, end: datetime) -> List[IndexEvent]:
+        """Every event with start <= fire_at < end, across day boundaries"""
+        events = []
+        day_date = start.date()
+        while True:
+            midnight = datetime.combine(day_date, datetime.min.time())
+            if midnight >= end:
+                break
+            day = DAY_NAMES[day_date.weekday()]
+            lo = max(0, int((start - midnight).total_seconds() + 0.999999))
+            hi = min(86400, int((end - midnight).total_seconds() + 0.999999))
+            for i in self._day_range(day, lo, hi):
+                second = self.seconds[i]
+                events.append(IndexEvent(midnight + timedelta(seconds=second), day, second,
+                                         self.assets[self.asset_ids[i]]))
+            day_date += timedelta(days=1)
+        return events
+
+    def next_events(self, now: datetime, n: int = 1) -> List[IndexEvent]:
+        """The next n events at or after now, looking up to a week ahead"""
+        events = []
+        day_date = now.date()
+        start_second = now.hour * 3600 + now.minute * 60 + now.second + (1 if now.microsecond else 0)
+        for _ in range(8):
+            midnight = datetime.combine(day_date, datetime.min.time())
+            day = DAY_NAMES[day_date.weekday()]
+            first, count = self._days[day]
+            lo = bisect_left(self.seconds, start_second, first, first + count)
+            for i in range(lo, min(first + count, lo + n - len(events))):
+                second = self.seconds[i]
+                events.append(IndexEvent(midnight + timedelta(seconds=second), day, second,
+                                         self.assets[self.asset_ids[i]]))
+            if len(events) >= n:
+                break
+            day_date += timedelta(days=1)
+            start_second = 0
+        return events
+
+
+def read_schedule_literal(path: str, name: str) -> Dict[str, Dict[str, str]]:
+    """Read a top-level `name = {...}` dict literal from a Python file without importing it"""
+    import ast
+
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(target, ast.Name) and target.id == name for target in node.targets
+        ):
+            return ast.literal_eval(node.value)
+    raise ValueError(f"{path} does not define {name}")
+
+
+def load_mapping(module_name: str, attribute: str = "mapp") -> Dict[str, Dict[str, str]]:
+    """Import a mapping module (e.g. "mapping" or "mapping_london") and return its schedule"""
+    import importlib
+
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compile a schedule mapping into a binary index")
+    parser.add_argument("mapping", help="mapping module name, e.g. mapping or mapping_london")
+    parser.add_argument("output", help="index file to write")
+    parser.add_argument("--attribute", default="mapp", help="name of the schedule dict in the module")
+    parser.add_argument("--next", type=int, default=5, help="show the next N events after compiling")
+    args = parser.parse_args()
+
+    ScheduleIndex.write(load_mapping(args.mapping, args.attribute), args.output)
+    index = ScheduleIndex.open(args.output)
+    print(f"✓ Wrote {args.output}: {len(index.seconds)} events, {len(index.assets)} assets, "
+          f"{os.path.getsize(args.output)} bytes")
+    for event in index.next_events(datetime.now(), args.next):
+        print(f"  {event.fire_at:%a %H:%M:%S} - {os.path.basename(event.asset)}")
@@ -0,0 +1,149 @@
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from schedule_index import ScheduleIndex
+from timer_core import TimerCore, TimerEntry, VirtualClock
+
+# A slot dispatched later than this after its instant counts as a drop
+LATE_AFTER = timedelta(seconds=1)
+
+
+class Simulation:
+    """Replays schedules over a date range on a virtual clock, with a null audio sink
+
+    The real TimerCore drives the run, so rollovers, first-slot-of-the-day
+    handling and heap ordering behave as in production. Pass the scheduler's
+    own create_timer as timer_factory to run it with the production settings;
+    it is called with on_fire, on_rollover and clock. Every deadline
+    is reached instantly and an announcement only records what would have
+    played. Afterwards the fired slots are checked against the schedule:
+    slots that never fired, fired twice, fired late or point at a missing
+    file are reported as drops.
+    """
+
+    def __init__(self, schedules: Dict[Optional[str], ScheduleIndex], start: datetime, end: datetime,
+                 timer_factory: Optional[Callable[..., TimerCore]] = None):
+        self.schedules = schedules
+        self.timer_factory = timer_factory
+        self.start = start
+        self.end = end
+        self.clock = VirtualClock(start)
+        # (instant fired, entry)
+        self.fired: List[Tuple[datetime, TimerEntry]] = []
+        # (instant, old day, new day)
+        self.rollovers: List[Tuple[datetime, str, str]] = []
+        self.dispatched = 0
+        self.elapsed = 0.0
+
+    def _on_fire(self, entry: TimerEntry):
+        # The null sink: nothing is decoded or played
+        self.fired.append((self.clock.now(), entry))
+
+    def _on_rollover(self, old_day: str, new_day: str):
+        self.rollovers.append((self.clock.now(), old_day, new_day))
+
+    def run(self) -> "Simulation":
+        if self.timer_factory:
+            timer = self.timer_factory(on_fire=self._on_fire, on_rollover=self._on_rollover, clock=self.clock)
+        else:
+            timer = TimerCore(None, venues=self.schedules, on_fire=self._on_fire,
+                              on_rollover=self._on_rollover, heartbeat_interval=None, clock=self.clock)
+        start = time.perf_counter()
+        timer.load_day()
+        self.dispatched = timer.run_until(self.end)
+        self.elapsed = time.perf_counter() - start
+        return self
+
+    def drops(self) -> List[Tuple[str, Optional[str], datetime, str]]:
+        """(reason, venue, scheduled instant, asset) for every slot that did not play as scheduled"""
+        drops = []
+        seen = {}
+        for fired_at, entry in self.fired:
+            key = (entry.venue, entry.fire_at)
+            if key in seen:
+                drops.append(("fired twice", entry.venue, entry.fire_at, entry.audio_file))
+            seen[key] = entry
+            if fired_at - entry.fire_at > LATE_AFTER:
+                drops.append((f"late by {fired_at - entry.fire_at}", entry.venue, entry.fire_at, entry.audio_file))
+            if not os.path.exists(entry.audio_file):
+                drops.append(("file missing", entry.venue, entry.fire_at, entry.audio_file))
+
+        for venue, index in self.schedules.items():
+            for event in index.events_between(self.start, self.end):
+                entry = seen.pop((venue, event.fire_at), None)
+                if entry is None:
+                    drops.append(("never fired", venue, event.fire_at, event.asset))
+                elif entry.audio_file != event.asset:
+                    drops.append((f"played {entry.audio_file}", venue, event.fire_at, event.asset))
+        for (venue, fire_at), entry in seen.items():
+            drops.append(("not in the schedule", venue, fire_at, entry.audio_file))
+        return sorted(drops, key=lambda d: d[2])
+
+    def print_timeline(self):
+        """Every fire and rollover in order"""
+        events = [(at, 0, f"{'─' * 8} {old.capitalize()} → {new.capitalize()}") for at, old, new in self.rollovers]
+        for fired_at, entry in self.fired:
+            venue = f"[{entry.venue}] " if entry.venue else ""
+            events.append((fired_at, 1, f"  {venue}{os.path.basename(entry.audio_file)}"))
+        for at, _, text in sorted(events, key=lambda e: (e[0], e[1])):
+            print(f"{at:%a %Y-%m-%d %H:%M:%S}  {text}")
+
+    def print_report(self):
+        drops = self.drops()
+        print("=" * 60)
+        print(f"SIMULATION {self.start:%Y-%m-%d %H:%M} → {self.end:%Y-%m-%d %H:%M}")
+        print("=" * 60)
+        for venue in self.schedules:
+            count = sum(1 for _, entry in self.fired if entry.venue == venue)
+            print(f"✓ {venue or 'schedule'}: {count} announcements fired")
+        print(f"✓ {len(self.rollovers)} day rollovers")
+        if drops:
+            print(f"✗ {len(drops)} drops:")
+            for reason, venue, fire_at, asset in drops:
+                venue = f"[{venue}] " if venue else ""
+                print(f"    {fire_at:%a %Y-%m-%d %H:%M:%S}  {venue}{os.path.basename(asset)}: {reason}")
+        else:
+            print("✓ No drops")
+        rate = self.dispatched / self.elapsed if self.elapsed else float("inf")
+        print(f"• {self.dispatched} timer entries dispatched in {self.elapsed * 1000:.1f} ms ({rate:,.0f}/s)")
+        print("=" * 60)
+
+
+def simulate_range(schedules: Dict[Optional[str], ScheduleIndex], first_day: Optional[str], days: int,
+                   quiet: bool = False, timer_factory: Optional[Callable[..., TimerCore]] = None) -> Simulation:
+    """Run and print a simulation from midnight of first_day (YYYY-MM-DD, default today) for days days"""
+    day = date.fromisoformat(first_day) if first_day else date.today()
+    start = datetime.combine(day, datetime.min.time())
+    simulation = Simulation(schedules, start, start + timedelta(days=days), timer_factory).run()
+    if not quiet:
+        simulation.print_timeline()
+        print()
+    simulation.print_report()
+    return simulation
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from functools import partial
+
+    from main_venues import create_timer
+    from pipeline_latency import PipelineLatency
+    from venues import VENUES, load_venues
+
+    parser = argparse.ArgumentParser(description="Fast-forward venue schedules through a date range")
+    parser.add_argument("venues", nargs="*", default=sorted(VENUES),
+                        help=f"venues to simulate (default: all of {', '.join(sorted(VENUES))})")
+    parser.add_argument("--from", dest="first_day", metavar="YYYY-MM-DD", help="first day (default: today)")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args()
+
+    venues = {venue.name: venue for venue in load_venues(args.venues)}
+    # The multi-venue scheduler's timer with the mixer and media controllers left out
+    simulation = simulate_range({name: venue.index for name, venue in venues.items()},
+                                args.first_day, args.days, args.quiet,
+                                partial(create_timer, venues, slot_lead=PipelineLatency().cap))
+    raise SystemExit(1 if simulation.drops() else 0)
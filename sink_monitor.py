@@ -0,0 +1,156 @@
+import os
+import re
+import subprocess
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+EVENT_RE = re.compile(r"Event '(\w+)' on sink-input #(\d+)")
+PROPERTY_RE = re.compile(r'^\s*([\w.]+) = "(.*)"$')
+
+
+def parse_sink_inputs(text: str) -> Dict[int, Dict[str, str]]:
+    """Parse `pactl list sink-inputs` output into {index: {"corked", "application.name", ...}}"""
+    inputs: Dict[int, Dict[str, str]] = {}
+    current: Optional[Dict[str, str]] = None
+
+    for line in text.splitlines():
+        if line.startswith("Sink Input #"):
+            current = {}
+            inputs[int(line.split("#", 1)[1])] = current
+        elif current is None:
+            continue
+        elif line.strip().startswith("Corked:"):
+            current["corked"] = line.split(":", 1)[1].strip()
+        else:
+            match = PROPERTY_RE.match(line)
+            if match:
+                current[match.group(1)] = match.group(2)
+
+    return inputs
+
+
+class SinkMonitor:
+    """Live table of PulseAudio/PipeWire sink inputs fed by one `pactl subscribe` stream
+
+    The table is refreshed with a single `pactl list sink-inputs` only when the
+    server reports a sink-input change, never per announcement.
+    """
+
+    def __init__(self, exclude_pids: Iterable[int] = (), debounce: float = 0.05):
+        self.exclude_pids = {str(pid) for pid in exclude_pids} | {str(os.getpid())}
+        self.debounce = debounce
+
+        self._inputs: Dict[int, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._running = False
+        self._proc: Optional[subprocess.Popen] = None
+        self._threads = []
+        self.refreshes = 0
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def start(self):
+        """Take an initial snapshot and start following the event stream"""
+        self._running = True
+        self.refresh()
+        for target, name in ((self._follow, "pactl-subscribe"), (self._refresher, "pactl-refresh")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._running = False
+        self._dirty.set()
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.terminate()
+
+    # ------------------------------------------------------------------
+    # Background threads
+    # ------------------------------------------------------------------
+    def refresh(self):
+        """Replace the table with a fresh `pactl list sink-inputs` snapshot"""
+        try:
+            result = subprocess.run(
+                ["pactl", "list", "sink-inputs"],
+                capture_output=True,
+                text=True,
+                timeout=2,
+                env={**os.environ, "LC_ALL": "C"},
+            )
+        except (subprocess.TimeoutExpired, OSError):
+            return
+        if result.returncode != 0:
+            return
+        inputs = parse_sink_inputs(result.stdout)
+        with self._lock:
+            self._inputs = inputs
+        self.refreshes += 1
+
+    def _follow(self):
+        while self._running:
+            try:
+                self._proc = subprocess.Popen(
+                    ["pactl", "subscribe"],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    text=True,
+                    bufsize=1,
+                    env={**os.environ, "LC_ALL": "C"},
+                )
+            except OSError as e:
+                print(f"⚠ pactl subscribe unavailable: {e}")
+                return
+
+            for line in self._proc.stdout:
+                match = EVENT_RE.search(line)
+                if not match:
+                    continue
+                event, index = match.group(1), int(match.group(2))
+                if event == "remove":
+                    with self._lock:
+                        self._inputs.pop(index, None)
+                else:
+                    self._dirty.set()
+
+            if self._running:
+                # Sound server restarted; resubscribe and resync
+                time.sleep(1)
+                self._dirty.set()
+
+    def _refresher(self):
+        while self._running:
+            self._dirty.wait()
+            if not self._running:
+                return
+            # Coalesce bursts of change events into one snapshot
+            time.sleep(self.debounce)
+            self._dirty.clear()
+            self.refresh()
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def active_inputs(self) -> Dict[int, Dict[str, str]]:
+        """Uncorked sink inputs from other processes"""
+        with self._lock:
+            return {
+                index: props
+                for index, props in self._inputs.items()
+                if props.get("corked") == "no"
+                and props.get("application.process.id") not in self.exclude_pids
+            }
+
+    def active_apps(self) -> Dict[str, int]:
+        """Application name -> number of streams currently playing"""
+        apps: Dict[str, int] = {}
+        for props in self.active_inputs().values():
+            name = props.get("application.name", "unknown")
+            apps[name] = apps.get(name, 0) + 1
+        return apps
+
+    def is_playing(self) -> bool:
+        """Is any other application currently playing audio"""
+        return bool(self.active_inputs())
@@ -0,0 +1,107 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Taken when the entry point imports this module first, so module imports show up in the profile
+IMPORTED_AT = time.perf_counter()
+
+
+def cache_dir() -> str:
+    """Per-user directory for state worth keeping between restarts"""
+    root = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(root, "audioengine")
+
+
+def default_cache_path() -> str:
+    return os.path.join(cache_dir(), "probes.json")
+
+
+def import_pygame():
+    """Import pygame without letting SDL take over SIGTERM
+
+    SDL would turn SIGTERM into a quit event that nothing reads, so pm2 could
+    only stop the scheduler by waiting out its kill timeout and sending SIGKILL.
+    """
+    os.environ.setdefault("SDL_NO_SIGNAL_HANDLERS", "1")
+    import pygame
+
+    return pygame
+
+
+class StartupProfile:
+    """Wall-clock time spent in each startup phase"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.phases: List[Tuple[str, float]] = [("imports", time.perf_counter() - IMPORTED_AT)]
+        self._started = IMPORTED_AT
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def report(self):
+        """Print the per-phase breakdown when --startup-profile was given"""
+        if not self.enabled:
+            return
+        total = time.perf_counter() - self._started
+        print("=" * 60)
+        print("STARTUP PROFILE")
+        print("=" * 60)
+        for name, seconds in self.phases:
+            print(f"  {name:<36} {seconds * 1000:9.1f} ms")
+        print(f"  {'other':<36} {(total - sum(s for _, s in self.phases)) * 1000:9.1f} ms")
+        print(f"  {'ready after':<36} {total * 1000:9.1f} ms")
+        print("=" * 60)
+        # Only the first start is interesting; in-process restarts would double count
+        self.enabled = False
+
+
+class ProbeCache:
+    """Results of capability probes persisted between restarts
+
+    Each result is stored with a key describing the environment it was
+    probed in (PATH, bus address...) and is reused while the key matches
+    and it is younger than ttl seconds.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: float = 3600.0):
+        self.path = path or default_cache_path()
+        self.ttl = ttl
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._entries: Dict[str, Dict] = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def get(self, name: str, key: str):
+        """Cached value for name, or None when missing, stale or probed under another key"""
+        entry = self._entries.get(name)
+        if entry is None or entry["key"] != key or time.time() - entry["at"] > self.ttl:
+            return None
+        return entry["value"]
+
+    def put(self, name: str, key: str, value):
+        self._entries[name] = {"key": key, "value": value, "at": time.time()}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass  # a read-only home just means probing again next start
+
+    def probe(self, name: str, key: str, probe: Callable[[], object]):
+        """Return the cached result for name, running probe only on a miss"""
+        value = self.get(name, key)
+        if value is None:
+            value = probe()
+            self.put(name, key, value)
+        return value
@@ -1,22 +1,38 @@
 import subprocess
 import time
 from datetime import datetime
-from datetime import time as dtime
 from typing import Dict, List
 
 import dbus
 import pygame
-import schedule
 from prettytable import PrettyTable
 
+from asset_cache import AssetCache
 from mapping import mapp
+from playback_events import PlaybackEvents
+from media_control import wait_for_state_sync
+from sink_monitor import SinkMonitor
+from schedule_index import ScheduleIndex, format_seconds
+from timer_core import TimerCore
 
 
 class AudioScheduler:
     def __init__(self):
         pygame.mixer.init()
+        self.assets = AssetCache()
+        self.playback_events = PlaybackEvents()
+        self.playback_events.start()
+        # Live sink-input table, so checking for playing media never spawns pactl
+        self.sinks = SinkMonitor()
+        self.sinks.start()
         self.schedule_dict = mapp
         self.validate_times()
+        self.timer = TimerCore(
+            self.index,
+            on_fire=lambda entry: self.play_scheduled_audio(entry.audio_file, entry.day),
+            on_rollover=lambda old_day, new_day: self.print_daily_schedule(new_day),
+            heartbeat_interval=None,
+        )
         self.check_dependencies()
 
     def check_dependencies(self):
@@ -31,19 +47,8 @@ class AudioScheduler:
             )
 
     def validate_times(self):
-        """Validate that all times in schedule_dict are in correct 24-hour format"""
-        for day, times in self.schedule_dict.items():
-            for time_str in times.keys():
-                try:
-                    hour, minute = map(int, time_str.split(":"))
-                    if not (0 <= hour <= 23 and 0 <= minute <= 59):
-                        raise ValueError(f"Invalid time format: {time_str}")
-                    dtime(hour, minute)
-                except ValueError as e:
-                    raise ValueError(
-                        f"Invalid time format in schedule for {day}: {time_str}. "
-                        "Please use 24-hour format (HH:MM)"
-                    )
+        """Validate all times and compile the schedule into a sorted index"""
+        self.index = ScheduleIndex.from_mapping(self.schedule_dict)
 
     def print_daily_schedule(self, day: str = None):
         """Print the schedule for a specific day or current day in a pretty format"""
@@ -58,14 +63,9 @@ class AudioScheduler:
         table.field_names = ["Time (24hr)", "Time (12hr)", "Audio File"]
         table.align = "l"  # Left align all columns
 
-        # Get the schedule for the day and sort by time
-        daily_schedule = self.schedule_dict[day]
-        sorted_times = sorted(
-            daily_schedule.keys(), key=lambda x: datetime.strptime(x, "%H:%M")
-        )
-
-        for time_str in sorted_times:
-            audio_file = daily_schedule[time_str]
+        # Already sorted by second-of-day in the compiled index
+        for second, audio_file in self.index.day_events(day):
+            time_str = format_seconds(second)
             table.add_row(
                 [
                     time_str,
@@ -93,26 +93,9 @@ class AudioScheduler:
             return []
 
     def check_media_playing(self):
-        """Check if media is playing using multiple methods"""
-        try:
-            # Method 1: Check using playerctl
-            try:
-                result = subprocess.run(
-                    ["playerctl", "--player=chromium,chrome", "status"],
-                    capture_output=True,
-                    text=True,
-                )
-                if result.stdout.strip().lower() == "playing":
-                    return True
-            except:
-                pass
-
-            # Method 2: Check using pactl
-            cmd = "pactl list sink-inputs | grep -c 'RUNNING'"
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-            return int(result.stdout.strip()) > 0
-        except:
-            return False
+        """Check if media is playing from the live sink-input table"""
+        # Answered from memory: no playerctl or pactl process per check
+        return self.sinks.is_playing()
 
     def pause_media(self):
         """Pause media using multiple methods"""
@@ -136,7 +119,9 @@ class AudioScheduler:
                 for window_id in window_ids:
                     subprocess.run(["xdotool", "windowfocus", window_id], check=True)
                     subprocess.run(["xdotool", "key", "space"], check=True)
-                    time.sleep(0.2)
+                    confirmed, _ = wait_for_state_sync(self.check_media_playing, False, 0.2)
+                    if confirmed:
+                        break
                 success = True
             except:
                 pass
@@ -176,7 +161,9 @@ class AudioScheduler:
                 for window_id in window_ids:
                     subprocess.run(["xdotool", "windowfocus", window_id], check=True)
                     subprocess.run(["xdotool", "key", "space"], check=True)
-                    time.sleep(0.2)
+                    confirmed, _ = wait_for_state_sync(self.check_media_playing, True, 0.2)
+                    if confirmed:
+                        break
                 success = True
             except:
                 pass
@@ -195,10 +182,13 @@ class AudioScheduler:
 
             # If media is playing, try to pause it
             if media_was_playing:
-                print("Media detected - attempting to pause...")
+                apps = ", ".join(self.sinks.active_apps())
+                print(f"Media detected ({apps}) - attempting to pause...")
                 if self.pause_media():
                     print("Successfully paused media")
-                    time.sleep(1)  # Wait for media to fully pause
+                    # Wait until the player reports paused, at most 1 s
+                    confirmed, waited = wait_for_state_sync(self.check_media_playing, False, 1.0)
+                    print(f"Pause {'confirmed' if confirmed else 'not confirmed'} after {waited * 1000:.0f} ms")
                 else:
                     print(
                         "Warning: Could not pause media. Continuing with audio playback..."
@@ -206,13 +196,12 @@ class AudioScheduler:
             else:
                 print("No media playing - proceeding with scheduled audio...")
 
-            # Play the audio file
-            pygame.mixer.music.load(audio_file)
-            pygame.mixer.music.play()
+            # Play the cached audio file
+            sound = self.assets.get(audio_file)
+            channel = self.playback_events.play(sound)
 
-            # Wait for the audio to finish
-            while pygame.mixer.music.get_busy():
-                time.sleep(0.1)
+            # Wait for the mixer's end-of-playback event
+            self.playback_events.wait_end_sync(channel, sound.get_length())
 
             # Only resume media if it was playing before
             if media_was_playing:
@@ -234,16 +223,10 @@ class AudioScheduler:
             print(f"No schedule found for {current_day.capitalize()}")
             return
 
-        # Clear any existing schedules
-        schedule.clear()
-
-        # Schedule tasks for the current day
-        for time_str, audio_file in self.schedule_dict[current_day].items():
-            schedule.every().day.at(time_str).do(
-                self.play_scheduled_audio, audio_file, current_day
-            )
+        # Rebuild the timer heap for the current day
+        for entry in self.timer.load_day():
             print(
-                f"Scheduled: {time_str} ({self.convert_to_12hr(time_str)}) - {audio_file}"
+                f"Scheduled: {entry.time_str} ({self.convert_to_12hr(entry.time_str)}) - {entry.audio_file}"
             )
 
     def convert_to_12hr(self, time_24hr: str) -> str:
@@ -266,9 +249,11 @@ class AudioScheduler:
 
         print("\nScheduler is now running. Press Ctrl+C to exit.")
 
-        while True:
-            schedule.run_pending()
-            time.sleep(1)
+        try:
+            self.timer.run()
+        finally:
+            self.sinks.stop()
+            self.playback_events.stop()
 
 
 if __name__ == "__main__":
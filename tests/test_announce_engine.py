@@ -0,0 +1,179 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+pygame = pytest.importorskip("pygame")
+
+from announce_engine import AnnouncementEngine, AnnouncementRequest, Overlap, PlaybackQueue
+from asset_cache import AssetCache
+from media_control import MediaController
+from pipeline_latency import PipelineLatency
+
+
+@pytest.fixture(scope="module", autouse=True)
+def mixer():
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.mixer.init(frequency=44100, size=-16, channels=2)
+    yield
+    pygame.mixer.quit()
+
+
+class StubPlayer(MediaController):
+    """A player that is always playing and answers instantly"""
+
+    name = "stub"
+    settle_timeout = 0.05
+
+    def __init__(self):
+        super().__init__()
+        self.playing = True
+        self.pauses = self.resumes = 0
+
+    def is_playing(self) -> bool:
+        return self.playing
+
+    def pause(self) -> bool:
+        self.pauses += 1
+        self.playing = False
+        return True
+
+    def play(self) -> bool:
+        self.resumes += 1
+        self.playing = True
+        return True
+
+
+def silence(seconds: float):
+    return pygame.mixer.Sound(buffer=bytes(int(44100 * seconds) * 4))
+
+
+def make_engine(tmp_path, clips, overlap, **kwargs):
+    # The cache stats each file; the clips themselves are generated
+    for name in clips:
+        (tmp_path / name).write_bytes(b"")
+    assets = AssetCache(loader=lambda path: clips[os.path.basename(path)])
+    engine = AnnouncementEngine(assets, StubPlayer(), PipelineLatency(path=str(tmp_path / "latency.json")),
+                                overlap=overlap, **kwargs)
+    started = []
+    play = engine.events.play
+
+    def record(sound, volume=None):
+        started.append(next(name for name, clip in clips.items() if clip is sound))
+        return play(sound, volume)
+
+    engine.events.play = record
+    # Chained clips start from the channel's queue instead of play()
+    chained_start = engine._chained_start
+
+    def record_chained(follower, starts_at, backend):
+        started.append(os.path.basename(follower.audio_file))
+        chained_start(follower, starts_at, backend)
+
+    engine._chained_start = record_chained
+    return engine, started
+
+
+def test_queued_announcements_play_one_after_another(tmp_path):
+    clips = {"a.wav": silence(0.2), "b.wav": silence(0.2)}
+    engine, started = make_engine(tmp_path, clips, {})
+    a, b = (str(tmp_path / name) for name in clips)
+
+    async def main():
+        return await asyncio.gather(engine.announce(a), engine.announce(b))
+
+    start = time.monotonic()
+    assert asyncio.run(main()) == [True, True]
+    assert started == ["a.wav", "b.wav"]
+    assert time.monotonic() - start >= 0.4
+    # The player was resumed after the last announcement
+    assert engine.media.playing
+
+
+def test_drop_if_stale_skips_an_announcement_that_waited_too_long(tmp_path):
+    clips = {"a.wav": silence(0.3), "b.wav": silence(0.2)}
+    engine, started = make_engine(tmp_path, clips, {"late": Overlap(Overlap.DROP_IF_STALE, stale_after=0.1)})
+    a, b = (str(tmp_path / name) for name in clips)
+
+    async def main():
+        return await asyncio.gather(engine.announce(a, venue="first"), engine.announce(b, venue="late"))
+
+    assert asyncio.run(main()) == [True, False]
+    assert started == ["a.wav"]
+
+
+def test_preempt_stops_the_playing_clip_and_goes_first(tmp_path):
+    clips = {"long.wav": silence(2.0), "urgent.wav": silence(0.2)}
+    engine, started = make_engine(tmp_path, clips, {"urgent": Overlap(Overlap.PREEMPT)})
+    long_clip, urgent_clip = (str(tmp_path / name) for name in clips)
+
+    async def main():
+        long = asyncio.ensure_future(engine.announce(long_clip, venue="music"))
+        await asyncio.sleep(0.2)
+        urgent = await engine.announce(urgent_clip, venue="urgent")
+        await long
+        return urgent
+
+    start = time.monotonic()
+    assert asyncio.run(main())
+    assert started == ["long.wav", "urgent.wav"]
+    assert time.monotonic() - start < 1.5
+
+
+def test_back_to_back_announcements_chain_on_one_channel(tmp_path):
+    clips = {"a.wav": silence(0.3), "b.wav": silence(0.3)}
+    engine, started = make_engine(tmp_path, clips, {})
+    a, b = (str(tmp_path / name) for name in clips)
+    plays = []
+    play = engine.events.play
+    engine.events.play = lambda sound, volume=None: plays.append(sound) or play(sound, volume)
+
+    async def main():
+        # b is due the moment a ends, so it is queued on a's channel
+        due = time.monotonic() + 0.05
+        return await asyncio.gather(engine.announce(a, due=due), engine.announce(b, due=due + 0.3))
+
+    assert asyncio.run(main()) == [True, True]
+    assert started == ["a.wav", "b.wav"]
+    assert plays == [clips["a.wav"]]
+
+
+class IdleChannel:
+    def get_busy(self):
+        return False
+
+
+class BusyChannel:
+    def get_busy(self):
+        return True
+
+
+def test_follower_is_left_for_play_once_the_channel_is_idle():
+    async def main():
+        output = PlaybackQueue()
+        output.put(AnnouncementRequest(1, "b.wav", None, None, None, Overlap()))
+        before = time.monotonic() + 1.0
+        assert output.follower(IdleChannel(), None, before) is None
+        assert len(output.requests) == 1
+        assert output.follower(BusyChannel(), 0.5, before) is None
+        return output.follower(BusyChannel(), None, before)
+
+    assert asyncio.run(main()).audio_file == "b.wav"
+
+
+@pytest.mark.parametrize("hold_window, cycles", [(120.0, 1), (0.0, 2)])
+def test_close_announcements_share_one_media_pause(tmp_path, hold_window, cycles):
+    clips = {"a.wav": silence(0.2), "b.wav": silence(0.2)}
+    engine, started = make_engine(tmp_path, clips, {}, hold_window=hold_window)
+    a, b = (str(tmp_path / name) for name in clips)
+
+    async def main():
+        # b is due 0.3 s after a ends: too late to chain, close enough to hold
+        due = time.monotonic() + 0.05
+        return await asyncio.gather(engine.announce(a, due=due), engine.announce(b, due=due + 0.5))
+
+    assert asyncio.run(main()) == [True, True]
+    assert started == ["a.wav", "b.wav"]
+    assert (engine.media.pauses, engine.media.resumes) == (cycles, cycles)
+    assert engine.media.playing
@@ -0,0 +1,59 @@
+import os
+import shutil
+
+import pytest
+
+from asset_manifest import AssetManifest, probe_asset, probe_mp3, probe_wav
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+MP3 = os.path.join(ROOT, "AudioFiles", "closed.mp3")
+WAV = os.path.join(ROOT, "scarborough", "audio", "green.wav")
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_probes_read_the_stream_headers():
+    mp3 = probe_mp3(read(MP3))
+    assert mp3["codec"] == "mp3" and mp3["sample_rate"] in (44100, 48000) and mp3["duration"] > 0
+
+    wav = probe_wav(read(WAV))
+    assert wav["codec"].startswith("wav/") and wav["channels"] in (1, 2) and wav["duration"] > 0
+
+
+def test_probes_reject_truncated_files():
+    with pytest.raises(ValueError):
+        probe_mp3(read(MP3)[:-1000])
+    with pytest.raises(ValueError):
+        probe_wav(read(WAV)[:-1000])
+
+    record = probe_asset(os.path.join(ROOT, "missing.mp3"))
+    assert record["error"] and "size" not in record
+
+
+def test_unchanged_files_are_not_probed_again(tmp_path):
+    assets = []
+    for source in (MP3, WAV):
+        assets.append(str(tmp_path / os.path.basename(source)))
+        shutil.copy(source, assets[-1])
+    manifest_path = str(tmp_path / "manifest.json")
+
+    # Two stale files and two workers go through the spawned process pool
+    manifest = AssetManifest(manifest_path, workers=2)
+    records, problems = manifest.validate(assets)
+    assert (manifest.reused, manifest.probed, problems) == (0, 2, [])
+    assert records[assets[0]]["sha256"] == probe_asset(assets[0])["sha256"]
+
+    reloaded = AssetManifest(manifest_path, workers=2)
+    reloaded.validate(assets)
+    assert (reloaded.reused, reloaded.probed) == (2, 0)
+
+    with open(assets[1], "r+b") as f:
+        f.truncate(os.path.getsize(assets[1]) - 1000)
+    _, problems = reloaded.validate(assets, parallel=False)
+    assert (reloaded.reused, reloaded.probed) == (1, 1)
+    assert [path for path, _ in problems] == [assets[1]]
+    with pytest.raises(ValueError):
+        reloaded.check(assets, parallel=False)
@@ -0,0 +1,46 @@
+from datetime import datetime
+
+import pytest
+
+from timer_core import CatchUp, TimerCore, VirtualClock
+
+MONDAY = datetime(2026, 10, 19)
+SCHEDULE = {"monday": {"12:00": "a.mp3", "12:05": "b.mp3", "12:10": "c.mp3"}}
+
+
+def run_with_stall(policy: CatchUp, stall_until: datetime):
+    """Start at 11:59, freeze the process until stall_until, then run to 13:00"""
+    clock = VirtualClock(MONDAY.replace(hour=11, minute=59))
+    fired = []
+    timer = TimerCore(SCHEDULE, on_fire=fired.append, heartbeat_interval=None, clock=clock,
+                      catch_up={None: policy})
+    timer.load_day()
+    clock.advance_to(clock.monotonic() + (stall_until - clock.now()).total_seconds())
+    timer.run_until(MONDAY.replace(hour=13))
+    return [entry.audio_file for entry in fired], timer.missed
+
+
+def test_slots_on_time_are_not_missed():
+    fired, missed = run_with_stall(CatchUp(CatchUp.DROP), MONDAY.replace(hour=11, minute=59))
+    assert fired == ["a.mp3", "b.mp3", "c.mp3"]
+    assert sum(missed.values()) == 0
+
+
+@pytest.mark.parametrize("policy, expected", [
+    # 12:11 is 660, 360 and 60 seconds after the three slots
+    (CatchUp(CatchUp.LATE, grace=120), ["c.mp3"]),
+    (CatchUp(CatchUp.LATE, grace=1000), ["a.mp3", "b.mp3", "c.mp3"]),
+    (CatchUp(CatchUp.LATEST, grace=1000), ["c.mp3"]),
+    (CatchUp(CatchUp.LATEST, grace=30), []),
+    (CatchUp(CatchUp.DROP), []),
+])
+def test_policy_after_a_stall(policy, expected):
+    fired, missed = run_with_stall(policy, MONDAY.replace(hour=12, minute=11))
+    assert fired == expected
+    assert missed["played late"] == len(expected)
+    assert missed["dropped"] == 3 - len(expected)
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        CatchUp("sometimes")
@@ -0,0 +1,66 @@
+import pytest
+
+from csv_compiler import VENUES, build, compile_rows, parse_export_time
+from schedule_index import ScheduleIndex, read_schedule_literal
+
+LONDON = VENUES["london"]
+ROWS = [
+    ["Session end time", "Monday (January 06)", "Tuesday (January 07)"],
+    ["1030", "Blue", "Teal"],
+    ["930", "Mocha", ""],
+    ["", "", ""],
+]
+EXPORT = "\n".join(",".join(row) for row in ROWS) + "\n"
+
+
+def test_parse_export_time():
+    assert parse_export_time("1030") == "10:30"
+    assert parse_export_time("930") == "09:30"
+    assert parse_export_time(" 10:30:15 ") == "10:30:15"
+    with pytest.raises(ValueError):
+        parse_export_time("2530")
+
+
+def test_compile_rows_applies_the_venue_aliases():
+    schedule = compile_rows(ROWS, LONDON)
+
+    assert schedule["monday"] == {"10:30": "AudioFiles/wristband/blue.mp3", "09:30": "AudioFiles/wristband/mocha.mp3"}
+    assert schedule["tuesday"] == {"10:30": "AudioFiles/wristband/teal.mp3"}
+    assert schedule["sunday"] == {}
+
+
+def test_unknown_day_column_is_rejected():
+    with pytest.raises(ValueError):
+        compile_rows([["Session end time", "Someday"], ["1030", "Blue"]], LONDON)
+
+
+def test_build_round_trips_through_the_mapping_file_and_index(tmp_path):
+    export = tmp_path / "export.csv"
+    export.write_text(EXPORT, encoding="utf-8")
+    output = str(tmp_path / "mapping_out.py")
+    index_path = str(tmp_path / "schedule.idx")
+
+    slots, _ = build(str(export), "london", output, index_path)
+    assert slots == 3
+    written = read_schedule_literal(output, "mapp")
+    assert written == compile_rows(ROWS, LONDON)
+    assert ScheduleIndex.open(index_path).day_events("monday") == [
+        (9 * 3600 + 1800, "AudioFiles/wristband/mocha.mp3"),
+        (10 * 3600 + 1800, "AudioFiles/wristband/blue.mp3"),
+    ]
+
+
+def test_rebuild_keeps_extras_unless_told_not_to(tmp_path):
+    export = tmp_path / "export.csv"
+    export.write_text(EXPORT, encoding="utf-8")
+    output = tmp_path / "mapping_out.py"
+    output.write_text('mapp = {"monday": {"22:00": "AudioFiles/closed.mp3", "10:30": "AudioFiles/wristband/red.mp3"}}\n',
+                      encoding="utf-8")
+
+    build(str(export), "london", str(output), None)
+    monday = read_schedule_literal(str(output), "mapp")["monday"]
+    assert monday["22:00"] == "AudioFiles/closed.mp3"
+    assert monday["10:30"] == "AudioFiles/wristband/blue.mp3"
+
+    build(str(export), "london", str(output), None, keep_extras=False)
+    assert "22:00" not in read_schedule_literal(str(output), "mapp")["monday"]
@@ -0,0 +1,54 @@
+import os
+import shutil
+
+import pytest
+
+pygame = pytest.importorskip("pygame")
+
+from pcm_store import SharedPcmCache
+
+SOURCE = os.path.join(os.path.dirname(__file__), "..", "scarborough", "audio", "green.wav")
+
+
+@pytest.fixture(scope="module", autouse=True)
+def mixer():
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.mixer.init()
+    yield
+    pygame.mixer.quit()
+
+
+@pytest.fixture
+def asset(tmp_path):
+    path = str(tmp_path / "green.wav")
+    shutil.copy(SOURCE, path)
+    return path
+
+
+def test_second_process_maps_the_published_entry_without_decoding(tmp_path, asset):
+    first = SharedPcmCache(str(tmp_path / "pcm"))
+    sound = first.get(asset)
+    assert first.published == 1
+
+    # A second cache on the same directory stands in for another scheduler process
+    second = SharedPcmCache(str(tmp_path / "pcm"))
+    assert second.get(asset).get_raw() == sound.get_raw()
+    assert second.published == 0
+    assert second.stats()["misses"] == 1
+
+    second.get(asset, revalidate=False)
+    assert second.stats()["hits"] == 1
+
+
+def test_collect_only_drops_stale_entries_nobody_maps(tmp_path, asset):
+    cache = SharedPcmCache(str(tmp_path / "pcm"))
+    cache.warm(asset)
+    stat = os.stat(asset)
+    os.utime(asset, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    other = SharedPcmCache(str(tmp_path / "pcm"))
+    assert other.collect() == 0  # still mapped by the first cache
+
+    cache.clear()
+    assert other.collect() == 1
+    assert not [name for name in os.listdir(cache.cache_dir) if name.endswith(".pcm")]
@@ -0,0 +1,38 @@
+from pipeline_latency import PipelineLatency
+
+
+def make_latency(tmp_path, **kwargs):
+    return PipelineLatency(path=str(tmp_path / "latency.json"), margin=0.05, **kwargs)
+
+
+def test_lead_is_p95_preparation_plus_margin(tmp_path):
+    latency = make_latency(tmp_path)
+    assert latency.lead("playerctl") == latency.initial
+
+    for seconds in [0.1] * 19 + [0.3]:
+        latency.record("playerctl", "prepare", seconds)
+    assert abs(latency.lead("playerctl") - 0.15) < 1e-9
+
+
+def test_late_first_samples_raise_the_lead_up_to_the_cap(tmp_path):
+    latency = make_latency(tmp_path, cap=1.0)
+    for _ in range(20):
+        latency.record("playerctl", "prepare", 0.1)
+        latency.record("playerctl", "offset", -0.001)
+    assert abs(latency.lead("playerctl") - 0.15) < 1e-9
+
+    for _ in range(20):
+        latency.record("playerctl", "offset", 0.2)
+    assert abs(latency.lead("playerctl") - 0.35) < 1e-9
+
+    for _ in range(5):
+        latency.record("playerctl", "offset", 5.0)
+    assert latency.lead("playerctl") == 1.0
+
+
+def test_samples_survive_a_restart(tmp_path):
+    latency = make_latency(tmp_path)
+    latency.record("mpris", "prepare", 0.2)
+    latency.save()
+
+    assert make_latency(tmp_path).lead("mpris") == latency.lead("mpris")
@@ -0,0 +1,72 @@
+from datetime import datetime
+
+import pytest
+
+from schedule_index import ScheduleIndex, format_seconds, parse_time_str
+
+# 2026-10-19 is a Monday
+MONDAY = datetime(2026, 10, 19)
+SCHEDULE = {
+    "monday": {"18:30": "c.mp3", "09:00": "a.mp3", "12:15:30": "b.mp3"},
+    "Tuesday": {"00:00": "a.mp3"},
+    "sunday": {"23:59": "d.mp3"},
+}
+
+
+def test_parse_and_format_round_trip():
+    assert parse_time_str("09:00") == 9 * 3600
+    assert parse_time_str("12:15:30") == 12 * 3600 + 15 * 60 + 30
+    assert format_seconds(9 * 3600) == "09:00"
+    assert format_seconds(12 * 3600 + 15 * 60 + 30) == "12:15:30"
+    with pytest.raises(ValueError):
+        parse_time_str("24:00")
+
+
+def test_compile_sorts_each_day_and_shares_asset_paths():
+    index = ScheduleIndex.from_mapping(SCHEDULE)
+
+    assert index.day_events("monday") == [(9 * 3600, "a.mp3"), (44130, "b.mp3"), (18 * 3600 + 1800, "c.mp3")]
+    assert index.day_events("monday", 44130) == [(44130, "b.mp3"), (18 * 3600 + 1800, "c.mp3")]
+    assert index.day_count("tuesday") == 1
+    assert index.day_count("wednesday") == 0
+    assert sorted(index.assets) == ["a.mp3", "b.mp3", "c.mp3", "d.mp3"]
+
+
+def test_invalid_day_or_time_is_rejected():
+    with pytest.raises(ValueError):
+        ScheduleIndex.from_mapping({"someday": {"09:00": "a.mp3"}})
+    with pytest.raises(ValueError):
+        ScheduleIndex.from_mapping({"monday": {"9am": "a.mp3"}})
+
+
+def test_events_between_crosses_midnight_with_a_half_open_range():
+    index = ScheduleIndex.from_mapping(SCHEDULE)
+
+    events = index.events_between(MONDAY.replace(hour=12, minute=15, second=30), MONDAY.replace(day=20, hour=0))
+    assert [(e.day, e.time_str, e.asset) for e in events] == [("monday", "12:15:30", "b.mp3"),
+                                                             ("monday", "18:30", "c.mp3")]
+
+    events = index.events_between(MONDAY.replace(hour=20), MONDAY.replace(day=20, hour=0, second=1))
+    assert [(e.fire_at, e.asset) for e in events] == [(datetime(2026, 10, 20), "a.mp3")]
+
+
+def test_next_events_skips_empty_days_and_wraps_the_week():
+    index = ScheduleIndex.from_mapping(SCHEDULE)
+
+    # A fraction past a slot means that slot has already gone
+    events = index.next_events(MONDAY.replace(hour=9, microsecond=1), 3)
+    assert [e.asset for e in events] == ["b.mp3", "c.mp3", "a.mp3"]
+    assert events[2].fire_at == datetime(2026, 10, 20)
+
+    events = index.next_events(datetime(2026, 10, 21, 8), 2)
+    assert [(e.fire_at, e.asset) for e in events] == [(datetime(2026, 10, 25, 23, 59), "d.mp3"),
+                                                      (datetime(2026, 10, 26, 9), "a.mp3")]
+
+
+def test_open_maps_a_written_index(tmp_path):
+    path = str(tmp_path / "schedule.idx")
+    ScheduleIndex.write(SCHEDULE, path)
+
+    index = ScheduleIndex.open(path)
+    assert index.day_events("sunday") == [(23 * 3600 + 59 * 60, "d.mp3")]
+    assert index.next_events(MONDAY, 1)[0].asset == "a.mp3"
@@ -0,0 +1,52 @@
+from datetime import date, datetime, timedelta
+from functools import partial
+
+from schedule_index import DAY_NAMES, ScheduleIndex
+from simulate import Simulation
+
+MONDAY = datetime.combine(date(2026, 10, 19), datetime.min.time())
+
+
+def make_index(tmp_path, times=("09:00", "18:30")):
+    assets = {}
+    for name in ("a.mp3", "b.mp3"):
+        path = tmp_path / name
+        path.write_bytes(b"")
+        assets[name] = str(path)
+    return ScheduleIndex.from_mapping(
+        {day: {time_str: assets[name] for time_str, name in zip(times, assets)} for day in DAY_NAMES}
+    )
+
+
+def test_a_week_fires_every_slot_once_in_order(tmp_path):
+    index = make_index(tmp_path)
+    simulation = Simulation({None: index}, MONDAY, MONDAY + timedelta(days=7)).run()
+
+    assert len(simulation.fired) == 14
+    assert [at for at, _ in simulation.fired] == sorted(entry.fire_at for _, entry in simulation.fired)
+    assert [(old, new) for _, old, new in simulation.rollovers] == list(zip(DAY_NAMES, DAY_NAMES[1:]))
+    assert simulation.drops() == []
+
+
+def test_missing_files_and_unfired_slots_are_drops(tmp_path):
+    index = make_index(tmp_path)
+    (tmp_path / "b.mp3").unlink()
+    # Monday's 18:30 slot still fires, but its file is gone
+    simulation = Simulation({None: index}, MONDAY, MONDAY + timedelta(hours=19)).run()
+
+    assert [reason for reason, *_ in simulation.drops()] == ["file missing"]
+
+
+def test_runs_the_production_timer_through_its_factory(tmp_path):
+    from main_linux import create_timer
+
+    index = make_index(tmp_path)
+    simulation = Simulation({None: index}, MONDAY, MONDAY + timedelta(days=1),
+                            timer_factory=partial(create_timer, index, slot_lead=2.0)).run()
+
+    assert len(simulation.fired) == 2
+    # Dispatched slot_lead early so the engine can prepare, which is not a drop
+    assert [entry.fire_at - at for at, entry in simulation.fired] == [timedelta(seconds=2)] * 2
+    assert simulation.drops() == []
+    # The scheduler's minute heartbeat is dispatched too, as it is in production
+    assert simulation.dispatched >= 24 * 60
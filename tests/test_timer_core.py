@@ -0,0 +1,108 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from schedule_index import DAY_NAMES
+from timer_core import ROLLOVER, SLOT, TimerCore, VirtualClock
+
+# Same slots every day, listed out of order
+SCHEDULE = {day: {"18:30": "c.mp3", "09:00": "a.mp3", "12:15:30": "b.mp3"} for day in DAY_NAMES}
+
+
+def make_timer(schedule=SCHEDULE, **kwargs):
+    fired = []
+    return TimerCore(schedule, on_fire=fired.append, heartbeat_interval=None, **kwargs), fired
+
+
+def test_load_day_pushes_every_slot_in_fire_order():
+    timer, _ = make_timer()
+    loaded = timer.load_day(date.today() + timedelta(days=7))
+
+    assert [entry.time_str for entry in loaded] == ["09:00", "12:15:30", "18:30"]
+    assert [entry.audio_file for entry in timer.upcoming(2)] == ["a.mp3", "b.mp3"]
+    assert timer.pending() == 3
+    assert sorted(entry.kind for entry in timer._heap) == [ROLLOVER, SLOT, SLOT, SLOT]
+
+
+def test_overdue_rollover_loads_the_next_day():
+    rollovers = []
+    timer, fired = make_timer({}, on_rollover=lambda old, new: rollovers.append((old, new)))
+    yesterday = date.today() - timedelta(days=1)
+    timer.load_day(yesterday)
+
+    # Yesterday's midnight rollover is already due, so it fires without sleeping
+    assert timer.run_once(timeout=0)
+    assert rollovers == [(DAY_NAMES[yesterday.weekday()], DAY_NAMES[date.today().weekday()])]
+    assert timer.current_date == date.today()
+    assert fired == []
+
+
+def test_apply_schedule_touches_only_the_changed_slots():
+    timer, _ = make_timer()
+    day = date.today() + timedelta(days=7)
+    first, second, third = timer.load_day(day)
+    heap_size = len(timer._heap)
+
+    changed = {d: {"09:00": "a.mp3", "12:15:30": "new.mp3", "20:00": "d.mp3"} for d in DAY_NAMES}
+    assert timer.apply_schedule(changed) == (1, 1, 1)
+
+    assert [entry.time_str for entry in timer.upcoming()] == ["09:00", "12:15:30", "20:00"]
+    assert timer.upcoming(1)[0] is first
+    assert second.audio_file == "new.mp3"
+    assert third.cancelled
+    # The removed slot is deleted lazily; only the added one was pushed
+    assert len(timer._heap) == heap_size + 1
+
+    assert timer.apply_schedule(changed) == (0, 0, 0)
+
+
+def test_reload_does_not_bring_back_a_slot_that_already_fired():
+    now = datetime.now()
+    if now.hour == 23 and now.minute == 59:
+        pytest.skip("the slot would fall on the next day")
+    due = (now + timedelta(seconds=30)).strftime("%H:%M:%S")
+    timer, fired = make_timer({d: {due: "a.mp3"} for d in DAY_NAMES})
+    (entry,) = timer.load_day()
+
+    # Fired (the heap entry is not popped here), then the slot's file changes
+    timer._dispatch(entry)
+    assert fired == [entry]
+    assert timer.apply_schedule({d: {due: "b.mp3"} for d in DAY_NAMES}) == (0, 0, 0)
+    assert timer.pending() == 0
+
+
+def test_reload_between_early_dispatch_and_the_instant_does_not_fire_it_again():
+    monday = datetime(2026, 10, 19)
+    schedule = {"monday": {"12:00": "a.mp3", "12:15": "b.mp3"}}
+    timer, fired = make_timer(schedule, clock=VirtualClock(monday.replace(hour=11, minute=59)), slot_lead=2.0)
+    timer.load_day()
+
+    # Slots are dispatched slot_lead early, so the 12:00 slot is gone from the heap at 11:59:58
+    timer.run_until(monday.replace(hour=11, minute=59, second=59))
+    assert [entry.time_str for entry in fired] == ["12:00"]
+
+    assert timer.apply_schedule(schedule) == (0, 0, 0)
+    timer.run_until(monday.replace(hour=13))
+    assert [entry.time_str for entry in fired] == ["12:00", "12:15"]
+
+
+def test_run_async_keeps_a_venues_announcements_sequential():
+    log = []
+
+    async def announce(entry):
+        log.append(("start", entry.audio_file))
+        await asyncio.sleep(0.1)
+        log.append(("end", entry.audio_file))
+
+    async def main():
+        timer = TimerCore({}, on_fire=announce, heartbeat_interval=None)
+        timer.load_day()
+        now = datetime.now()
+        timer.add_slot(now + timedelta(seconds=0.05), "a.mp3")
+        timer.add_slot(now + timedelta(seconds=0.1), "b.mp3")
+        asyncio.get_running_loop().call_later(0.2, timer.stop)
+        await timer.run_async()
+
+    asyncio.run(main())
+    assert log == [("start", "a.mp3"), ("end", "a.mp3"), ("start", "b.mp3"), ("end", "b.mp3")]
@@ -0,0 +1,544 @@
+import asyncio
+import heapq
+import inspect
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
+
+from event_log import event
+from schedule_index import DAY_NAMES, ScheduleIndex, format_seconds
+
+SLOT = "slot"
+ROLLOVER = "rollover"
+HEARTBEAT = "heartbeat"
+PREFETCH = "prefetch"
+
+
+class TimerEntry:
+    """A single absolute fire instant on the timer heap"""
+
+    __slots__ = ("deadline", "due", "seq", "kind", "day", "time_str", "audio_file", "fire_at", "venue", "cancelled")
+
+    def __init__(self, deadline: float, seq: int, kind: str, fire_at: datetime,
+                 day: str = None, time_str: str = None, audio_file: str = None, venue: str = None,
+                 due: Optional[float] = None):
+        self.deadline = deadline  # clock.monotonic() value the entry is dispatched at
+        self.due = deadline if due is None else due  # clock.monotonic() value of fire_at itself
+        self.seq = seq
+        self.kind = kind
+        self.fire_at = fire_at  # wall-clock instant the deadline was computed from
+        self.day = day
+        self.time_str = time_str
+        self.audio_file = audio_file
+        self.venue = venue
+        self.cancelled = False
+
+    def __lt__(self, other):
+        return (self.deadline, self.seq) < (other.deadline, other.seq)
+
+    def __repr__(self):
+        return f"TimerEntry({self.kind}, {self.fire_at:%Y-%m-%d %H:%M:%S}, {self.audio_file})"
+
+
+Schedule = Union[ScheduleIndex, Dict[str, Dict[str, str]]]
+
+
+class SystemClock:
+    """The real monotonic and wall clocks"""
+
+    @staticmethod
+    def monotonic() -> float:
+        return time.monotonic()
+
+    @staticmethod
+    def now() -> datetime:
+        return datetime.now()
+
+
+class VirtualClock:
+    """A clock that stands still until advanced, for simulating days in moments"""
+
+    def __init__(self, start: datetime):
+        self._now = start
+        self._monotonic = 0.0
+
+    def monotonic(self) -> float:
+        return self._monotonic
+
+    def now(self) -> datetime:
+        return self._now
+
+    def advance_to(self, monotonic: float):
+        """Move both clocks forward to a monotonic instant; never backwards"""
+        if monotonic > self._monotonic:
+            self._now += timedelta(seconds=monotonic - self._monotonic)
+            self._monotonic = monotonic
+
+    def step(self, seconds: float):
+        """Move only the wall clock, like an NTP step or (forwards) a suspend the monotonic clock sleeps through"""
+        self._now += timedelta(seconds=seconds)
+
+
+class CatchUp:
+    """What a venue does with a slot whose instant has already passed
+
+    "late" plays it if it is at most grace seconds late, "latest" does the
+    same but only for the most recent overdue slot and drops the older ones,
+    "drop" never plays a missed slot. Every missed slot is logged either way.
+    """
+
+    LATE = "late"
+    LATEST = "latest"
+    DROP = "drop"
+    POLICIES = (LATE, LATEST, DROP)
+
+    def __init__(self, policy: str = LATEST, grace: float = 120.0):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown catch-up policy: {policy} (known: {', '.join(self.POLICIES)})")
+        self.policy = policy
+        self.grace = grace
+
+    def drop_reason(self, late: float, superseded: bool) -> Optional[str]:
+        """Why a slot this many seconds late is dropped, or None to play it"""
+        if self.policy == self.DROP:
+            return "policy drop"
+        if self.policy == self.LATEST and superseded:
+            return "superseded"
+        if late > self.grace:
+            return "past grace"
+        return None
+
+    def __repr__(self):
+        return f"CatchUp({self.policy}, grace={self.grace:g}s)"
+
+
+def _as_index(schedule: Schedule) -> ScheduleIndex:
+    if isinstance(schedule, ScheduleIndex):
+        return schedule
+    return ScheduleIndex.from_mapping(schedule)
+
+
+class TimerCore:
+    """Heap of absolute fire instants that sleeps on the monotonic clock until the next one is due
+
+    Pass venues={name: schedule} instead of a single schedule to drive several
+    venues from one heap; every slot entry then carries its venue name. With a
+    VirtualClock, run_until() replays any stretch of time without sleeping.
+
+    Deadlines are monotonic, so every wake also compares the wall clock with
+    the monotonic one: a suspend or an NTP step re-anchors the heap, and a
+    slot reached after its instant (stall, suspend, step) goes through the
+    venue's CatchUp policy instead of playing as if on time.
+    """
+
+    def __init__(
+        self,
+        schedule: Optional[Schedule],
+        on_fire: Callable[[TimerEntry], None],
+        on_rollover: Optional[Callable[[str, str], None]] = None,
+        on_heartbeat: Optional[Callable[[int], None]] = None,
+        heartbeat_interval: Optional[float] = 60.0,
+        on_prefetch: Optional[Callable[[List[TimerEntry]], None]] = None,
+        prefetch_lead: float = 120.0,
+        prefetch_count: int = 3,
+        venues: Optional[Dict[str, Schedule]] = None,
+        clock: Optional[Union[SystemClock, VirtualClock]] = None,
+        slot_lead: float = 0.0,
+        catch_up: Optional[Dict[Optional[str], CatchUp]] = None,
+        missed_after: float = 1.0,
+        jump_threshold: float = 2.0,
+        check_interval: float = 5.0,
+        ordered: bool = True,
+    ):
+        self.clock = clock or SystemClock()
+        # Slots are dispatched this early so on_fire can prepare; entry.due keeps the instant itself
+        self.slot_lead = slot_lead
+        # Venue -> policy for slots reached more than missed_after seconds past their instant
+        self.catch_up = catch_up or {}
+        self.missed_after = missed_after
+        # Wall and monotonic clocks drifting apart by more than this re-anchors every deadline
+        self.jump_threshold = jump_threshold
+        # Longest sleep between clock checks, so a resume is noticed even with nothing due
+        self.check_interval = check_interval
+        # "played late" / "dropped" -> slots since start
+        self.missed: Dict[str, int] = {"played late": 0, "dropped": 0}
+        if venues is None:
+            self.indexes: Dict[Optional[str], ScheduleIndex] = {None: _as_index(schedule)}
+        else:
+            self.indexes = {name: _as_index(s) for name, s in venues.items()}
+        self.on_fire = on_fire
+        self.on_rollover = on_rollover
+        self.on_heartbeat = on_heartbeat
+        self.heartbeat_interval = heartbeat_interval
+        self.on_prefetch = on_prefetch
+        self.prefetch_lead = prefetch_lead
+        self.prefetch_count = prefetch_count
+
+        self._heap: List[TimerEntry] = []
+        # Live slots of the current day: (venue, fire instant) -> (slot entry, prefetch entry)
+        self._slots: Dict[Tuple[Optional[str], datetime], Tuple[TimerEntry, Optional[TimerEntry]]] = {}
+        # Slots of the current day already fired, so a reload never re-adds them
+        self._dispatched: Set[Tuple[Optional[str], datetime]] = set()
+        # With ordered, each venue's announcement tasks are chained so they play one
+        # after another; callers with their own playback queue turn it off
+        self.ordered = ordered
+        # Last announcement task per venue, for the ordered chaining
+        self._lanes: Dict[Optional[str], asyncio.Future] = {}
+        # Announcement tasks still running, awaited when the loop stops
+        self._tasks: Set[asyncio.Future] = set()
+        self._seq = 0
+        self._wakeup = threading.Event()
+        self._async_wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._running = False
+        self.current_day: Optional[str] = None
+        self.current_date: Optional[date] = None
+        # (monotonic, wall) pair the heap's deadlines were computed against
+        self._anchor: Optional[Tuple[float, datetime]] = None
+
+    @property
+    def index(self) -> ScheduleIndex:
+        """The schedule of a single-venue timer"""
+        if len(self.indexes) != 1:
+            raise AttributeError("index is ambiguous with several venues; use indexes[venue]")
+        return next(iter(self.indexes.values()))
+
+    # ------------------------------------------------------------------
+    # Clock helpers
+    # ------------------------------------------------------------------
+    def _deadline_for(self, fire_at: datetime) -> float:
+        """Translate a wall-clock instant into a monotonic deadline"""
+        return self.clock.monotonic() + (fire_at - self.clock.now()).total_seconds()
+
+    def _check_clock(self):
+        """Re-anchor every deadline if the wall clock moved against the monotonic one"""
+        monotonic, now = self.clock.monotonic(), self.clock.now()
+        if self._anchor is None:
+            self._anchor = (monotonic, now)
+            return
+        anchor_monotonic, anchor_now = self._anchor
+        skew = (now - anchor_now).total_seconds() - (monotonic - anchor_monotonic)
+        if abs(skew) < self.jump_threshold:
+            return
+
+        self._anchor = (monotonic, now)
+        for entry in self._heap:
+            entry.due = monotonic + (entry.fire_at - now).total_seconds()
+            entry.deadline = entry.due - (self.slot_lead if entry.kind == SLOT else 0.0)
+        heapq.heapify(self._heap)
+        overdue = sum(1 for slot, _ in self._slots.values() if slot.due < monotonic)
+        event("clock.jump", logging.WARNING, skew_s=round(skew, 1), overdue=overdue)
+
+    def _notify(self):
+        """Wake the run loop so it re-reads the head of the heap"""
+        self._wakeup.set()
+        wakeup = self._async_wakeup
+        if wakeup is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(wakeup.set)
+
+    def _push(self, kind: str, fire_at: datetime, lead: float = 0.0, **fields) -> TimerEntry:
+        self._seq += 1
+        due = self._deadline_for(fire_at)
+        entry = TimerEntry(due - lead, self._seq, kind, fire_at, due=due, **fields)
+        heapq.heappush(self._heap, entry)
+        return entry
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+    def _start_second(self, day_date: date, now: datetime, from_midnight: bool = False) -> int:
+        if day_date == now.date() and not from_midnight:
+            # Slots earlier today have already passed; bisect straight past them
+            return now.hour * 3600 + now.minute * 60 + now.second
+        return 0
+
+    def _push_slot(self, venue: Optional[str], fire_at: datetime, audio_file: str, now: datetime) -> TimerEntry:
+        fields = dict(
+            day=self.current_day,
+            time_str=format_seconds(fire_at.hour * 3600 + fire_at.minute * 60 + fire_at.second),
+            audio_file=audio_file,
+            venue=venue,
+        )
+        entry = self._push(SLOT, fire_at, self.slot_lead, **fields)
+        prefetch = None
+        if self.on_prefetch:
+            # Re-prefetch the next few slots a lead time before this one fires
+            prefetch = self._push(PREFETCH, max(fire_at - timedelta(seconds=self.prefetch_lead), now), **fields)
+        self._slots[venue, fire_at] = (entry, prefetch)
+        return entry
+
+    def load_day(self, day_date: Optional[date] = None, from_midnight: bool = False) -> List[TimerEntry]:
+        """Replace the heap with the remaining slots of a day (for every venue) plus its midnight rollover
+
+        from_midnight keeps today's slots that have already passed, so a late
+        rollover hands them to the catch-up policy instead of skipping them.
+        """
+        now = self.clock.now()
+        self._anchor = (self.clock.monotonic(), now)
+        if day_date is None:
+            day_date = now.date()
+
+        self.current_date = day_date
+        self.current_day = DAY_NAMES[day_date.weekday()]
+        self._heap = []
+        self._slots = {}
+        self._dispatched = set()
+
+        midnight = datetime.combine(day_date, datetime.min.time())
+        start_second = self._start_second(day_date, now, from_midnight)
+        loaded = []
+        for venue, index in self.indexes.items():
+            for second, audio_file in index.day_events(self.current_day, start_second):
+                loaded.append(self._push_slot(venue, midnight + timedelta(seconds=second), audio_file, now))
+
+        self._push(ROLLOVER, midnight + timedelta(days=1))
+        if self.heartbeat_interval:
+            self._push(HEARTBEAT, now + timedelta(seconds=self.heartbeat_interval))
+
+        self._notify()
+        loaded.sort()
+        return loaded
+
+    def apply_schedule(self, schedule: Schedule, venue: Optional[str] = None) -> Tuple[int, int, int]:
+        """Swap in a new schedule for one venue, touching only slots that were added, removed or changed
+
+        The rest of today is diffed between the old and new index as sets of
+        (second, asset) pairs, so only the differences reach the heap: removed
+        slots are cancelled in place (lazy heap deletion) and changed slots
+        just get their asset swapped. The rollover and any announcement
+        already playing are left alone. Returns (added, removed, changed).
+        """
+        if venue not in self.indexes:
+            raise KeyError(f"Unknown venue: {venue}")
+        schedule = _as_index(schedule)
+        old, self.indexes[venue] = self.indexes[venue], schedule
+        if self.current_date is None:
+            return 0, 0, 0
+
+        now = self.clock.now()
+        midnight = datetime.combine(self.current_date, datetime.min.time())
+        start_second = self._start_second(self.current_date, now)
+        before = set(old.day_events(self.current_day, start_second))
+        after = set(schedule.day_events(self.current_day, start_second))
+        wanted = dict(after - before)
+
+        added = removed = changed = 0
+        for second, _ in before - after:
+            key = (venue, midnight + timedelta(seconds=second))
+            if second not in wanted and key in self._slots:
+                for entry in self._slots.pop(key):
+                    if entry is not None:
+                        entry.cancelled = True
+                removed += 1
+
+        for second, audio_file in wanted.items():
+            key = (venue, midnight + timedelta(seconds=second))
+            if key in self._dispatched:
+                # Fired earlier in the cutoff second, or up to slot_lead before its instant
+                continue
+            live = self._slots.get(key)
+            if live is None:
+                self._push_slot(venue, key[1], audio_file, now)
+                added += 1
+            else:
+                for entry in live:
+                    if entry is not None:
+                        entry.audio_file = audio_file
+                changed += 1
+
+        if added:
+            self._notify()
+        return added, removed, changed
+
+    def add_slot(self, fire_at: datetime, audio_file: str, venue: Optional[str] = None) -> TimerEntry:
+        """One-off announcement outside the schedule, e.g. for benchmarks; dropped at the next rollover"""
+        if venue not in self.indexes:
+            raise KeyError(f"Unknown venue: {venue}")
+        entry = self._push_slot(venue, fire_at, audio_file, self.clock.now())
+        self._notify()
+        return entry
+
+    def pending(self, venue: Optional[str] = None) -> int:
+        """Number of announcement slots still waiting to fire, for one venue or all of them"""
+        if venue is None:
+            return len(self._slots)
+        return sum(1 for v, _ in self._slots if v == venue)
+
+    def upcoming(self, limit: int = 5, venue: Optional[str] = None) -> List[TimerEntry]:
+        """The next announcement slots in fire order, for one venue or all of them"""
+        slots = (slot for slot, _ in self._slots.values() if venue is None or slot.venue == venue)
+        return heapq.nsmallest(limit, slots)
+
+    # ------------------------------------------------------------------
+    # Main loop
+    # ------------------------------------------------------------------
+    def _superseded(self, entry: TimerEntry, monotonic: float) -> bool:
+        """Whether a later slot of the same venue is already overdue too"""
+        return any(slot.venue == entry.venue and slot.due <= monotonic for slot, _ in self._slots.values())
+
+    def _catch_up(self, entry: TimerEntry) -> bool:
+        """Apply the venue's policy to a slot reached late; True to play it"""
+        monotonic = self.clock.monotonic()
+        late = monotonic - entry.due
+        if late <= self.missed_after:
+            return True
+        policy = self.catch_up.get(entry.venue) or CatchUp()
+        reason = policy.drop_reason(late, self._superseded(entry, monotonic))
+        if reason is None:
+            self.missed["played late"] += 1
+        else:
+            self.missed["dropped"] += 1
+        event("slot.missed", logging.WARNING, venue=entry.venue, slot=entry.time_str, file=entry.audio_file,
+              late_s=round(late, 1), policy=policy.policy, action=f"dropped ({reason})" if reason else "played late")
+        return reason is None
+
+    def _dispatch(self, entry: TimerEntry):
+        if entry.kind == SLOT:
+            self._slots.pop((entry.venue, entry.fire_at), None)
+            self._dispatched.add((entry.venue, entry.fire_at))
+            if self._catch_up(entry):
+                return self.on_fire(entry)
+        elif entry.kind == ROLLOVER:
+            old_day = self.current_day
+            day_date = max(entry.fire_at.date(), self.clock.now().date())
+            if day_date != entry.fire_at.date():
+                event("clock.days_skipped", logging.WARNING, expected=entry.fire_at.date(), now=day_date)
+            self.load_day(day_date, from_midnight=True)
+            if self.on_rollover:
+                self.on_rollover(old_day, self.current_day)
+        elif entry.kind == HEARTBEAT:
+            # From the previous beat, so beats do not drift; from now after a clock jump, so they do not pile up
+            next_beat = entry.fire_at + timedelta(seconds=self.heartbeat_interval)
+            now = self.clock.now()
+            if next_beat <= now:
+                next_beat = now + timedelta(seconds=self.heartbeat_interval)
+            self._push(HEARTBEAT, next_beat)
+            if self.on_heartbeat:
+                self.on_heartbeat(self.pending())
+        elif entry.kind == PREFETCH:
+            self.on_prefetch(self.upcoming(self.prefetch_count))
+
+    def _next_delay(self, timeout: Optional[float] = None) -> Optional[float]:
+        """Seconds until the head of the heap is due (None means sleep until woken)"""
+        while self._heap and self._heap[0].cancelled:
+            heapq.heappop(self._heap)
+
+        if not self._heap:
+            return timeout
+        delay = self._heap[0].deadline - self.clock.monotonic()
+        return delay if timeout is None else min(delay, timeout)
+
+    def _pop_due(self) -> Optional[TimerEntry]:
+        if self._heap and self._heap[0].deadline <= self.clock.monotonic():
+            return heapq.heappop(self._heap)
+        return None
+
+    def run_once(self, timeout: Optional[float] = None) -> bool:
+        """Sleep until the earliest entry is due and dispatch it; False if woken early"""
+        self._wakeup.clear()
+        self._check_clock()
+        delay = self._next_delay(self.check_interval if timeout is None else min(timeout, self.check_interval))
+        if delay is None or delay > 0:
+            if self._wakeup.wait(delay):
+                return False
+
+        entry = self._pop_due()
+        if entry is None:
+            return False
+        self._dispatch(entry)
+        return True
+
+    def run(self):
+        """Dispatch entries until stop() is called"""
+        if self.current_date is None:
+            self.load_day()
+        self._running = True
+        while self._running:
+            self.run_once()
+
+    def run_until(self, until: datetime) -> int:
+        """Dispatch every entry due before until on a VirtualClock, jumping straight to each one
+
+        on_fire must be synchronous here; returns the number of entries dispatched.
+        """
+        if not isinstance(self.clock, VirtualClock):
+            raise TypeError("run_until() needs a VirtualClock")
+        if self.current_date is None:
+            self.load_day()
+        dispatched = 0
+        while True:
+            # Recomputed every round, since a clock step re-anchors the heap
+            self._check_clock()
+            end = self._deadline_for(until)
+            if self._next_delay() is None or self._heap[0].deadline >= end:
+                break
+            self.clock.advance_to(self._heap[0].deadline)
+            result = self._dispatch(heapq.heappop(self._heap))
+            if inspect.isawaitable(result):
+                if inspect.iscoroutine(result):
+                    result.close()
+                raise TypeError("run_until() cannot wait for asynchronous announcements")
+            dispatched += 1
+        self.clock.advance_to(end)
+        return dispatched
+
+    @staticmethod
+    async def _guarded(awaitable, previous: Optional[asyncio.Future] = None):
+        if previous is not None:
+            await asyncio.gather(previous, return_exceptions=True)
+        try:
+            return await awaitable
+        except Exception as e:
+            event("announce.task_failed", logging.ERROR, exc_info=True, error=str(e))
+
+    async def run_async(self):
+        """Dispatch entries as a task on the running event loop until stop() is called
+
+        Awaitables returned by on_fire run as tasks, so the loop keeps
+        dispatching heartbeats, rollovers and further slots however long a
+        clip plays. With ordered (the default) each venue's tasks are chained
+        so its announcements stay sequential; without it they run
+        independently and ordering playback is up to the consumer (the
+        AnnouncementEngine's per-output workers).
+        """
+        self._loop = asyncio.get_running_loop()
+        self._async_wakeup = asyncio.Event()
+        if self.current_date is None:
+            self.load_day()
+        self._running = True
+        try:
+            while self._running:
+                self._async_wakeup.clear()
+                self._check_clock()
+                delay = self._next_delay(self.check_interval)
+                if delay is None or delay > 0:
+                    try:
+                        await asyncio.wait_for(self._async_wakeup.wait(), delay)
+                        continue
+                    except asyncio.TimeoutError:
+                        pass
+
+                entry = self._pop_due()
+                if entry is None:
+                    continue
+                result = self._dispatch(entry)
+                if inspect.isawaitable(result):
+                    previous = self._lanes.get(entry.venue) if self.ordered else None
+                    task = asyncio.ensure_future(self._guarded(result, previous))
+                    if self.ordered:
+                        self._lanes[entry.venue] = task
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+            # Let announcements that are already playing finish
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        finally:
+            self._lanes = {}
+            self._tasks = set()
+            self._async_wakeup = None
+
+    def stop(self):
+        """Stop the loop from any thread"""
+        self._running = False
+        self._notify()
@@ -0,0 +1,117 @@
+import os
+from typing import Dict, List, Optional
+
+from schedule_index import ScheduleIndex, read_schedule_literal
+
+# Sites one engine can drive. Schedules are read from the files each site
+# already uses; asset paths in them are relative to asset_root. All venues
+# of one engine play through that process's mixer, so only venues that
+# share a speaker belong in the same engine. catch_up and grace say what
+# happens to slots missed during a stall or suspend (see timer_core.CatchUp);
+# wristband calls go stale quickly, so by default only the latest missed
+# call plays, and only within two minutes. overlap and stale_after say what
+# an announcement does when the output is still busy with another one (see
+# announce_engine.Overlap).
+VENUES = {
+    "default": {
+        "source": "mapping.py",
+        "attribute": "mapp",
+        "asset_root": ".",
+    },
+    "london": {
+        "source": "mapping_london.py",
+        "attribute": "mapp",
+        "asset_root": ".",
+        "volume": 0.65,
+    },
+    "scarborough": {
+        "source": "scarborough/main_linux.py",
+        "attribute": "SCHEDULE",
+        "asset_root": "scarborough",
+    },
+}
+
+
+class Venue:
+    """One site's schedule plus where its audio files live and how it plays them"""
+
+    def __init__(
+        self,
+        name: str,
+        source: str,
+        attribute: str = "mapp",
+        asset_root: str = ".",
+        media_backend: str = "playerctl",
+        volume: Optional[float] = None,
+        catch_up: str = "latest",
+        grace: float = 120.0,
+        overlap: str = "queue",
+        stale_after: float = 30.0,
+    ):
+        self.name = name
+        self.source = source
+        self.attribute = attribute
+        self.asset_root = asset_root
+        self.media_backend = media_backend
+        self.volume = volume
+        self.catch_up = catch_up  # policy for slots whose instant has passed
+        self.grace = grace  # seconds late a missed slot may still play
+        self.overlap = overlap  # policy when the output is busy with another announcement
+        self.stale_after = stale_after  # seconds late a queued announcement may start with drop-if-stale
+        self.index: Optional[ScheduleIndex] = None
+        self.source_mtime: Optional[int] = None
+
+    @classmethod
+    def from_config(cls, name: str, config: Optional[Dict] = None) -> "Venue":
+        """Build a venue from an entry of VENUES"""
+        return cls(name, **(config if config is not None else VENUES[name]))
+
+    def resolve(self, audio_file: str) -> str:
+        """Asset path as seen from the working directory; equal files across venues get equal paths"""
+        return os.path.normpath(os.path.join(self.asset_root, audio_file))
+
+    def compile(self) -> ScheduleIndex:
+        """Re-read the schedule source and compile it with resolved asset paths
+
+        Does not touch the venue, so a failed reload leaves it as it was.
+        """
+        schedule = read_schedule_literal(self.source, self.attribute)
+        resolved = {
+            day: {time_str: self.resolve(audio_file) for time_str, audio_file in slots.items()}
+            for day, slots in schedule.items()
+        }
+        return ScheduleIndex.from_mapping(resolved)
+
+    def load(self) -> ScheduleIndex:
+        """Compile the schedule and remember the source's mtime for change detection"""
+        mtime = os.stat(self.source).st_mtime_ns
+        self.index = self.compile()
+        self.source_mtime = mtime
+        return self.index
+
+    def source_changed(self) -> bool:
+        try:
+            return os.stat(self.source).st_mtime_ns != self.source_mtime
+        except OSError:
+            return False
+
+
+def load_venues(names: List[str]) -> List[Venue]:
+    """Build and compile the named venues from VENUES"""
+    venues = []
+    for name in names:
+        if name not in VENUES:
+            raise ValueError(f"Unknown venue: {name} (known: {', '.join(sorted(VENUES))})")
+        venue = Venue.from_config(name)
+        venue.load()
+        venues.append(venue)
+    return venues
+
+
+def shared_assets(venues: List[Venue]) -> Dict[str, List[str]]:
+    """Asset path -> names of the venues that use it"""
+    users: Dict[str, List[str]] = {}
+    for venue in venues:
+        for audio_file in venue.index.assets:
+            users.setdefault(audio_file, []).append(venue.name)
+    return users